@@ -0,0 +1,79 @@
+"""
+Micro-benchmark of request validation throughput.
+
+Times the order item and order input models (one record at a time and
+through validate_records), and the LxWxH parser with and without its cache.
+
+Usage (from services/order):
+    python -m benchmarks.bench_validators [--records 100000]
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from models.models import OrderIn_Pydantic, OrderItemIn_Pydantic
+from utils.serializers import from_data
+from utils.validators import parse_dimensions, validate_records
+
+
+def item_records(count: int):
+    rng = random.Random(42)
+    boxes = [f"{l}x{w}x{h}" for l, w, h in ((40, 30, 20), (60, 40, 40), (120, 80, 100), (10.5, 20, 30))]
+    return [
+        {
+            "cargo_type": "General",
+            "weight_kg": round(rng.uniform(0.5, 500), 2),
+            "dimensions_cm": rng.choice(boxes) if rng.random() < 0.9 else f"{rng.randint(1, 200)}x{rng.randint(1, 200)}x{rng.randint(1, 200)}",
+            "item_price": round(rng.uniform(1, 1000), 2),
+        }
+        for _ in range(count)
+    ]
+
+
+def order_records(count: int):
+    pickup = date.today() + timedelta(days=1)
+    return [
+        {
+            "customer_id": index % 5000,
+            "pickup_location": "123 Pickup St, City",
+            "delivery_location": "456 Delivery St, City",
+            "requested_pickup_date": pickup.isoformat(),
+            "delivery_deadline": (pickup + timedelta(days=5)).isoformat(),
+            "total_price": "99.90",
+        }
+        for index in range(count)
+    ]
+
+
+def timed(label: str, count: int, run):
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<45}{count / elapsed:>14,.0f} records/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100_000)
+    args = parser.parse_args()
+
+    items = item_records(args.records)
+    orders = order_records(args.records)
+    dimensions = [item["dimensions_cm"] for item in items]
+
+    parse_dimensions.cache_clear()
+    timed("parse_dimensions (cold cache)", len(dimensions), lambda: [parse_dimensions(d) for d in dimensions])
+    timed("parse_dimensions (warm cache)", len(dimensions), lambda: [parse_dimensions(d) for d in dimensions])
+    timed(
+        "parse_dimensions (uncached)",
+        len(dimensions),
+        lambda: [parse_dimensions.__wrapped__(d) for d in dimensions],
+    )
+    timed("OrderItemIn one by one", len(items), lambda: [from_data(OrderItemIn_Pydantic, item) for item in items])
+    timed("OrderItemIn validate_records", len(items), lambda: validate_records(OrderItemIn_Pydantic, items))
+    timed("OrderIn validate_records", len(orders), lambda: validate_records(OrderIn_Pydantic, orders))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,85 @@
+import asyncio
+import logging
+from typing import Any, Dict
+
 from tortoise import Tortoise
-from config.settings import TORTOISE_ORM
+from config.settings import (
+    TORTOISE_ORM,
+    GENERATE_SCHEMAS,
+    DB_POOL_WARMUP,
+    DB_POOL_MIN_SIZE,
+)
+
+logger = logging.getLogger(__name__)
 
 
-async def init_db():
-    """Initialize the database with Tortoise ORM."""
+async def init_db(generate_schemas: bool = GENERATE_SCHEMAS, warm_up: bool = DB_POOL_WARMUP):
+    """
+    Initialize the database with Tortoise ORM.
+
+    Tables are built by the aerich migrations (`aerich upgrade`) before the
+    app starts; generate_schemas (GENERATE_SCHEMAS, off by default) also
+    creates missing tables on startup, e.g. for a local scratch database.
+    """
     await Tortoise.init(config=TORTOISE_ORM)
-    # Generate schemas if needed
-    await Tortoise.generate_schemas()
+    if generate_schemas:
+        await Tortoise.generate_schemas(safe=True)
+    if warm_up:
+        await warm_up_pool()
+
+
+async def warm_up_pool(size: int = DB_POOL_MIN_SIZE):
+    """
+    Open the connection pool and run a trivial query on `size` connections.
+
+    Without this the pool is created by the first request, which then pays
+    for connecting, authentication and type introspection.
+    """
+    connection = Tortoise.get_connection("default")
+    await asyncio.gather(*(connection.execute_query("SELECT 1") for _ in range(max(size, 1))))
+    logger.info(f"Database pool warmed up: {pool_metrics()}")
+
+
+def pool_metrics() -> Dict[str, Any]:
+    """Get utilization of the default connection pool."""
+    try:
+        connection = Tortoise.get_connection("default")
+    except Exception:
+        return {"initialized": False}
+
+    pool = getattr(connection, "_pool", None)
+    if pool is None:
+        # Not opened yet, or a backend without a pool (e.g. SQLite)
+        return {"initialized": True, "pooled": False}
+
+    size = pool.get_size()
+    in_use = size - pool.get_idle_size()
+    max_size = pool.get_max_size()
+    return {
+        "initialized": True,
+        "pooled": True,
+        "min_size": pool.get_min_size(),
+        "max_size": max_size,
+        "size": size,
+        "in_use": in_use,
+        "utilization": round(in_use / max_size, 3) if max_size else 0.0,
+    }
 
 
 async def close_db():
     """Close database connections."""
-    await Tortoise.close_connections()
\ No newline at end of file
+    await Tortoise.close_connections()
+
+
+async def main():
+    """Create missing tables without starting the app (a scratch database; deploys run `aerich upgrade`)."""
+    await Tortoise.init(config=TORTOISE_ORM)
+    try:
+        await Tortoise.generate_schemas(safe=True)
+    finally:
+        await Tortoise.close_connections()
+    print("Schemas generated")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -21,6 +21,19 @@ DB_HOST = os.getenv("DB_HOST_DOCKER", "postgres")
 # DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "5432")
 
+# Connection pool settings (asyncpg)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "5"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+DB_POOL_MAX_QUERIES = int(os.getenv("DB_POOL_MAX_QUERIES", "50000"))
+DB_POOL_MAX_INACTIVE_LIFETIME = float(os.getenv("DB_POOL_MAX_INACTIVE_LIFETIME", "300"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "1024"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "30"))
+DB_POOL_WARMUP = os.getenv("DB_POOL_WARMUP", "True").lower() == "true"
+
+# Create missing tables on startup, off by default: the schema is built by
+# `aerich upgrade` on deploy (or `python -m config.db` for a scratch database)
+GENERATE_SCHEMAS = os.getenv("GENERATE_SCHEMAS", "False").lower() == "true"
+
 # RabbitMQ settings
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "localhost")
 RABBITMQ_PORT = int(os.getenv("RABBITMQ_PORT", "5672"))
@@ -29,13 +42,124 @@ RABBITMQ_PASSWORD = os.getenv("RABBITMQ_PASSWORD", "guest")
 RABBITMQ_QUEUE = os.getenv("RABBITMQ_QUEUE", "order_queue")
 RABBITMQ_EXCHANGE = os.getenv("RABBITMQ_EXCHANGE", "order_exchange")
 RABBITMQ_ROUTING_KEY = os.getenv("RABBITMQ_ROUTING_KEY", "order_key")
+RABBITMQ_DEAD_LETTER_QUEUE = os.getenv("RABBITMQ_DEAD_LETTER_QUEUE", "order_queue.dlq")
+
+# RABBITMQ_EXCHANGE_TYPE=topic routes every event under its type (plus the
+# customer shard, customer_id % RABBITMQ_CUSTOMER_SHARDS, when that is set)
+# instead of RABBITMQ_ROUTING_KEY; RABBITMQ_QUEUE is bound with the
+# comma-separated RABBITMQ_BINDING_KEYS. An existing exchange cannot change
+# type, so topic mode needs a new RABBITMQ_EXCHANGE name
+RABBITMQ_EXCHANGE_TYPE = os.getenv("RABBITMQ_EXCHANGE_TYPE", "direct").lower()
+RABBITMQ_CUSTOMER_SHARDS = int(os.getenv("RABBITMQ_CUSTOMER_SHARDS", "0"))
+RABBITMQ_BINDING_KEYS = [key.strip() for key in os.getenv("RABBITMQ_BINDING_KEYS", "#").split(",") if key.strip()]
+
+# Async publisher settings
+PUBLISHER_QUEUE_SIZE = int(os.getenv("PUBLISHER_QUEUE_SIZE", "10000"))
+PUBLISHER_RETRY_DELAY = float(os.getenv("PUBLISHER_RETRY_DELAY", "0.5"))
+PUBLISHER_MAX_RETRY_DELAY = float(os.getenv("PUBLISHER_MAX_RETRY_DELAY", "30"))
+
+# Events coalesced into one broker message (1 sends every event on its own)
+# and seconds the publisher waits for more events to fill a batch
+PUBLISHER_BATCH_SIZE = int(os.getenv("PUBLISHER_BATCH_SIZE", "1"))
+PUBLISHER_BATCH_WINDOW = float(os.getenv("PUBLISHER_BATCH_WINDOW", "0.05"))
+
+# Broker message encoding (EVENT_SERIALIZER: json or msgpack, EVENT_COMPRESSION:
+# none or gzip); bodies smaller than EVENT_COMPRESS_MIN_BYTES are not compressed
+EVENT_SERIALIZER = os.getenv("EVENT_SERIALIZER", "json").lower()
+EVENT_COMPRESSION = os.getenv("EVENT_COMPRESSION", "none").lower()
+EVENT_COMPRESS_MIN_BYTES = int(os.getenv("EVENT_COMPRESS_MIN_BYTES", "1024"))
+
+# Order event consumer: unacked messages delivered at once, handlers run in
+# parallel, acks sent per batch (or every interval seconds), handler attempts
+# before a message goes to the dead-letter queue
+CONSUMER_PREFETCH = int(os.getenv("CONSUMER_PREFETCH", "100"))
+CONSUMER_CONCURRENCY = int(os.getenv("CONSUMER_CONCURRENCY", "20"))
+CONSUMER_ACK_BATCH_SIZE = int(os.getenv("CONSUMER_ACK_BATCH_SIZE", "50"))
+CONSUMER_ACK_INTERVAL = float(os.getenv("CONSUMER_ACK_INTERVAL", "1.0"))
+CONSUMER_MAX_ATTEMPTS = int(os.getenv("CONSUMER_MAX_ATTEMPTS", "3"))
+CONSUMER_RETRY_DELAY = float(os.getenv("CONSUMER_RETRY_DELAY", "0.5"))
+
+# Outbox relay settings
+OUTBOX_RELAY_ENABLED = os.getenv("OUTBOX_RELAY_ENABLED", "True").lower() == "true"
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1.0"))
+OUTBOX_PUBLISH_TIMEOUT = float(os.getenv("OUTBOX_PUBLISH_TIMEOUT", "10"))
+
+# Cache settings (CACHE_BACKEND: memory or redis)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_TTL = float(os.getenv("CACHE_TTL", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Seconds a report result is served from the cache before it is recomputed
+REPORT_CACHE_TTL = float(os.getenv("REPORT_CACHE_TTL", "60"))
+
+# Pricing tariff tables, reloaded when the file changes
+TARIFF_FILE = os.getenv("TARIFF_FILE", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "tariffs.json"))
+TARIFF_RELOAD_INTERVAL = float(os.getenv("TARIFF_RELOAD_INTERVAL", "5"))
+
+# Volumetric weight divisor: volumetric kg = volume in cm3 / divisor (at
+# least 100, see MAX_DIMENSION_CM in utils.validators)
+VOLUMETRIC_DIVISOR = int(os.getenv("VOLUMETRIC_DIVISOR", "5000"))
+
+# Bulk endpoint limits
+BULK_ITEMS_MAX = int(os.getenv("BULK_ITEMS_MAX", "1000"))
+PRICE_BATCH_MAX = int(os.getenv("PRICE_BATCH_MAX", "10000"))
+
+# Rows fetched per query by the streaming export
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "5000"))
+
+# Order import: valid rows inserted per transaction, row errors listed in the report
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "1000"))
+
+# Idempotency-Key handling for write requests: seconds a stored response is
+# replayed, seconds a running request holds its key without renewing it (a
+# retry may take over the key of a worker that died), largest response body
+# stored (larger responses are not replayed), seconds between purges of
+# expired keys
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "60"))
+IDEMPOTENCY_MAX_RESPONSE_BYTES = int(os.getenv("IDEMPOTENCY_MAX_RESPONSE_BYTES", "1048576"))
+IDEMPOTENCY_PURGE_INTERVAL = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", "300"))
+
+# Order event stream: events buffered per client before a slow client is
+# dropped, seconds between keepalives, clients served per worker
+EVENT_STREAM_QUEUE_SIZE = int(os.getenv("EVENT_STREAM_QUEUE_SIZE", "100"))
+EVENT_STREAM_KEEPALIVE = float(os.getenv("EVENT_STREAM_KEEPALIVE", "15"))
+EVENT_STREAM_MAX_SUBSCRIBERS = int(os.getenv("EVENT_STREAM_MAX_SUBSCRIBERS", "50000"))
+# Where each worker's stream gets its events: "broker" (a private queue on
+# RABBITMQ_EXCHANGE, so every worker and replica sees every event) or
+# "local" (only the events this worker committed, e.g. a single process)
+EVENT_STREAM_SOURCE = os.getenv("EVENT_STREAM_SOURCE", "broker").lower()
 
 # Database connection URL
 DATABASE_URL = f"{DB_ENGINE}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+# Structured connection config, so pool and statement settings reach asyncpg
+if DB_ENGINE in ("postgres", "asyncpg"):
+    DATABASE_CONNECTION = {
+        "engine": "tortoise.backends.asyncpg",
+        "credentials": {
+            "host": DB_HOST,
+            "port": int(DB_PORT),
+            "user": DB_USER,
+            "password": DB_PASSWORD,
+            "database": DB_NAME,
+            "minsize": DB_POOL_MIN_SIZE,
+            "maxsize": DB_POOL_MAX_SIZE,
+            "max_queries": DB_POOL_MAX_QUERIES,
+            "max_inactive_connection_lifetime": DB_POOL_MAX_INACTIVE_LIFETIME,
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "command_timeout": DB_COMMAND_TIMEOUT,
+        },
+    }
+else:
+    DATABASE_CONNECTION = DATABASE_URL
+
 # Tortoise ORM Models
 TORTOISE_ORM = {
-    "connections": {"default": DATABASE_URL},
+    "connections": {"default": DATABASE_CONNECTION},
     "apps": {
         "models": {
             "models": ["models.models", "aerich.models"],
@@ -0,0 +1,162 @@
+import csv
+import io
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, List
+
+import orjson
+
+from config.settings import EXPORT_CHUNK_SIZE
+from models.models import OrderItem, PriceCalculation
+from controllers.order_controller import filter_orders, after_order
+
+ORDER_FIELDS = (
+    "order_id",
+    "customer_id",
+    "pickup_location",
+    "delivery_location",
+    "requested_pickup_date",
+    "delivery_deadline",
+    "total_price",
+    "status",
+    "created_at",
+    "updated_at",
+)
+
+ITEM_FIELDS = (
+    "item_id",
+    "cargo_type",
+    "weight_kg",
+    "dimensions_cm",
+    "special_requirements",
+    "item_price",
+    "status",
+)
+
+# All exported decimal columns have two decimal places
+CENT = Decimal("0.01")
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+async def iter_order_chunks(
+    include_items: bool = False,
+    include_price: bool = False,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+    **filters
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yield orders matching the filters as plain dicts, chunk by chunk.
+
+    Chunks are fetched with keyset pagination on (created_at, order_id), so
+    memory use is bounded by chunk_size however many rows match. Items and
+    the latest price calculation are loaded with one query per chunk.
+    """
+    queryset = filter_orders(**filters)
+    chunk = await queryset.order_by("created_at", "order_id").limit(chunk_size).values(*ORDER_FIELDS)
+    while chunk:
+        order_ids = [order["order_id"] for order in chunk]
+
+        if include_items:
+            items_by_order: Dict[int, list] = {order_id: [] for order_id in order_ids}
+            items = await (
+                OrderItem.filter(order_id__in=order_ids)
+                .order_by("item_id")
+                .values("order_id", *ITEM_FIELDS)
+            )
+            for item in items:
+                items_by_order[item.pop("order_id")].append(item)
+            for order in chunk:
+                order["items"] = items_by_order[order["order_id"]]
+
+        if include_price:
+            calculations = await (
+                PriceCalculation.filter(order_id__in=order_ids)
+                .order_by("order_id", "created_at", "calculation_id")
+                .values("order_id", "final_price")
+            )
+            # Later calculations overwrite earlier ones
+            latest_prices = {calculation["order_id"]: calculation["final_price"] for calculation in calculations}
+            for order in chunk:
+                order["latest_price"] = latest_prices.get(order["order_id"])
+
+        yield chunk
+
+        if len(chunk) < chunk_size:
+            break
+        last = chunk[-1]
+        chunk = await (
+            after_order(queryset, last["created_at"], last["order_id"])
+            .order_by("created_at", "order_id")
+            .limit(chunk_size)
+            .values(*ORDER_FIELDS)
+        )
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value.quantize(CENT))
+    return value
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value.quantize(CENT))
+    raise TypeError
+
+
+async def export_orders_ndjson(**options) -> AsyncIterator[bytes]:
+    """Stream matching orders as newline-delimited JSON, one order per line."""
+    async for chunk in iter_order_chunks(**options):
+        yield b"".join(
+            orjson.dumps(order, default=_json_default, option=orjson.OPT_APPEND_NEWLINE)
+            for order in chunk
+        )
+
+
+async def export_orders_csv(include_items: bool = False, include_price: bool = False, **options) -> AsyncIterator[bytes]:
+    """
+    Stream matching orders as CSV.
+
+    With include_items there is one row per item (item columns are prefixed
+    with item_); orders without items get a single row with empty item columns.
+    """
+    header = list(ORDER_FIELDS)
+    if include_price:
+        header.append("latest_price")
+    if include_items:
+        header.extend(field if field.startswith("item_") else f"item_{field}" for field in ITEM_FIELDS)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue().encode()
+
+    async for chunk in iter_order_chunks(include_items=include_items, include_price=include_price, **options):
+        buffer.seek(0)
+        buffer.truncate()
+        for order in chunk:
+            row = [_plain(order[field]) for field in ORDER_FIELDS]
+            if include_price:
+                row.append(_plain(order["latest_price"]))
+            if not include_items:
+                writer.writerow(row)
+                continue
+            for item in order["items"] or [dict.fromkeys(ITEM_FIELDS)]:
+                writer.writerow(row + [_plain(item[field]) for field in ITEM_FIELDS])
+        yield buffer.getvalue().encode()
+
+
+def export_orders(export_format: str, **options) -> AsyncIterator[bytes]:
+    """Get the byte stream for an export in the given format (ndjson or csv)."""
+    if export_format == "csv":
+        return export_orders_csv(**options)
+    return export_orders_ndjson(**options)
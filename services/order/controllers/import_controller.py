@@ -0,0 +1,169 @@
+import argparse
+import asyncio
+import csv
+import json
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from fastapi import HTTPException
+from tortoise import Tortoise, timezone
+
+from config.settings import TORTOISE_ORM, IMPORT_BATCH_SIZE, IMPORT_MAX_REPORTED_ERRORS
+from models.models import Order, Order_Pydantic, OrderStatus, OrderStatusHistory, OrderIn_Pydantic
+from utils.outbox import outbox_transaction, record_events
+from utils.rollups import order_rollup, update_rollups
+from utils.sequences import allocate_ids
+from utils.serializers import serialize
+from utils.timeline import status_change_fields
+from utils.validators import validate_records
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+
+def iter_rows(lines: Iterable[str], import_format: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Parse an import file lazily into (row number, raw row) pairs.
+
+    Row numbers are file line numbers (for CSV, of the line the row ends
+    on; the header is line 1). NDJSON rows that are not valid JSON are
+    yielded as the exception, so they are reported like any other invalid row.
+    """
+    if import_format == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for row_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield row_number, json.loads(line)
+        except ValueError as e:
+            yield row_number, e
+
+
+def _clean_row(row: Any) -> Dict[str, Any]:
+    """Drop empty values, so CSV blanks fall back to the model defaults."""
+    if isinstance(row, Exception):
+        raise ValueError(f"Invalid JSON: {row}")
+    if not isinstance(row, dict):
+        raise ValueError("Row must be an object")
+    return {key: value for key, value in row.items() if key is not None and value not in ("", None)}
+
+
+async def _import_batch(order_dicts: List[Dict[str, Any]]) -> List[int]:
+    async with outbox_transaction() as connection:
+        order_ids = await allocate_ids(connection, Order, len(order_dicts))
+        now = timezone.now()
+        orders = [
+            Order(
+                order_id=order_id,
+                **order_dict,
+                **status_change_fields(order_dict.get("status", OrderStatus.PENDING), now)
+            )
+            for order_id, order_dict in zip(order_ids, order_dicts)
+        ]
+        await Order.bulk_create(orders, batch_size=500)
+        await update_rollups(added=[order_rollup(order) for order in orders])
+        await OrderStatusHistory.bulk_create([
+            OrderStatusHistory(
+                order_id=order.order_id,
+                status=order.status,
+                changed_by=order.customer_id,
+                notes="Order imported"
+            )
+            for order in orders
+        ], batch_size=500)
+
+        # Publish via the outbox, one event per order (like order.created)
+        await record_events([
+            (serialize(Order_Pydantic, order).dict(), "order.imported", order.order_id)
+            for order in orders
+        ])
+    return order_ids
+
+
+async def import_orders(
+    lines: Iterable[str],
+    import_format: str = "csv",
+    batch_size: int = IMPORT_BATCH_SIZE,
+    max_reported_errors: int = IMPORT_MAX_REPORTED_ERRORS,
+) -> Dict[str, Any]:
+    """
+    Import orders from a CSV or NDJSON file.
+
+    Rows are parsed as they are read and validated a batch at a time
+    against OrderIn_Pydantic (the update rules, so pickup dates may be in
+    the past). The valid rows of each batch are inserted in one
+    transaction (orders, their initial status history and an order.imported
+    event per order). Invalid rows are reported and skipped without aborting the import.
+
+    Args:
+        lines: Lines of the file, e.g. an open text file
+        import_format: csv or ndjson
+        batch_size: Rows validated and inserted per transaction
+        max_reported_errors: Row errors listed in the result (all are counted)
+
+    Returns:
+        Summary with row counts and the row errors
+    """
+    if import_format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported import format: {import_format}")
+
+    result = {"rows": 0, "imported": 0, "failed": 0, "errors": []}
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+
+    def report(row_number: int, error: str):
+        result["failed"] += 1
+        if len(result["errors"]) < max_reported_errors:
+            result["errors"].append({"row": row_number, "error": error})
+
+    async def flush():
+        valid, invalid = validate_records(OrderIn_Pydantic, (row for _, row in batch))
+        for entry in invalid:
+            report(batch[entry["index"]][0], "; ".join(entry["errors"]))
+        if valid:
+            order_ids = await _import_batch([record.dict() for record in valid])
+            result["imported"] += len(order_ids)
+        batch.clear()
+
+    for row_number, row in iter_rows(lines, import_format):
+        result["rows"] += 1
+        try:
+            batch.append((row_number, _clean_row(row)))
+        except ValueError as e:
+            report(row_number, str(e))
+            continue
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+
+    logger.info(f"Imported {result['imported']} of {result['rows']} order rows")
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Import orders from a CSV or NDJSON file")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="Defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+    import_format = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+
+    await Tortoise.init(config=TORTOISE_ORM)
+    try:
+        with open(args.path, newline="", encoding="utf-8") as f:
+            result = await import_orders(f, import_format, batch_size=args.batch_size)
+    finally:
+        await Tortoise.close_connections()
+
+    for error in result["errors"]:
+        print(f"row {error['row']}: {error['error']}")
+    print(f"Imported {result['imported']} of {result['rows']} rows, {result['failed']} failed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
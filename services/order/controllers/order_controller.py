@@ -1,102 +1,300 @@
-from typing import List, Optional
+from datetime import date, datetime
+from typing import Any, Collection, Dict, List, Optional
 from fastapi import HTTPException
+from tortoise import timezone
+from tortoise.expressions import F, Q
+from tortoise.queryset import QuerySet
 from models.models import (
     Order, 
     OrderStatus, 
     Order_Pydantic, 
     OrderIn_Pydantic,
-    OrderStatusHistory
+    OrderStatusHistory,
+    OrderItem_Pydantic,
+    PriceCalculation_Pydantic,
+    OrderStatusHistory_Pydantic,
+    OrderDetail_Pydantic
 )
-from utils.rabbit_utils import rabbit_client
+from utils.outbox import outbox_transaction, record_event
+from utils.rollups import order_rollup, update_rollups
+from utils.timeline import status_change_fields
+from utils.pagination import decode_cursor
+from utils.cache import get_or_load, order_key
+from utils.etags import order_etag
+from utils.serializers import serialize, serialize_many, to_data, from_data
 
 
-async def get_all_orders(skip: int = 0, limit: int = 100) -> List[Order_Pydantic]:
-    """Get all orders with pagination."""
-    orders = await Order.all().offset(skip).limit(limit)
-    return await Order_Pydantic.from_queryset(Order.all().offset(skip).limit(limit))
+def order_filter_kwargs(
+    status: Optional[OrderStatus] = None,
+    customer_id: Optional[int] = None,
+    pickup_from: Optional[date] = None,
+    pickup_to: Optional[date] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Translate the order list filters into Order.filter() arguments."""
+    filters = {}
+    if status:
+        filters["status"] = status
+    if customer_id is not None:
+        filters["customer_id"] = customer_id
+    if pickup_from:
+        filters["requested_pickup_date__gte"] = pickup_from
+    if pickup_to:
+        filters["requested_pickup_date__lte"] = pickup_to
+    if created_after:
+        filters["created_at__gte"] = created_after
+    if created_before:
+        filters["created_at__lt"] = created_before
+    return filters
 
 
-async def get_order_by_id(order_id: int) -> Order_Pydantic:
-    """Get a specific order by ID."""
+def filter_orders(**filters) -> QuerySet:
+    """Build an order queryset with all filters applied in SQL."""
+    return Order.filter(**order_filter_kwargs(**filters))
+
+
+def after_order(queryset: QuerySet, created_at: datetime, order_id: int) -> QuerySet:
+    """Restrict an order queryset to orders sorted after (created_at, order_id)."""
+    return queryset.filter(
+        Q(created_at__gt=created_at) | Q(created_at=created_at, order_id__gt=order_id)
+    )
+
+
+async def get_all_orders(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    **filters
+) -> List[Order_Pydantic]:
+    """
+    Get orders matching the filters, ordered by (created_at, order_id).
+
+    With a cursor, the page starts right after the order it points to
+    (keyset pagination) and skip is ignored.
+    """
+    queryset = filter_orders(**filters)
+    if cursor:
+        queryset = after_order(queryset, *decode_cursor(cursor))
+    else:
+        queryset = queryset.offset(skip)
+    orders = await queryset.order_by("created_at", "order_id").limit(limit)
+    return serialize_many(Order_Pydantic, orders)
+
+
+async def get_orders_in_status(
+    status: OrderStatus,
+    entered_after: Optional[datetime] = None,
+    entered_before: Optional[datetime] = None,
+    limit: int = 100,
+) -> List[Order_Pydantic]:
+    """
+    Get orders currently in a status, by when they entered it (oldest first).
+
+    Uses the (status, status_changed_at, order_id) index, e.g. for "in
+    transit since before T" (entered_before) or "delivered since T"
+    (entered_after).
+    """
+    queryset = Order.filter(status=status)
+    if entered_after:
+        queryset = queryset.filter(status_changed_at__gte=entered_after)
+    if entered_before:
+        queryset = queryset.filter(status_changed_at__lt=entered_before)
+    orders = await queryset.order_by("status_changed_at", "order_id").limit(limit)
+    return serialize_many(Order_Pydantic, orders)
+
+
+async def _load_order(order_id: int) -> Optional[dict]:
     order = await Order.filter(order_id=order_id).first()
-    if not order:
+    return to_data(serialize(Order_Pydantic, order)) if order else None
+
+
+async def get_order_by_id(order_id: int) -> Order_Pydantic:
+    """Get a specific order by ID (read through the cache)."""
+    data = await get_or_load(order_key(order_id), lambda: _load_order(order_id))
+    if data is None:
         raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
-    return await Order_Pydantic.from_tortoise_orm(order)
+    return from_data(Order_Pydantic, data)
 
 
-async def create_order(order_data: OrderIn_Pydantic) -> Order_Pydantic:
-    """Create a new order."""
-    order_dict = order_data.dict()
-    
-    # Create the order
-    order = await Order.create(**order_dict)
-    
-    # Create initial status history entry
-    await OrderStatusHistory.create(
-        order_id=order.order_id,
-        status=OrderStatus.PENDING,
-        changed_by=order.customer_id,
-        notes="Order created"
-    )
-    
-    # Publish to RabbitMQ
-    order_obj = await Order_Pydantic.from_tortoise_orm(order)
-    rabbit_client.publish_message(
-        message=order_obj.dict(),
-        message_type="order.created"
+async def ensure_order_exists(order_id: int) -> None:
+    """Raise a 404 unless the order exists, answered from the cache when possible."""
+    await get_order_by_id(order_id)
+
+
+async def get_order_details(order_ids: List[int]) -> List[OrderDetail_Pydantic]:
+    """
+    Get orders with their items, price calculations and status history.
+
+    Runs a fixed four queries (orders + one prefetch per relation) however
+    many orders are requested. Unknown IDs are skipped; results follow the
+    order of order_ids.
+    """
+    orders = await Order.filter(order_id__in=order_ids).prefetch_related(
+        "order_items", "price_calculations", "order_status_history"
     )
+    by_id = {order.order_id: order for order in orders}
     
-    return await Order_Pydantic.from_tortoise_orm(order)
+    details = []
+    for order_id in dict.fromkeys(order_ids):
+        order = by_id.get(order_id)
+        if order is None:
+            continue
+        history = sorted(order.order_status_history, key=lambda entry: entry.changed_at, reverse=True)
+        details.append(OrderDetail_Pydantic(
+            order=serialize(Order_Pydantic, order),
+            items=serialize_many(OrderItem_Pydantic, order.order_items),
+            price_calculations=serialize_many(PriceCalculation_Pydantic, order.price_calculations),
+            status_history=serialize_many(OrderStatusHistory_Pydantic, history),
+        ))
+    return details
 
 
-async def update_order(order_id: int, order_data: OrderIn_Pydantic) -> Order_Pydantic:
-    """Update an existing order."""
-    order = await Order.filter(order_id=order_id).first()
-    if not order:
+async def get_order_detail(order_id: int) -> OrderDetail_Pydantic:
+    """Get one order with all of its child collections."""
+    details = await get_order_details([order_id])
+    if not details:
         raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
+    return details[0]
+
+
+async def save_order_fields(order: Order, fields: Dict[str, Any], expected_version: Optional[int] = None) -> bool:
+    """
+    Write only the given fields of an order and bump its version in one UPDATE.
+
+    With expected_version the row is only written while it is still at that
+    version. The order instance is updated in place.
+
+    Returns:
+        False if nothing was written (the order changed or is gone)
+    """
+    now = timezone.now()
+    queryset = Order.filter(order_id=order.order_id)
+    if expected_version is not None:
+        queryset = queryset.filter(version=expected_version)
+    updated = await queryset.update(**fields, version=F("version") + 1, updated_at=now)
+    if not updated:
+        return False
+    order.update_from_dict({**fields, "updated_at": now})
+    order.version = (order.version if expected_version is None else expected_version) + 1
+    return True
+
+
+async def create_order(order_data: OrderIn_Pydantic) -> Order_Pydantic:
+    """Create a new order."""
+    order_dict = order_data.dict()
     
-    order_dict = order_data.dict(exclude_unset=True)
-    
-    # If status is changed, add to history
-    if 'status' in order_dict and order_dict['status'] != order.status:
-        # Create status history entry
+    async with outbox_transaction():
+        # Create the order
+        order = await Order.create(
+            **order_dict,
+            **status_change_fields(order_dict.get("status", OrderStatus.PENDING), timezone.now())
+        )
+        await update_rollups(added=[order_rollup(order)])
+        
+        # Create initial status history entry
         await OrderStatusHistory.create(
             order_id=order.order_id,
-            status=order_dict['status'],
-            changed_by=order_dict.get('customer_id', order.customer_id),
-            notes=f"Status changed to {order_dict['status']}"
+            status=OrderStatus.PENDING,
+            changed_by=order.customer_id,
+            notes="Order created"
+        )
+        
+        # Publish via the outbox
+        order_obj = serialize(Order_Pydantic, order)
+        await record_event(
+            message=order_obj.dict(),
+            message_type="order.created",
+            order_id=order.order_id
         )
     
-    # Update order
-    await order.update_from_dict(order_dict)
-    await order.save()
-    
-    # Publish to RabbitMQ
-    updated_order = await Order_Pydantic.from_tortoise_orm(order)
-    rabbit_client.publish_message(
-        message=updated_order.dict(),
-        message_type="order.updated"
-    )
+    return order_obj
+
+
+async def update_order(
+    order_id: int,
+    order_data: OrderIn_Pydantic,
+    expected_versions: Optional[Collection[int]] = None,
+) -> Order_Pydantic:
+    """
+    Update an existing order, writing only the fields that changed.
+
+    The UPDATE is conditional on the version that was read, so a concurrent
+    write is never overwritten; the update fails with 409 instead (412 when
+    expected_versions, e.g. from If-Match, were given). Without changes
+    nothing is written and no event is recorded.
+
+    Raises:
+        HTTPException: 404 if the order does not exist, 412 if it is not at
+            one of expected_versions, 409 if it changed during the update
+    """
+    async with outbox_transaction():
+        order = await Order.filter(order_id=order_id).first()
+        if not order:
+            raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
+        if expected_versions is not None and order.version not in expected_versions:
+            raise HTTPException(
+                status_code=412,
+                detail=f"Order {order_id} has changed (now at version {order.version})",
+                headers={"ETag": order_etag(order_id, order.version)},
+            )
+        
+        order_dict = order_data.dict(exclude_unset=True)
+        changes = {field: value for field, value in order_dict.items() if getattr(order, field) != value}
+        if not changes:
+            return serialize(Order_Pydantic, order)
+        
+        # If status is changed, add to history
+        if 'status' in changes:
+            # Create status history entry
+            history_entry = await OrderStatusHistory.create(
+                order_id=order.order_id,
+                status=changes['status'],
+                changed_by=order_dict.get('customer_id', order.customer_id),
+                notes=f"Status changed to {changes['status']}"
+            )
+            changes.update(status_change_fields(changes['status'], history_entry.changed_at))
+        
+        # Update order
+        before = order_rollup(order)
+        if not await save_order_fields(order, changes, expected_version=order.version):
+            raise HTTPException(
+                status_code=409 if expected_versions is None else 412,
+                detail=f"Order {order_id} was modified by another request, retry the update",
+            )
+        await update_rollups(removed=[before], added=[order_rollup(order)])
+        
+        # Publish via the outbox
+        updated_order = serialize(Order_Pydantic, order)
+        await record_event(
+            message=updated_order.dict(),
+            message_type="order.updated",
+            order_id=order_id
+        )
     
     return updated_order
 
 
 async def delete_order(order_id: int) -> bool:
     """Delete an order."""
-    order = await Order.filter(order_id=order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
-    
-    # Get order data before deletion for the message
-    order_obj = await Order_Pydantic.from_tortoise_orm(order)
-    
-    # Delete the order
-    await order.delete()
-    
-    # Publish to RabbitMQ
-    rabbit_client.publish_message(
-        message={"order_id": order_id, "details": order_obj.dict()},
-        message_type="order.deleted"
-    )
+    async with outbox_transaction():
+        # Locked, so the rollup removed is the order as last written
+        order = await Order.filter(order_id=order_id).select_for_update().first()
+        if not order:
+            raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
+        
+        # Get order data before deletion for the message
+        order_obj = serialize(Order_Pydantic, order)
+        
+        # Delete the order
+        await order.delete()
+        await update_rollups(removed=[order_rollup(order)])
+        
+        # Publish via the outbox
+        await record_event(
+            message={"order_id": order_id, "details": order_obj.dict()},
+            message_type="order.deleted",
+            order_id=order_id
+        )
     
-    return True
\ No newline at end of file
+    return True
@@ -1,24 +1,83 @@
-from typing import List
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, List, Optional
 from fastapi import HTTPException
+from tortoise import timezone
+from tortoise.expressions import F
+from tortoise.functions import Count, Sum
 from models.models import (
     Order,
     OrderItem,
     OrderItem_Pydantic,
     OrderItemIn_Pydantic
 )
-from utils.rabbit_utils import rabbit_client
+from config.settings import BULK_ITEMS_MAX
+from utils.outbox import outbox_transaction, record_event, record_events
+from utils.dimensions import measure_item
+from utils.rollups import add_order_revenue
+from controllers.order_controller import ensure_order_exists, order_filter_kwargs
+from utils.cache import get_or_load, order_key
+from utils.sequences import allocate_ids
+from utils.serializers import serialize, to_data, from_data
+
+
+def to_money(value) -> Decimal:
+    """Round a price to the 2 decimal places stored in the database."""
+    return Decimal(str(value)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+async def adjust_order_total(order_id: int, delta: Decimal) -> int:
+    """
+    Add delta to the order's total_price in a single UPDATE.
+
+    The arithmetic happens in the database, so concurrent item writers
+    cannot overwrite each other's changes. The order's version is bumped
+    and its rollup row gets the same delta.
+
+    Returns:
+        Number of orders updated (0 if the order does not exist)
+    """
+    updated = await Order.filter(order_id=order_id).update(
+        total_price=F("total_price") + delta,
+        version=F("version") + 1,
+        updated_at=timezone.now()
+    )
+    if updated:
+        await add_order_revenue(order_id, delta)
+    return updated
+
+
+async def items_total_delta(order_id: int, added: Decimal) -> Optional[Decimal]:
+    """
+    Get the total_price delta for adding items worth `added` to an order.
+
+    An order's total is the sum of its items: the first items replace the
+    total the order was created with, later ones add to it. The order row
+    is locked first, so concurrent first items cannot both replace it.
+    Call this in the transaction that inserts the items.
+
+    Returns:
+        The delta, or None if the order does not exist
+    """
+    order = await Order.filter(order_id=order_id).select_for_update().first()
+    if order is None:
+        return None
+    if await OrderItem.filter(order_id=order_id).exists():
+        return added
+    return added - to_money(order.total_price)
+
+
+async def _load_items(order_id: int) -> list:
+    items = await OrderItem.filter(order_id=order_id)
+    return [to_data(serialize(OrderItem_Pydantic, entry)) for entry in items]
 
 
 async def get_order_items(order_id: int) -> List[OrderItem_Pydantic]:
     """Get all items for a specific order."""
     # Check if order exists
-    order = await Order.filter(order_id=order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
+    await ensure_order_exists(order_id)
     
-    # Get items related to order
-    items = await OrderItem.filter(order_id=order_id)
-    return await OrderItem_Pydantic.from_queryset(OrderItem.filter(order_id=order_id))
+    data = await get_or_load(order_key(order_id, "items"), lambda: _load_items(order_id))
+    return [from_data(OrderItem_Pydantic, entry) for entry in data]
 
 
 async def get_order_item(order_id: int, item_id: int) -> OrderItem_Pydantic:
@@ -29,99 +88,195 @@ async def get_order_item(order_id: int, item_id: int) -> OrderItem_Pydantic:
             status_code=404, 
             detail=f"Item with ID {item_id} not found in order {order_id}"
         )
-    return await OrderItem_Pydantic.from_tortoise_orm(item)
+    return serialize(OrderItem_Pydantic, item)
 
 
 async def create_order_item(order_id: int, item_data: OrderItemIn_Pydantic) -> OrderItem_Pydantic:
     """Add a new item to an order."""
-    # Check if order exists
-    order = await Order.filter(order_id=order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
-    
     # Create item dict and set the order_id
     item_dict = item_data.dict()
     item_dict["order_id"] = order_id
+    item_dict["item_price"] = to_money(item_dict["item_price"])
+    item_dict.update(measure_item(item_dict["dimensions_cm"], item_dict["weight_kg"]))
     
-    # Create the item
-    item = await OrderItem.create(**item_dict)
-    
-    # Recalculate order total price (sum of all items)
-    all_items = await OrderItem.filter(order_id=order_id)
-    total_price = sum(float(item.item_price) for item in all_items)
-    await order.update_from_dict({"total_price": total_price})
-    await order.save()
-    
-    # Publish to RabbitMQ
-    item_obj = await OrderItem_Pydantic.from_tortoise_orm(item)
-    rabbit_client.publish_message(
-        message=item_obj.dict(),
-        message_type="order_item.created"
-    )
+    async with outbox_transaction():
+        # Add the item price to the order total, this also checks the order exists
+        delta = await items_total_delta(order_id, item_dict["item_price"])
+        if delta is None:
+            raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
+        await adjust_order_total(order_id, delta)
+        
+        # Create the item
+        item = await OrderItem.create(**item_dict)
+        
+        # Publish via the outbox
+        item_obj = serialize(OrderItem_Pydantic, item)
+        await record_event(
+            message=item_obj.dict(),
+            message_type="order_item.created",
+            order_id=order_id
+        )
     
-    return await OrderItem_Pydantic.from_tortoise_orm(item)
+    return serialize(OrderItem_Pydantic, item)
 
 
-async def update_order_item(order_id: int, item_id: int, item_data: OrderItemIn_Pydantic) -> OrderItem_Pydantic:
-    """Update an existing item in an order."""
-    # Check if item exists
-    item = await OrderItem.filter(order_id=order_id, item_id=item_id).first()
-    if not item:
+async def create_order_items_bulk(order_id: int, items_data: List[OrderItemIn_Pydantic]) -> Dict[str, Any]:
+    """
+    Add many items to an order with one insert batch and one total update.
+
+    Each item gets the same order_item.created event as a single insert.
+    The response lists the new item IDs, in input order.
+    """
+    if not items_data:
+        raise HTTPException(status_code=400, detail="No items provided")
+    if len(items_data) > BULK_ITEMS_MAX:
         raise HTTPException(
-            status_code=404, 
-            detail=f"Item with ID {item_id} not found in order {order_id}"
+            status_code=413,
+            detail=f"Too many items: {len(items_data)}. Maximum per request is {BULK_ITEMS_MAX}"
         )
     
-    # Update the item
-    item_dict = item_data.dict(exclude_unset=True)
-    await item.update_from_dict(item_dict)
-    await item.save()
+    item_dicts = []
+    for item_data in items_data:
+        item_dict = item_data.dict()
+        item_dict["item_price"] = to_money(item_dict["item_price"])
+        item_dict.update(measure_item(item_dict["dimensions_cm"], item_dict["weight_kg"]))
+        item_dicts.append(item_dict)
+    total_added = sum((item_dict["item_price"] for item_dict in item_dicts), Decimal("0"))
     
-    # If price changed, recalculate order total price
-    if "item_price" in item_dict:
-        order = await Order.filter(order_id=order_id).first()
-        all_items = await OrderItem.filter(order_id=order_id)
-        total_price = sum(float(item.item_price) for item in all_items)
-        await order.update_from_dict({"total_price": total_price})
-        await order.save()
+    async with outbox_transaction() as connection:
+        # Add all item prices to the order total, this also checks the order exists
+        delta = await items_total_delta(order_id, total_added)
+        if delta is None:
+            raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
+        await adjust_order_total(order_id, delta)
+        
+        # Insert all items in batched statements, with their IDs reserved up front
+        item_ids = await allocate_ids(connection, OrderItem, len(item_dicts))
+        items = [
+            OrderItem(item_id=item_id, order_id=order_id, **item_dict)
+            for item_id, item_dict in zip(item_ids, item_dicts)
+        ]
+        await OrderItem.bulk_create(items, batch_size=500)
+        
+        # Publish via the outbox, one event per item
+        await record_events([
+            (serialize(OrderItem_Pydantic, item).dict(), "order_item.created", order_id)
+            for item in items
+        ])
     
-    # Publish to RabbitMQ
-    item_obj = await OrderItem_Pydantic.from_tortoise_orm(item)
-    rabbit_client.publish_message(
-        message=item_obj.dict(),
-        message_type="order_item.updated"
-    )
+    return {
+        "order_id": order_id,
+        "created": len(item_ids),
+        "item_ids": item_ids,
+        "total_price_added": total_added,
+    }
+
+
+async def update_order_item(order_id: int, item_id: int, item_data: OrderItemIn_Pydantic) -> OrderItem_Pydantic:
+    """Update an existing item in an order."""
+    async with outbox_transaction():
+        # Check if item exists, locking it so concurrent writes see its current price
+        item = await OrderItem.filter(order_id=order_id, item_id=item_id).select_for_update().first()
+        if not item:
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Item with ID {item_id} not found in order {order_id}"
+            )
+        
+        # Update the item
+        item_dict = item_data.dict(exclude_unset=True)
+        old_price = item.item_price
+        if "item_price" in item_dict:
+            item_dict["item_price"] = to_money(item_dict["item_price"])
+        if "dimensions_cm" in item_dict or "weight_kg" in item_dict:
+            item_dict.update(measure_item(
+                item_dict.get("dimensions_cm", item.dimensions_cm),
+                item_dict.get("weight_kg", item.weight_kg),
+            ))
+        await item.update_from_dict(item_dict)
+        await item.save()
+        
+        # If price changed, apply the difference to the order total
+        if "item_price" in item_dict and item_dict["item_price"] != old_price:
+            await adjust_order_total(order_id, item_dict["item_price"] - old_price)
+        
+        # Publish via the outbox
+        item_obj = serialize(OrderItem_Pydantic, item)
+        await record_event(
+            message=item_obj.dict(),
+            message_type="order_item.updated",
+            order_id=order_id
+        )
     
-    return await OrderItem_Pydantic.from_tortoise_orm(item)
+    return item_obj
 
 
 async def delete_order_item(order_id: int, item_id: int) -> bool:
     """Delete an item from an order."""
-    # Check if item exists
-    item = await OrderItem.filter(order_id=order_id, item_id=item_id).first()
-    if not item:
-        raise HTTPException(
-            status_code=404, 
-            detail=f"Item with ID {item_id} not found in order {order_id}"
+    async with outbox_transaction():
+        # Check if item exists, locking it so concurrent writes see its current price
+        item = await OrderItem.filter(order_id=order_id, item_id=item_id).select_for_update().first()
+        if not item:
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Item with ID {item_id} not found in order {order_id}"
+            )
+        
+        # Get item data before deletion for the message
+        item_obj = serialize(OrderItem_Pydantic, item)
+        
+        # Delete the item
+        await item.delete()
+        
+        # Remove the item price from the order total
+        await adjust_order_total(order_id, -item.item_price)
+        
+        # Publish via the outbox
+        await record_event(
+            message={"item_id": item_id, "order_id": order_id, "details": item_obj.dict()},
+            message_type="order_item.deleted",
+            order_id=order_id
         )
     
-    # Get item data before deletion for the message
-    item_obj = await OrderItem_Pydantic.from_tortoise_orm(item)
-    
-    # Delete the item
-    await item.delete()
-    
-    # Recalculate order total price
-    order = await Order.filter(order_id=order_id).first()
-    all_items = await OrderItem.filter(order_id=order_id)
-    total_price = sum(float(item.item_price) for item in all_items)
-    await order.update_from_dict({"total_price": total_price})
-    await order.save()
-    
-    # Publish to RabbitMQ
-    rabbit_client.publish_message(
-        message={"item_id": item_id, "order_id": order_id, "details": item_obj.dict()},
-        message_type="order_item.deleted"
+    return True
+
+
+async def get_load_summary(
+    order_ids: Optional[List[int]] = None,
+    limit: int = 10000,
+    **filters
+) -> List[Dict[str, Any]]:
+    """
+    Get item count, weight and volume totals per order, aggregated in SQL.
+
+    Orders are selected by ID and/or the order list filters and returned by
+    order_id. measured_items counts the items with numeric dimensions (items
+    written before they existed have none until backfilled).
+    """
+    queryset = OrderItem.filter(**{f"order__{key}": value for key, value in order_filter_kwargs(**filters).items()})
+    if order_ids is not None:
+        queryset = queryset.filter(order_id__in=order_ids)
+    rows = await (
+        queryset.annotate(
+            item_count=Count("item_id"),
+            measured_items=Count("volume_cm3"),
+            total_weight_kg=Sum("weight_kg"),
+            total_volume_cm3=Sum("volume_cm3"),
+            total_chargeable_weight_kg=Sum("chargeable_weight_kg"),
+        )
+        .group_by("order_id")
+        .order_by("order_id")
+        .limit(limit)
+        .values(
+            "order_id",
+            "item_count",
+            "measured_items",
+            "total_weight_kg",
+            "total_volume_cm3",
+            "total_chargeable_weight_kg",
+        )
     )
-    
-    return True
\ No newline at end of file
+    for row in rows:
+        for field in ("total_weight_kg", "total_volume_cm3", "total_chargeable_weight_kg"):
+            row[field] = to_money(row[field] or 0)
+    return rows
@@ -1,23 +1,44 @@
-from typing import List
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Dict, List, Sequence
 from fastapi import HTTPException
+from pydantic import ValidationError
+from tortoise import timezone
+from tortoise.expressions import F
+from config.settings import PRICE_BATCH_MAX
 from models.models import (
     Order,
+    OrderItem,
     PriceCalculation,
     PriceCalculation_Pydantic,
-    PriceCalculationIn_Pydantic
+    PriceCalculationIn_Pydantic,
+    PriceQuoteIn_Pydantic,
+    PriceCalculationBulkIn_Pydantic,
+    TariffQuoteIn_Pydantic,
+    TariffPriceIn_Pydantic
 )
-from utils.rabbit_utils import rabbit_client
+from utils.outbox import outbox_transaction, record_event, record_events
+from utils.rollups import order_rollup, update_rollups
+from utils.pricing import calculate_final_price, quote_prices, quote_cents, to_hundredths
+from utils.tariffs import tariffs, factor_to_decimal
+from controllers.order_controller import ensure_order_exists, save_order_fields
+from utils.cache import get_or_load, order_key
+from utils.serializers import serialize, to_data, from_data
+from utils.validators import check_max_digits, validation_messages
+
+
+async def _load_prices(order_id: int) -> list:
+    calculations = await PriceCalculation.filter(order_id=order_id)
+    return [to_data(serialize(PriceCalculation_Pydantic, entry)) for entry in calculations]
 
 
 async def get_price_calculations(order_id: int) -> List[PriceCalculation_Pydantic]:
     """Get all price calculations for a specific order."""
     # Check if order exists
-    order = await Order.filter(order_id=order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
+    await ensure_order_exists(order_id)
     
-    calculations = await PriceCalculation.filter(order_id=order_id)
-    return await PriceCalculation_Pydantic.from_queryset(PriceCalculation.filter(order_id=order_id))
+    data = await get_or_load(order_key(order_id, "prices"), lambda: _load_prices(order_id))
+    return [from_data(PriceCalculation_Pydantic, entry) for entry in data]
 
 
 async def get_price_calculation(order_id: int, calculation_id: int) -> PriceCalculation_Pydantic:
@@ -28,45 +49,221 @@ async def get_price_calculation(order_id: int, calculation_id: int) -> PriceCalc
             status_code=404, 
             detail=f"Price calculation with ID {calculation_id} not found for order {order_id}"
         )
-    return await PriceCalculation_Pydantic.from_tortoise_orm(calculation)
+    return serialize(PriceCalculation_Pydantic, calculation)
+
+
+def _check_final_prices(final_prices: Sequence[Decimal]):
+    """Raise 422 unless every computed final price fits the DECIMAL(10,2) column."""
+    for index, final_price in enumerate(final_prices):
+        try:
+            check_max_digits(final_price, 10)
+        except ValueError as e:
+            at = f" of calculation {index}" if len(final_prices) > 1 else ""
+            raise HTTPException(status_code=422, detail=f"Final price{at} {final_price} is out of range: {e}")
 
 
 async def create_price_calculation(order_id: int, calculation_data: PriceCalculationIn_Pydantic) -> PriceCalculation_Pydantic:
     """Create a new price calculation for an order."""
-    # Check if order exists
-    order = await Order.filter(order_id=order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
-    
-    # Create calculation dict and set the order_id
-    calculation_dict = calculation_data.dict()
-    calculation_dict["order_id"] = order_id
+    async with outbox_transaction():
+        # Check if order exists, locking it so its rollup reflects concurrent writes
+        order = await Order.filter(order_id=order_id).select_for_update().first()
+        if not order:
+            raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
+        
+        # Create calculation dict and set the order_id
+        calculation_dict = calculation_data.dict()
+        calculation_dict["order_id"] = order_id
+        
+        # Ensure the final price is calculated
+        if "final_price" not in calculation_dict:
+            calculation_dict["final_price"] = calculate_final_price(
+                calculation_dict["base_price"],
+                calculation_dict["distance_factor"],
+                calculation_dict["weight_factor"],
+                calculation_dict["urgency_factor"],
+            )
+            _check_final_prices([calculation_dict["final_price"]])
+        
+        # Create the calculation
+        calculation = await PriceCalculation.create(**calculation_dict)
+        
+        # Update order total price with latest calculation
+        before = order_rollup(order)
+        await save_order_fields(order, {"total_price": calculation_dict["final_price"]})
+        await update_rollups(removed=[before], added=[order_rollup(order)])
+        
+        # Publish via the outbox
+        calculation_obj = serialize(PriceCalculation_Pydantic, calculation)
+        await record_event(
+            message=calculation_obj.dict(),
+            message_type="price_calculation.created",
+            order_id=order_id
+        )
     
-    # Ensure the final price is calculated
-    if "final_price" not in calculation_dict:
-        base_price = float(calculation_dict["base_price"])
-        distance_factor = float(calculation_dict["distance_factor"])
-        weight_factor = float(calculation_dict["weight_factor"])
-        urgency_factor = float(calculation_dict["urgency_factor"])
-        
-        final_price = base_price * (1 + distance_factor + weight_factor + urgency_factor)
-        calculation_dict["final_price"] = round(final_price, 2)
+    return calculation_obj
+
+
+def _check_batch_size(count: int):
+    if not count:
+        raise HTTPException(status_code=400, detail="No quotes provided")
+    if count > PRICE_BATCH_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many quotes: {count}. Maximum per request is {PRICE_BATCH_MAX}"
+        )
+
+
+def _price_batch(quotes: List[PriceQuoteIn_Pydantic]) -> List[Decimal]:
+    return quote_prices(
+        [quote.base_price for quote in quotes],
+        [quote.distance_factor for quote in quotes],
+        [quote.weight_factor for quote in quotes],
+        [quote.urgency_factor for quote in quotes],
+    )
+
+
+async def quote_price_batch(quotes: List[PriceQuoteIn_Pydantic]) -> Dict[str, Any]:
+    """Price many quotes at once without storing them."""
+    _check_batch_size(len(quotes))
+    final_prices = _price_batch(quotes)
+    return {"count": len(final_prices), "final_prices": final_prices}
+
+
+async def create_price_calculations_bulk(calculations: List[PriceCalculationBulkIn_Pydantic]) -> Dict[str, Any]:
+    """
+    Price and store calculations for many orders at once.
+
+    Like create_price_calculation, each order's total price becomes the final
+    price of its (last) calculation in the batch.
+    """
+    _check_batch_size(len(calculations))
+    final_prices = _price_batch(calculations)
+    _check_final_prices(final_prices)
     
-    # Create the calculation
-    calculation = await PriceCalculation.create(**calculation_dict)
+    order_ids = {calculation.order_id for calculation in calculations}
+    async with outbox_transaction():
+        # Check all orders exist with one query, locking them (in id order, so
+        # concurrent batches do not deadlock) for their rollups
+        existing = {
+            order.order_id: order
+            for order in await Order.filter(order_id__in=order_ids).select_for_update().order_by("order_id")
+        }
+        missing = sorted(order_ids - set(existing))
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Orders not found: {missing}")
+        
+        calculation_dicts = []
+        for calculation, final_price in zip(calculations, final_prices):
+            calculation_dict = calculation.dict()
+            calculation_dict["final_price"] = final_price
+            calculation_dicts.append(calculation_dict)
+        
+        # Insert all calculations in batched statements
+        await PriceCalculation.bulk_create(
+            [PriceCalculation(**calculation_dict) for calculation_dict in calculation_dicts],
+            batch_size=500
+        )
+        
+        # Update order totals, one statement per distinct price
+        latest_prices = {calculation_dict["order_id"]: calculation_dict["final_price"] for calculation_dict in calculation_dicts}
+        orders_by_price = defaultdict(list)
+        for order_id, final_price in latest_prices.items():
+            orders_by_price[final_price].append(order_id)
+        now = timezone.now()
+        for final_price, price_order_ids in orders_by_price.items():
+            await Order.filter(order_id__in=price_order_ids).update(
+                total_price=final_price, version=F("version") + 1, updated_at=now
+            )
+        removed = [order_rollup(existing[order_id]) for order_id in latest_prices]
+        for order_id, final_price in latest_prices.items():
+            existing[order_id].total_price = final_price
+        await update_rollups(removed=removed, added=[order_rollup(existing[order_id]) for order_id in latest_prices])
+        
+        # Publish one event per order via the outbox
+        calculations_by_order = defaultdict(list)
+        for calculation_dict in calculation_dicts:
+            calculations_by_order[calculation_dict["order_id"]].append(calculation_dict)
+        await record_events([
+            ({"order_id": order_id, "calculations": order_calculations}, "price_calculation.created", order_id)
+            for order_id, order_calculations in calculations_by_order.items()
+        ])
     
-    # Update order total price with latest calculation
-    await order.update_from_dict({"total_price": calculation_dict["final_price"]})
-    await order.save()
+    return {"created": len(calculation_dicts), "orders_updated": len(latest_prices), "final_prices": final_prices}
+
+
+async def quote_tariff_batch(quotes: List[TariffQuoteIn_Pydantic]) -> Dict[str, Any]:
+    """Price many quotes from the current tariff tables without storing them."""
+    _check_batch_size(len(quotes))
+    table = tariffs.current()
+    try:
+        distance_factors, weight_factors, urgency_factors = table.factors(
+            [quote.distance_km for quote in quotes],
+            [quote.weight_kg for quote in quotes],
+            [quote.cargo_type for quote in quotes],
+            [quote.urgency for quote in quotes],
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Publish to RabbitMQ
-    calculation_obj = await PriceCalculation_Pydantic.from_tortoise_orm(calculation)
-    rabbit_client.publish_message(
-        message=calculation_obj.dict(),
-        message_type="price_calculation.created"
+    final_cents = quote_cents(
+        to_hundredths([quote.base_price for quote in quotes]),
+        distance_factors,
+        weight_factors,
+        urgency_factors,
     )
+    return {
+        "tariff_version": table.version,
+        "count": len(quotes),
+        "quotes": [
+            {
+                "distance_factor": factor_to_decimal(distance),
+                "weight_factor": factor_to_decimal(weight),
+                "urgency_factor": factor_to_decimal(urgency),
+                "final_price": factor_to_decimal(cents),
+            }
+            for distance, weight, urgency, cents in zip(
+                distance_factors.tolist(), weight_factors.tolist(), urgency_factors.tolist(), final_cents.tolist()
+            )
+        ],
+    }
+
+
+async def create_tariff_price_calculation(order_id: int, tariff_data: TariffPriceIn_Pydantic) -> PriceCalculation_Pydantic:
+    """
+    Price an order from the current tariff tables and store the calculation.
+
+    The weight break uses the total weight of the order's items and the
+    highest cargo surcharge among them. The base price defaults to the sum
+    of the item prices.
+    """
+    await ensure_order_exists(order_id)
+    items = await OrderItem.filter(order_id=order_id).values("weight_kg", "cargo_type", "item_price")
+    base_price = tariff_data.base_price
+    if base_price is None:
+        if not items:
+            raise HTTPException(status_code=400, detail=f"Order {order_id} has no items to take a base price from")
+        base_price = sum((Decimal(str(item["item_price"])) for item in items), Decimal("0"))
+    
+    table = tariffs.current()
+    total_weight = float(sum(Decimal(str(item["weight_kg"])) for item in items))
+    cargo_type = max((item["cargo_type"] for item in items), key=table.cargo_surcharge, default=None)
+    try:
+        urgency_factor = table.urgency_factor(tariff_data.urgency)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return await PriceCalculation_Pydantic.from_tortoise_orm(calculation)
+    factors = {
+        "base_price": base_price,
+        "distance_factor": factor_to_decimal(table.distance_factor(tariff_data.distance_km)),
+        "weight_factor": factor_to_decimal(table.weight_factor(total_weight, cargo_type)),
+        "urgency_factor": factor_to_decimal(urgency_factor),
+    }
+    # The item sum, tariff factors and final price can all be out of range
+    try:
+        calculation = PriceCalculationIn_Pydantic(**factors, final_price=calculate_final_price(*factors.values()))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=validation_messages(e))
+    return await create_price_calculation(order_id, calculation)
 
 
 async def update_price_calculation(
@@ -75,78 +272,79 @@ async def update_price_calculation(
     calculation_data: PriceCalculationIn_Pydantic
 ) -> PriceCalculation_Pydantic:
     """Update an existing price calculation."""
-    # Check if calculation exists
-    calculation = await PriceCalculation.filter(order_id=order_id, calculation_id=calculation_id).first()
-    if not calculation:
-        raise HTTPException(
-            status_code=404, 
-            detail=f"Price calculation with ID {calculation_id} not found for order {order_id}"
+    async with outbox_transaction():
+        # Check if calculation exists
+        calculation = await PriceCalculation.filter(order_id=order_id, calculation_id=calculation_id).first()
+        if not calculation:
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Price calculation with ID {calculation_id} not found for order {order_id}"
+            )
+        
+        # Update the calculation
+        calculation_dict = calculation_data.dict(exclude_unset=True)
+        
+        # If any price factors are updated, recalculate final price
+        recalculate_price = False
+        price_factors = ["base_price", "distance_factor", "weight_factor", "urgency_factor"]
+        
+        if any(factor in calculation_dict for factor in price_factors):
+            recalculate_price = True
+        
+        if recalculate_price:
+            # Recalculate with the current values for any factors not in the update
+            calculation_dict["final_price"] = calculate_final_price(
+                *(calculation_dict.get(factor, getattr(calculation, factor)) for factor in price_factors)
+            )
+            _check_final_prices([calculation_dict["final_price"]])
+        
+        await calculation.update_from_dict(calculation_dict)
+        await calculation.save()
+        
+        # Update order total price if the final price changed
+        if "final_price" in calculation_dict:
+            order = await Order.filter(order_id=order_id).select_for_update().first()
+            before = order_rollup(order)
+            await save_order_fields(order, {"total_price": calculation_dict["final_price"]})
+            await update_rollups(removed=[before], added=[order_rollup(order)])
+        
+        # Publish via the outbox
+        calculation_obj = serialize(PriceCalculation_Pydantic, calculation)
+        await record_event(
+            message=calculation_obj.dict(),
+            message_type="price_calculation.updated",
+            order_id=order_id
         )
     
-    # Update the calculation
-    calculation_dict = calculation_data.dict(exclude_unset=True)
-    
-    # If any price factors are updated, recalculate final price
-    recalculate_price = False
-    price_factors = ["base_price", "distance_factor", "weight_factor", "urgency_factor"]
-    
-    if any(factor in calculation_dict for factor in price_factors):
-        recalculate_price = True
-    
-    if recalculate_price:
-        # Get the current values for any factors not in the update
-        base_price = calculation_dict.get("base_price", calculation.base_price)
-        distance_factor = calculation_dict.get("distance_factor", calculation.distance_factor)
-        weight_factor = calculation_dict.get("weight_factor", calculation.weight_factor)
-        urgency_factor = calculation_dict.get("urgency_factor", calculation.urgency_factor)
-        
-        # Recalculate final price
-        final_price = float(base_price) * (1 + float(distance_factor) + float(weight_factor) + float(urgency_factor))
-        calculation_dict["final_price"] = round(final_price, 2)
-    
-    await calculation.update_from_dict(calculation_dict)
-    await calculation.save()
-    
-    # Update order total price if the final price changed
-    if "final_price" in calculation_dict:
-        order = await Order.filter(order_id=order_id).first()
-        await order.update_from_dict({"total_price": calculation_dict["final_price"]})
-        await order.save()
-    
-    # Publish to RabbitMQ
-    calculation_obj = await PriceCalculation_Pydantic.from_tortoise_orm(calculation)
-    rabbit_client.publish_message(
-        message=calculation_obj.dict(),
-        message_type="price_calculation.updated"
-    )
-    
-    return await PriceCalculation_Pydantic.from_tortoise_orm(calculation)
+    return calculation_obj
 
 
 async def delete_price_calculation(order_id: int, calculation_id: int) -> bool:
     """Delete a price calculation."""
-    # Check if calculation exists
-    calculation = await PriceCalculation.filter(order_id=order_id, calculation_id=calculation_id).first()
-    if not calculation:
-        raise HTTPException(
-            status_code=404, 
-            detail=f"Price calculation with ID {calculation_id} not found for order {order_id}"
+    async with outbox_transaction():
+        # Check if calculation exists
+        calculation = await PriceCalculation.filter(order_id=order_id, calculation_id=calculation_id).first()
+        if not calculation:
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Price calculation with ID {calculation_id} not found for order {order_id}"
+            )
+        
+        # Get calculation data before deletion for the message
+        calculation_obj = serialize(PriceCalculation_Pydantic, calculation)
+        
+        # Delete the calculation
+        await calculation.delete()
+        
+        # Publish via the outbox
+        await record_event(
+            message={
+                "calculation_id": calculation_id, 
+                "order_id": order_id, 
+                "details": calculation_obj.dict()
+            },
+            message_type="price_calculation.deleted",
+            order_id=order_id
         )
     
-    # Get calculation data before deletion for the message
-    calculation_obj = await PriceCalculation_Pydantic.from_tortoise_orm(calculation)
-    
-    # Delete the calculation
-    await calculation.delete()
-    
-    # Publish to RabbitMQ
-    rabbit_client.publish_message(
-        message={
-            "calculation_id": calculation_id, 
-            "order_id": order_id, 
-            "details": calculation_obj.dict()
-        },
-        message_type="price_calculation.deleted"
-    )
-    
-    return True
\ No newline at end of file
+    return True
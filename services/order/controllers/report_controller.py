@@ -0,0 +1,294 @@
+import json
+from decimal import Decimal, ROUND_HALF_UP
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from tortoise import Tortoise
+
+from config.settings import REPORT_CACHE_TTL
+from models.models import Order, OrderStatus
+from controllers.order_controller import order_filter_kwargs
+from utils.cache import cache
+from utils.serializers import to_data
+
+REPORT_BUCKETS = ("day", "week", "month")
+
+CENT = Decimal("0.01")
+
+# Date bucket expressions per dialect; buckets are labelled by their first day
+_BUCKET_SQL = {
+    "postgres": {
+        "day": "CAST(date_trunc('day', {column}) AS DATE)",
+        "week": "CAST(date_trunc('week', {column}) AS DATE)",
+        "month": "CAST(date_trunc('month', {column}) AS DATE)",
+    },
+    "sqlite": {
+        "day": "date({column})",
+        # Weeks start on Monday, as with date_trunc
+        "week": "date({column}, 'weekday 0', '-6 days')",
+        "month": "strftime('%Y-%m-01', {column})",
+    },
+}
+
+_LOOKUP_OPERATORS = {"gte": ">=", "lte": "<=", "lt": "<", "gt": ">"}
+
+
+class _ReportQuery:
+    """Collects query parameters in the placeholder style of the connection."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.dialect = "postgres" if connection.capabilities.dialect == "postgres" else "sqlite"
+        self.params: List[Any] = []
+
+    def param(self, value: Any) -> str:
+        self.params.append(value)
+        return f"${len(self.params)}" if self.dialect == "postgres" else "?"
+
+    def bucket(self, bucket: str, column: str) -> str:
+        return _BUCKET_SQL[self.dialect][bucket].format(column=column)
+
+    def where(self, filters: Dict[str, Any], alias: str = "o") -> str:
+        """Render the order list filters as a WHERE clause on the orders table."""
+        conditions = []
+        for lookup, value in order_filter_kwargs(**filters).items():
+            field_name, _, operator = lookup.partition("__")
+            field = Order._meta.fields_map[field_name]
+            value = field.to_db_value(value, Order)
+            conditions.append(f"{alias}.{field_name} {_LOOKUP_OPERATORS.get(operator, '=')} {self.param(value)}")
+        return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    async def fetch(self, sql: str) -> List[Dict[str, Any]]:
+        return await self.connection.execute_query_dict(sql, self.params)
+
+
+def _check_bucket(bucket: str):
+    if bucket not in REPORT_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Invalid bucket: {bucket}. Expected one of {list(REPORT_BUCKETS)}")
+
+
+def _money(value) -> Decimal:
+    return Decimal(str(value or 0)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _ratio(numerator, denominator) -> Optional[float]:
+    return round(numerator / denominator, 4) if denominator else None
+
+
+async def cached_report(
+    name: str,
+    options: Dict[str, Any],
+    loader: Callable[[], Awaitable[List[Dict[str, Any]]]],
+) -> Any:
+    """
+    Return a report from the cache, computing it on a miss.
+
+    Results are cached for REPORT_CACHE_TTL seconds per report and option
+    set. They are not invalidated by writes, so a report may lag behind by
+    up to that window.
+    """
+    key = f"report:{name}:{json.dumps(options, sort_keys=True, default=str)}"
+    rows = await cache.get(key)
+    if rows is None:
+        rows = to_data(await loader())
+        await cache.set(key, rows, ttl=REPORT_CACHE_TTL)
+    return rows
+
+
+async def _order_report(bucket: str, by_status: bool, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    query = _ReportQuery(Tortoise.get_connection("default"))
+    status_column = ", o.status AS status" if by_status else ""
+    group_by = "bucket, status" if by_status else "bucket"
+    rows = await query.fetch(f"""
+        WITH filtered AS (
+            SELECT o.order_id, o.total_price, {query.bucket(bucket, "o.created_at")} AS bucket{status_column}
+            FROM orders o
+            {query.where(filters)}
+        ),
+        item_counts AS (
+            SELECT i.order_id, COUNT(*) AS item_count
+            FROM order_items i
+            JOIN filtered f ON f.order_id = i.order_id
+            GROUP BY i.order_id
+        )
+        SELECT f.bucket{", f.status" if by_status else ""},
+            COUNT(*) AS order_count,
+            SUM(f.total_price) AS revenue,
+            AVG(COALESCE(c.item_count, 0)) AS avg_items
+        FROM filtered f
+        LEFT JOIN item_counts c ON c.order_id = f.order_id
+        GROUP BY {group_by}
+        ORDER BY {group_by}
+    """)
+    for row in rows:
+        row["revenue"] = _money(row["revenue"])
+        row["avg_items"] = round(float(row["avg_items"]), 2)
+    return rows
+
+
+async def get_order_report(bucket: str = "day", by_status: bool = False, **filters) -> List[Dict[str, Any]]:
+    """
+    Get order count, revenue (sum of total_price) and average items per
+    order for each creation date bucket, optionally split by status.
+    """
+    _check_bucket(bucket)
+    return await cached_report(
+        "orders",
+        {"bucket": bucket, "by_status": by_status, **filters},
+        lambda: _order_report(bucket, by_status, filters),
+    )
+
+
+async def _status_report(filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    query = _ReportQuery(Tortoise.get_connection("default"))
+    rows = await query.fetch(f"""
+        SELECT o.status AS status, COUNT(*) AS order_count, SUM(o.total_price) AS revenue
+        FROM orders o
+        {query.where(filters)}
+        GROUP BY o.status
+        ORDER BY o.status
+    """)
+    total = sum(row["order_count"] for row in rows)
+    for row in rows:
+        row["revenue"] = _money(row["revenue"])
+        row["share"] = _ratio(row["order_count"], total)
+    return rows
+
+
+async def get_status_report(**filters) -> List[Dict[str, Any]]:
+    """Get order count, revenue and share of all orders per status."""
+    return await cached_report("status", filters, lambda: _status_report(filters))
+
+
+async def _customer_report(limit: int, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    query = _ReportQuery(Tortoise.get_connection("default"))
+    where = query.where(filters)
+    rows = await query.fetch(f"""
+        SELECT o.customer_id AS customer_id,
+            COUNT(*) AS order_count,
+            SUM(o.total_price) AS revenue,
+            MIN(o.created_at) AS first_order_at,
+            MAX(o.created_at) AS last_order_at
+        FROM orders o
+        {where}
+        GROUP BY o.customer_id
+        ORDER BY revenue DESC, o.customer_id
+        LIMIT {query.param(limit)}
+    """)
+    for row in rows:
+        row["revenue"] = _money(row["revenue"])
+    return rows
+
+
+async def get_customer_report(limit: int = 100, **filters) -> List[Dict[str, Any]]:
+    """Get order count, revenue and first/last order time for the top customers by revenue."""
+    return await cached_report(
+        "customers",
+        {"limit": limit, **filters},
+        lambda: _customer_report(limit, filters),
+    )
+
+
+async def _on_time_report(bucket: str, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    query = _ReportQuery(Tortoise.get_connection("default"))
+    delivered_status = query.param(OrderStatus.DELIVERED.value)
+    rows = await query.fetch(f"""
+        WITH delivered AS (
+            SELECT h.order_id, MIN(h.changed_at) AS delivered_at
+            FROM order_status_history h
+            WHERE h.status = {delivered_status}
+            GROUP BY h.order_id
+        )
+        SELECT {query.bucket(bucket, "d.delivered_at")} AS bucket,
+            COUNT(*) AS delivered,
+            SUM(CASE WHEN {query.bucket("day", "d.delivered_at")} <= o.delivery_deadline THEN 1 ELSE 0 END) AS on_time
+        FROM orders o
+        JOIN delivered d ON d.order_id = o.order_id
+        {query.where(filters)}
+        GROUP BY bucket
+        ORDER BY bucket
+    """)
+    for row in rows:
+        row["on_time"] = int(row["on_time"])
+        row["late"] = row["delivered"] - row["on_time"]
+        row["on_time_ratio"] = _ratio(row["on_time"], row["delivered"])
+    return rows
+
+
+async def get_on_time_report(bucket: str = "day", **filters) -> List[Dict[str, Any]]:
+    """
+    Get delivered, on-time and late order counts per delivery date bucket.
+
+    An order is delivered when it first entered the delivered status (per
+    its status history), and on time if that was no later than its
+    delivery_deadline.
+    """
+    _check_bucket(bucket)
+    return await cached_report(
+        "on-time",
+        {"bucket": bucket, **filters},
+        lambda: _on_time_report(bucket, filters),
+    )
+
+
+async def _daily_report(
+    bucket: str,
+    by_status: bool,
+    day_from: Optional[date],
+    day_to: Optional[date],
+    status: Optional[OrderStatus],
+    customer_id: Optional[int],
+) -> List[Dict[str, Any]]:
+    query = _ReportQuery(Tortoise.get_connection("default"))
+    conditions = []
+    if day_from:
+        conditions.append(f"r.day >= {query.param(day_from)}")
+    if day_to:
+        conditions.append(f"r.day <= {query.param(day_to)}")
+    if status:
+        conditions.append(f"r.status = {query.param(OrderStatus(status).value)}")
+    if customer_id is not None:
+        conditions.append(f"r.customer_id = {query.param(customer_id)}")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    group_by = "bucket, status" if by_status else "bucket"
+    rows = await query.fetch(f"""
+        SELECT {query.bucket(bucket, "r.day")} AS bucket{", r.status AS status" if by_status else ""},
+            SUM(r.order_count) AS order_count,
+            SUM(r.revenue) AS revenue
+        FROM order_daily_rollups r
+        {where}
+        GROUP BY {group_by}
+        HAVING SUM(r.order_count) > 0
+        ORDER BY {group_by}
+    """)
+    for row in rows:
+        row["order_count"] = int(row["order_count"])
+        row["revenue"] = _money(row["revenue"])
+    return rows
+
+
+async def get_daily_report(
+    bucket: str = "day",
+    by_status: bool = False,
+    day_from: Optional[date] = None,
+    day_to: Optional[date] = None,
+    status: Optional[OrderStatus] = None,
+    customer_id: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Get order count and revenue per creation date bucket from the daily rollups.
+
+    Reads one row per day, status and customer (see utils.rollups) instead
+    of the orders themselves, so it stays fast however many orders there are.
+    """
+    _check_bucket(bucket)
+    options = {
+        "bucket": bucket,
+        "by_status": by_status,
+        "day_from": day_from,
+        "day_to": day_to,
+        "status": status,
+        "customer_id": customer_id,
+    }
+    return await cached_report("daily", options, lambda: _daily_report(**options))
@@ -1,25 +1,61 @@
-from typing import List
+from typing import Dict, List
 from fastapi import HTTPException
 from models.models import (
     Order,
     OrderStatusHistory,
     OrderStatusHistory_Pydantic,
-    OrderStatusHistoryIn_Pydantic
+    OrderStatusHistoryIn_Pydantic,
+    OrderTimeline_Pydantic
 )
-from utils.rabbit_utils import rabbit_client
+from utils.outbox import outbox_transaction, record_event
+from utils.rollups import order_rollup, update_rollups
+from utils.timeline import compact_timeline, status_change_fields
+from controllers.order_controller import ensure_order_exists, save_order_fields
+from utils.cache import get_or_load, order_key
+from utils.serializers import serialize, to_data, from_data
+
+
+async def _load_history(order_id: int) -> list:
+    history = await OrderStatusHistory.filter(order_id=order_id).order_by("-changed_at")
+    return [to_data(serialize(OrderStatusHistory_Pydantic, entry)) for entry in history]
 
 
 async def get_status_history(order_id: int) -> List[OrderStatusHistory_Pydantic]:
     """Get the status history for a specific order."""
     # Check if order exists
-    order = await Order.filter(order_id=order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
+    await ensure_order_exists(order_id)
     
-    history = await OrderStatusHistory.filter(order_id=order_id).order_by("-changed_at")
-    return await OrderStatusHistory_Pydantic.from_queryset(
-        OrderStatusHistory.filter(order_id=order_id).order_by("-changed_at")
+    data = await get_or_load(order_key(order_id, "history"), lambda: _load_history(order_id))
+    return [from_data(OrderStatusHistory_Pydantic, entry) for entry in data]
+
+
+async def get_status_timelines(order_ids: List[int], compact: bool = True) -> List[OrderTimeline_Pydantic]:
+    """
+    Get the status timelines of many orders with one query.
+
+    With compact, consecutive entries with the same status are collapsed
+    into the first. Orders without history are skipped; results follow the
+    order of order_ids.
+    """
+    entries = await (
+        OrderStatusHistory.filter(order_id__in=order_ids)
+        .order_by("order_id", "changed_at", "history_id")
+        .values("order_id", "status", "changed_at", "changed_by", "notes")
     )
+    by_order: Dict[int, list] = {}
+    for entry in entries:
+        by_order.setdefault(entry.pop("order_id"), []).append(entry)
+
+    timelines = []
+    for order_id in dict.fromkeys(order_ids):
+        order_entries = by_order.get(order_id)
+        if not order_entries:
+            continue
+        timelines.append(OrderTimeline_Pydantic(
+            order_id=order_id,
+            timeline=compact_timeline(order_entries) if compact else order_entries,
+        ))
+    return timelines
 
 
 async def get_status_history_entry(order_id: int, history_id: int) -> OrderStatusHistory_Pydantic:
@@ -30,7 +66,7 @@ async def get_status_history_entry(order_id: int, history_id: int) -> OrderStatu
             status_code=404, 
             detail=f"History entry with ID {history_id} not found for order {order_id}"
         )
-    return await OrderStatusHistory_Pydantic.from_tortoise_orm(history_entry)
+    return serialize(OrderStatusHistory_Pydantic, history_entry)
 
 
 async def create_status_history_entry(
@@ -38,56 +74,65 @@ async def create_status_history_entry(
     history_data: OrderStatusHistoryIn_Pydantic
 ) -> OrderStatusHistory_Pydantic:
     """Create a new status history entry for an order."""
-    # Check if order exists
-    order = await Order.filter(order_id=order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
-    
-    # Create history dict and set the order_id
-    history_dict = history_data.dict()
-    history_dict["order_id"] = order_id
-    
-    # Create the history entry
-    history_entry = await OrderStatusHistory.create(**history_dict)
-    
-    # Update the order status to match the latest history entry
-    await order.update_from_dict({"status": history_dict["status"]})
-    await order.save()
-    
-    # Publish to RabbitMQ
-    history_obj = await OrderStatusHistory_Pydantic.from_tortoise_orm(history_entry)
-    rabbit_client.publish_message(
-        message=history_obj.dict(),
-        message_type="order_status.updated"
-    )
+    async with outbox_transaction():
+        # Check if order exists, locking it so its rollup reflects concurrent writes
+        order = await Order.filter(order_id=order_id).select_for_update().first()
+        if not order:
+            raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
+        
+        # Create history dict and set the order_id
+        history_dict = history_data.dict()
+        history_dict["order_id"] = order_id
+        
+        # Create the history entry
+        history_entry = await OrderStatusHistory.create(**history_dict)
+        
+        # Update the order status to match the latest history entry; a
+        # repeated status keeps the time the order entered it
+        before = order_rollup(order)
+        fields = {"status": history_dict["status"]}
+        if history_dict["status"] != order.status:
+            fields.update(status_change_fields(history_dict["status"], history_entry.changed_at))
+        await save_order_fields(order, fields)
+        await update_rollups(removed=[before], added=[order_rollup(order)])
+        
+        # Publish via the outbox
+        history_obj = serialize(OrderStatusHistory_Pydantic, history_entry)
+        await record_event(
+            message=history_obj.dict(),
+            message_type="order_status.updated",
+            order_id=order_id
+        )
     
-    return await OrderStatusHistory_Pydantic.from_tortoise_orm(history_entry)
+    return history_obj
 
 
 async def delete_status_history_entry(order_id: int, history_id: int) -> bool:
     """Delete a status history entry."""
-    # Check if history entry exists
-    history_entry = await OrderStatusHistory.filter(order_id=order_id, history_id=history_id).first()
-    if not history_entry:
-        raise HTTPException(
-            status_code=404, 
-            detail=f"History entry with ID {history_id} not found for order {order_id}"
+    async with outbox_transaction():
+        # Check if history entry exists
+        history_entry = await OrderStatusHistory.filter(order_id=order_id, history_id=history_id).first()
+        if not history_entry:
+            raise HTTPException(
+                status_code=404, 
+                detail=f"History entry with ID {history_id} not found for order {order_id}"
+            )
+        
+        # Get history data before deletion for the message
+        history_obj = serialize(OrderStatusHistory_Pydantic, history_entry)
+        
+        # Delete the history entry
+        await history_entry.delete()
+        
+        # Publish via the outbox
+        await record_event(
+            message={
+                "history_id": history_id, 
+                "order_id": order_id, 
+                "details": history_obj.dict()
+            },
+            message_type="order_status_history.deleted",
+            order_id=order_id
         )
     
-    # Get history data before deletion for the message
-    history_obj = await OrderStatusHistory_Pydantic.from_tortoise_orm(history_entry)
-    
-    # Delete the history entry
-    await history_entry.delete()
-    
-    # Publish to RabbitMQ
-    rabbit_client.publish_message(
-        message={
-            "history_id": history_id, 
-            "order_id": order_id, 
-            "details": history_obj.dict()
-        },
-        message_type="order_status_history.deleted"
-    )
-    
-    return True
\ No newline at end of file
+    return True
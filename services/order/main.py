@@ -6,7 +6,11 @@ from tortoise.exceptions import DoesNotExist, IntegrityError
 
 from routes import api_router
 from config.db import init_db, close_db
-from config.settings import APP_HOST, APP_PORT, DEBUG
+from config.settings import APP_HOST, APP_PORT, DEBUG, OUTBOX_RELAY_ENABLED, EVENT_STREAM_SOURCE
+from utils.publisher import publisher
+from utils.outbox import outbox_relay
+from utils.idempotency import IdempotencyMiddleware
+from utils.event_hub import broker_event_feed
 
 # Configure logging
 logging.basicConfig(
@@ -25,6 +29,10 @@ app = FastAPI(
     openapi_url="/openapi.json",
 )
 
+# Replay stored responses of write requests retried with an Idempotency-Key.
+# Added before CORS so it runs inside it, and its responses get CORS headers too
+app.add_middleware(IdempotencyMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -59,11 +67,19 @@ async def startup_event():
     logger.info("Starting up the application")
     await init_db()
     logger.info("Database initialized")
+    await publisher.start()
+    if OUTBOX_RELAY_ENABLED:
+        await outbox_relay.start()
+    if EVENT_STREAM_SOURCE == "broker":
+        await broker_event_feed.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down the application")
+    await broker_event_feed.stop()
+    await outbox_relay.stop()
+    await publisher.stop()
     await close_db()
     logger.info("Database connections closed")
 
@@ -0,0 +1,68 @@
+from tortoise import BaseDBAsyncClient
+
+
+# Tables as they were before schema changes shipped as migrations (the
+# original four plus the outbox). IF NOT EXISTS lets databases created by
+# generate_schemas run the whole chain with `aerich upgrade`.
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "orders" (
+            "order_id" SERIAL NOT NULL PRIMARY KEY,
+            "customer_id" INT NOT NULL,
+            "pickup_location" VARCHAR(255) NOT NULL,
+            "delivery_location" VARCHAR(255) NOT NULL,
+            "requested_pickup_date" DATE NOT NULL,
+            "delivery_deadline" DATE NOT NULL,
+            "total_price" DECIMAL(10,2) NOT NULL,
+            "status" VARCHAR(20) NOT NULL,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS "order_items" (
+            "item_id" SERIAL NOT NULL PRIMARY KEY,
+            "cargo_type" VARCHAR(50) NOT NULL,
+            "weight_kg" DECIMAL(8,2) NOT NULL,
+            "dimensions_cm" VARCHAR(50) NOT NULL,
+            "special_requirements" VARCHAR(255),
+            "item_price" DECIMAL(10,2) NOT NULL,
+            "status" VARCHAR(20) NOT NULL,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "order_id" INT NOT NULL REFERENCES "orders" ("order_id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "price_calculations" (
+            "calculation_id" SERIAL NOT NULL PRIMARY KEY,
+            "base_price" DECIMAL(10,2) NOT NULL,
+            "distance_factor" DECIMAL(5,2) NOT NULL,
+            "weight_factor" DECIMAL(5,2) NOT NULL,
+            "urgency_factor" DECIMAL(5,2) NOT NULL,
+            "final_price" DECIMAL(10,2) NOT NULL,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "order_id" INT NOT NULL REFERENCES "orders" ("order_id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "order_status_history" (
+            "history_id" SERIAL NOT NULL PRIMARY KEY,
+            "status" VARCHAR(20) NOT NULL,
+            "changed_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "changed_by" INT NOT NULL,
+            "notes" VARCHAR(255),
+            "order_id" INT NOT NULL REFERENCES "orders" ("order_id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "outbox" (
+            "event_id" BIGSERIAL NOT NULL PRIMARY KEY,
+            "message_type" VARCHAR(100) NOT NULL,
+            "payload" JSONB NOT NULL,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS "aerich" (
+            "id" SERIAL NOT NULL PRIMARY KEY,
+            "version" VARCHAR(255) NOT NULL,
+            "app" VARCHAR(100) NOT NULL,
+            "content" JSONB NOT NULL
+        );"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        """
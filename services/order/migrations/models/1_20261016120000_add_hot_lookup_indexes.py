@@ -0,0 +1,25 @@
+from tortoise import BaseDBAsyncClient
+
+
+# Indexes declared in models.Meta.indexes; names match what generate_schemas
+# creates, so fresh and migrated databases end up identical.
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE INDEX IF NOT EXISTS "idx_orders_created_998de5" ON "orders" ("created_at", "order_id");
+        CREATE INDEX IF NOT EXISTS "idx_orders_status_97805e" ON "orders" ("status", "created_at", "order_id");
+        CREATE INDEX IF NOT EXISTS "idx_orders_custome_4ba850" ON "orders" ("customer_id", "created_at", "order_id");
+        CREATE INDEX IF NOT EXISTS "idx_orders_request_5566d0" ON "orders" ("requested_pickup_date");
+        CREATE INDEX IF NOT EXISTS "idx_order_items_order_i_3cb419" ON "order_items" ("order_id");
+        CREATE INDEX IF NOT EXISTS "idx_price_calcu_order_i_76777b" ON "price_calculations" ("order_id");
+        CREATE INDEX IF NOT EXISTS "idx_order_statu_order_i_3ddf9a" ON "order_status_history" ("order_id", "changed_at");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_orders_created_998de5";
+        DROP INDEX IF EXISTS "idx_orders_status_97805e";
+        DROP INDEX IF EXISTS "idx_orders_custome_4ba850";
+        DROP INDEX IF EXISTS "idx_orders_request_5566d0";
+        DROP INDEX IF EXISTS "idx_order_items_order_i_3cb419";
+        DROP INDEX IF EXISTS "idx_price_calcu_order_i_76777b";
+        DROP INDEX IF EXISTS "idx_order_statu_order_i_3ddf9a";"""
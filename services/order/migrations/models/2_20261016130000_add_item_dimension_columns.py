@@ -0,0 +1,21 @@
+from tortoise import BaseDBAsyncClient
+
+
+# Numeric dimension columns derived from dimensions_cm. Existing rows stay
+# NULL until `python -m utils.backfill_dimensions` has filled them in chunks.
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "order_items" ADD COLUMN IF NOT EXISTS "length_cm" DECIMAL(8,2);
+        ALTER TABLE "order_items" ADD COLUMN IF NOT EXISTS "width_cm" DECIMAL(8,2);
+        ALTER TABLE "order_items" ADD COLUMN IF NOT EXISTS "height_cm" DECIMAL(8,2);
+        ALTER TABLE "order_items" ADD COLUMN IF NOT EXISTS "volume_cm3" DECIMAL(16,2);
+        ALTER TABLE "order_items" ADD COLUMN IF NOT EXISTS "chargeable_weight_kg" DECIMAL(12,2);"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "order_items" DROP COLUMN "length_cm";
+        ALTER TABLE "order_items" DROP COLUMN "width_cm";
+        ALTER TABLE "order_items" DROP COLUMN "height_cm";
+        ALTER TABLE "order_items" DROP COLUMN "volume_cm3";
+        ALTER TABLE "order_items" DROP COLUMN "chargeable_weight_kg";"""
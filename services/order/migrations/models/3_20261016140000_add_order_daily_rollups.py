@@ -0,0 +1,22 @@
+from tortoise import BaseDBAsyncClient
+
+
+# Rollup table maintained by the order write paths. Fill it for existing
+# orders with `python -m utils.rollups`.
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "order_daily_rollups" (
+            "rollup_id" SERIAL NOT NULL PRIMARY KEY,
+            "day" DATE NOT NULL,
+            "status" VARCHAR(20) NOT NULL,
+            "customer_id" INT NOT NULL,
+            "order_count" INT NOT NULL,
+            "revenue" DECIMAL(14,2) NOT NULL,
+            CONSTRAINT "uid_order_daily_day_4362e7" UNIQUE ("day", "status", "customer_id")
+        );
+        CREATE INDEX IF NOT EXISTS "idx_order_daily_custome_31dfc4" ON "order_daily_rollups" ("customer_id", "day");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "order_daily_rollups";"""
@@ -0,0 +1,37 @@
+from tortoise import BaseDBAsyncClient
+
+
+# Status timestamps on orders, filled from the status history: each column
+# gets the latest time the order entered that status. Orders that already
+# have them (tables created by generate_schemas) are left alone.
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "orders" ADD COLUMN IF NOT EXISTS "status_changed_at" TIMESTAMPTZ;
+        ALTER TABLE "orders" ADD COLUMN IF NOT EXISTS "entered_processing_at" TIMESTAMPTZ;
+        ALTER TABLE "orders" ADD COLUMN IF NOT EXISTS "entered_pickup_ready_at" TIMESTAMPTZ;
+        ALTER TABLE "orders" ADD COLUMN IF NOT EXISTS "entered_in_transit_at" TIMESTAMPTZ;
+        ALTER TABLE "orders" ADD COLUMN IF NOT EXISTS "delivered_at" TIMESTAMPTZ;
+        ALTER TABLE "orders" ADD COLUMN IF NOT EXISTS "cancelled_at" TIMESTAMPTZ;
+        ALTER TABLE "orders" ADD COLUMN IF NOT EXISTS "returned_at" TIMESTAMPTZ;
+        UPDATE "orders" SET
+            "status_changed_at" = COALESCE((SELECT MAX(h."changed_at") FROM "order_status_history" h WHERE h."order_id" = "orders"."order_id" AND h."status" = "orders"."status"), "orders"."created_at"),
+            "entered_processing_at" = (SELECT MAX(h."changed_at") FROM "order_status_history" h WHERE h."order_id" = "orders"."order_id" AND h."status" = 'processing'),
+            "entered_pickup_ready_at" = (SELECT MAX(h."changed_at") FROM "order_status_history" h WHERE h."order_id" = "orders"."order_id" AND h."status" = 'pickup_ready'),
+            "entered_in_transit_at" = (SELECT MAX(h."changed_at") FROM "order_status_history" h WHERE h."order_id" = "orders"."order_id" AND h."status" = 'in_transit'),
+            "delivered_at" = (SELECT MAX(h."changed_at") FROM "order_status_history" h WHERE h."order_id" = "orders"."order_id" AND h."status" = 'delivered'),
+            "cancelled_at" = (SELECT MAX(h."changed_at") FROM "order_status_history" h WHERE h."order_id" = "orders"."order_id" AND h."status" = 'cancelled'),
+            "returned_at" = (SELECT MAX(h."changed_at") FROM "order_status_history" h WHERE h."order_id" = "orders"."order_id" AND h."status" = 'returned')
+        WHERE "status_changed_at" IS NULL;
+        CREATE INDEX IF NOT EXISTS "idx_orders_status_5eb953" ON "orders" ("status", "status_changed_at", "order_id");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_orders_status_5eb953";
+        ALTER TABLE "orders" DROP COLUMN "status_changed_at";
+        ALTER TABLE "orders" DROP COLUMN "entered_processing_at";
+        ALTER TABLE "orders" DROP COLUMN "entered_pickup_ready_at";
+        ALTER TABLE "orders" DROP COLUMN "entered_in_transit_at";
+        ALTER TABLE "orders" DROP COLUMN "delivered_at";
+        ALTER TABLE "orders" DROP COLUMN "cancelled_at";
+        ALTER TABLE "orders" DROP COLUMN "returned_at";"""
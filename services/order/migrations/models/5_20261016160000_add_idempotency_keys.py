@@ -0,0 +1,21 @@
+from tortoise import BaseDBAsyncClient
+
+
+# Stored responses of write requests sent with an Idempotency-Key header
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "idempotency_keys" (
+            "key" VARCHAR(255) NOT NULL PRIMARY KEY,
+            "fingerprint" VARCHAR(64) NOT NULL,
+            "status_code" INT,
+            "content_type" VARCHAR(100),
+            "response_body" BYTEA,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "expires_at" TIMESTAMPTZ NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS "idx_idempotency_expires_ae52bb" ON "idempotency_keys" ("expires_at");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "idempotency_keys";"""
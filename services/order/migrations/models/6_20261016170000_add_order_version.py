@@ -0,0 +1,12 @@
+from tortoise import BaseDBAsyncClient
+
+
+# Row version for ETags and conditional updates; existing orders start at 1
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "orders" ADD COLUMN IF NOT EXISTS "version" INT NOT NULL DEFAULT 1;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "orders" DROP COLUMN "version";"""
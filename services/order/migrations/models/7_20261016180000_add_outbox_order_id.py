@@ -0,0 +1,13 @@
+from tortoise import BaseDBAsyncClient
+
+
+# Order an outbox event belongs to, used for cache invalidation and routing;
+# events already in the outbox keep NULL
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "outbox" ADD COLUMN IF NOT EXISTS "order_id" INT;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "outbox" DROP COLUMN "order_id";"""
@@ -0,0 +1,13 @@
+from tortoise import BaseDBAsyncClient
+
+
+# Lease of the request running under a key; keys claimed before this keep
+# NULL and are only released when they expire
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "idempotency_keys" ADD COLUMN IF NOT EXISTS "locked_until" TIMESTAMPTZ;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "idempotency_keys" DROP COLUMN "locked_until";"""
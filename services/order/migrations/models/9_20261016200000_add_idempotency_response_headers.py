@@ -0,0 +1,16 @@
+from tortoise import BaseDBAsyncClient
+
+
+# Stored responses keep all their headers (e.g. ETag) instead of only the
+# content type, which is carried over for rows stored before this
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "idempotency_keys" ADD COLUMN IF NOT EXISTS "response_headers" JSONB;
+        UPDATE "idempotency_keys" SET "response_headers" = jsonb_build_array(jsonb_build_array('content-type', "content_type")) WHERE "content_type" IS NOT NULL;
+        ALTER TABLE "idempotency_keys" DROP COLUMN IF EXISTS "content_type";"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "idempotency_keys" ADD COLUMN "content_type" VARCHAR(100);
+        ALTER TABLE "idempotency_keys" DROP COLUMN "response_headers";"""
@@ -1,7 +1,19 @@
 from tortoise import fields, models
 from tortoise.contrib.pydantic import pydantic_model_creator
+from pydantic import BaseModel, root_validator, validator
 from enum import Enum
-from datetime import date
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Optional
+
+from utils.validators import (
+    parse_dimensions,
+    check_future_date,
+    check_price,
+    check_max_digits,
+    check_weight,
+    check_delivery_deadline,
+)
 
 
 class OrderStatus(str, Enum):
@@ -31,11 +43,31 @@ class Order(models.Model):
     delivery_deadline = fields.DateField()
     total_price = fields.DecimalField(max_digits=10, decimal_places=2)
     status = fields.CharEnumField(OrderStatus, max_length=20, default=OrderStatus.PENDING)
+    # When the order last entered its current status and each later status,
+    # set with the status change (see utils.timeline)
+    status_changed_at = fields.DatetimeField(null=True)
+    entered_processing_at = fields.DatetimeField(null=True)
+    entered_pickup_ready_at = fields.DatetimeField(null=True)
+    entered_in_transit_at = fields.DatetimeField(null=True)
+    delivered_at = fields.DatetimeField(null=True)
+    cancelled_at = fields.DatetimeField(null=True)
+    returned_at = fields.DatetimeField(null=True)
+    # Incremented by every write, for ETags and conditional updates
+    version = fields.IntField(default=1)
     created_at = fields.DatetimeField(auto_now_add=True)
     updated_at = fields.DatetimeField(auto_now=True)
 
     class Meta:
         table = "orders"
+        # Match the list filters, which all sort by (created_at, order_id),
+        # and the "in status X since T" lookup
+        indexes = (
+            ("created_at", "order_id"),
+            ("status", "created_at", "order_id"),
+            ("customer_id", "created_at", "order_id"),
+            ("requested_pickup_date",),
+            ("status", "status_changed_at", "order_id"),
+        )
 
 
 class OrderItem(models.Model):
@@ -47,11 +79,18 @@ class OrderItem(models.Model):
     special_requirements = fields.CharField(max_length=255, null=True)
     item_price = fields.DecimalField(max_digits=10, decimal_places=2)
     status = fields.CharEnumField(ItemStatus, max_length=20, default=ItemStatus.PENDING)
+    # Derived from dimensions_cm and weight_kg on write (see utils.dimensions)
+    length_cm = fields.DecimalField(max_digits=8, decimal_places=2, null=True)
+    width_cm = fields.DecimalField(max_digits=8, decimal_places=2, null=True)
+    height_cm = fields.DecimalField(max_digits=8, decimal_places=2, null=True)
+    volume_cm3 = fields.DecimalField(max_digits=16, decimal_places=2, null=True)
+    chargeable_weight_kg = fields.DecimalField(max_digits=12, decimal_places=2, null=True)
     created_at = fields.DatetimeField(auto_now_add=True)
     updated_at = fields.DatetimeField(auto_now=True)
 
     class Meta:
         table = "order_items"
+        indexes = (("order_id",),)
 
 
 class PriceCalculation(models.Model):
@@ -67,6 +106,7 @@ class PriceCalculation(models.Model):
 
     class Meta:
         table = "price_calculations"
+        indexes = (("order_id",),)
 
 
 class OrderStatusHistory(models.Model):
@@ -79,37 +119,224 @@ class OrderStatusHistory(models.Model):
 
     class Meta:
         table = "order_status_history"
+        indexes = (("order_id", "changed_at"),)
+
+
+class OrderDailyRollup(models.Model):
+    """
+    Order count and revenue per creation day, current status and customer.
+
+    Kept up to date by the order write paths (see utils.rollups), so
+    dashboards read one row per day instead of scanning orders.
+    """
+    rollup_id = fields.IntField(pk=True)
+    day = fields.DateField()
+    status = fields.CharEnumField(OrderStatus, max_length=20)
+    customer_id = fields.IntField()
+    order_count = fields.IntField(default=0)
+    revenue = fields.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        table = "order_daily_rollups"
+        unique_together = (("day", "status", "customer_id"),)
+        indexes = (("customer_id", "day"),)
+
+
+class OutboxEvent(models.Model):
+    event_id = fields.BigIntField(pk=True)
+    message_type = fields.CharField(max_length=100)
+    order_id = fields.IntField(null=True)
+    payload = fields.JSONField()
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "outbox"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response of a write request sent with an Idempotency-Key header.
+
+    status_code is null while the first request is still running, which
+    holds the key until locked_until and keeps renewing it. Rows expire
+    after IDEMPOTENCY_TTL (see utils.idempotency).
+    """
+    key = fields.CharField(max_length=255, pk=True)
+    fingerprint = fields.CharField(max_length=64)
+    status_code = fields.IntField(null=True)
+    response_headers = fields.JSONField(null=True)
+    response_body = fields.BinaryField(null=True)
+    created_at = fields.DatetimeField(auto_now_add=True)
+    locked_until = fields.DatetimeField(null=True)
+    expires_at = fields.DatetimeField(index=True)
+
+    class Meta:
+        table = "idempotency_keys"
 
 
 # Pydantic models for request & response
 Order_Pydantic = pydantic_model_creator(Order, name="Order")
-OrderIn_Pydantic = pydantic_model_creator(
+_OrderIn = pydantic_model_creator(
     Order, 
     name="OrderIn", 
     exclude_readonly=True,
-    exclude=("order_id", "created_at", "updated_at")
+    exclude=(
+        "order_id",
+        "created_at",
+        "updated_at",
+        "status_changed_at",
+        "entered_processing_at",
+        "entered_pickup_ready_at",
+        "entered_in_transit_at",
+        "delivered_at",
+        "cancelled_at",
+        "returned_at",
+        "version",
+    )
 )
 
+
+class OrderIn_Pydantic(_OrderIn):
+    """Order input checked for consistency, without date-relative rules (updates, imports)."""
+
+    @validator("total_price")
+    def total_price_not_negative(cls, value):
+        return check_max_digits(check_price(value), 10)
+
+    @root_validator(skip_on_failure=True)
+    def deadline_after_pickup(cls, values):
+        check_delivery_deadline(values["requested_pickup_date"], values["delivery_deadline"])
+        return values
+
+
+class OrderCreate_Pydantic(OrderIn_Pydantic):
+    """Input for a new order; pickup must not be in the past."""
+
+    @validator("requested_pickup_date")
+    def pickup_not_in_past(cls, value):
+        return check_future_date(value, "requested_pickup_date")
+
+
 OrderItem_Pydantic = pydantic_model_creator(OrderItem, name="OrderItem")
-OrderItemIn_Pydantic = pydantic_model_creator(
+_OrderItemIn = pydantic_model_creator(
     OrderItem, 
     name="OrderItemIn", 
     exclude_readonly=True,
-    exclude=("item_id", "created_at", "updated_at")
+    exclude=(
+        "item_id", "created_at", "updated_at",
+        "length_cm", "width_cm", "height_cm", "volume_cm3", "chargeable_weight_kg",
+    )
 )
 
+
+class OrderItemIn_Pydantic(_OrderItemIn):
+    """Order item input; dimensions must be LxWxH in centimetres, amounts must fit their columns."""
+
+    @validator("dimensions_cm")
+    def dimensions_format(cls, value):
+        parse_dimensions(value)
+        return value
+
+    @validator("weight_kg")
+    def weight_positive(cls, value):
+        return check_max_digits(check_weight(value), 8)
+
+    @validator("item_price")
+    def item_price_not_negative(cls, value):
+        return check_max_digits(check_price(value), 10)
+
+
 PriceCalculation_Pydantic = pydantic_model_creator(PriceCalculation, name="PriceCalculation")
-PriceCalculationIn_Pydantic = pydantic_model_creator(
+_PriceCalculationIn = pydantic_model_creator(
     PriceCalculation, 
     name="PriceCalculationIn", 
     exclude_readonly=True,
     exclude=("calculation_id", "created_at", "updated_at")
 )
 
+
+class PriceCalculationIn_Pydantic(_PriceCalculationIn):
+    """Price calculation input; amounts must fit their columns."""
+
+    @validator("base_price", "final_price")
+    def price_in_range(cls, value):
+        return check_max_digits(value, 10)
+
+    @validator("distance_factor", "weight_factor", "urgency_factor")
+    def factor_in_range(cls, value):
+        return check_max_digits(value, 5)
+
 OrderStatusHistory_Pydantic = pydantic_model_creator(OrderStatusHistory, name="OrderStatusHistory")
 OrderStatusHistoryIn_Pydantic = pydantic_model_creator(
     OrderStatusHistory, 
     name="OrderStatusHistoryIn", 
     exclude_readonly=True,
     exclude=("history_id", "changed_at")
-)
\ No newline at end of file
+)
+
+
+class OrderDetail_Pydantic(BaseModel):
+    """Order together with all of its child collections."""
+    order: Order_Pydantic
+    items: List[OrderItem_Pydantic]
+    price_calculations: List[PriceCalculation_Pydantic]
+    status_history: List[OrderStatusHistory_Pydantic]
+
+
+class StatusTimelineEntry_Pydantic(BaseModel):
+    """A status an order entered."""
+    status: OrderStatus
+    changed_at: datetime
+    changed_by: int
+    notes: Optional[str] = None
+
+
+class OrderTimeline_Pydantic(BaseModel):
+    """Status transitions of an order, oldest first."""
+    order_id: int
+    timeline: List[StatusTimelineEntry_Pydantic]
+
+
+class PriceQuoteIn_Pydantic(BaseModel):
+    """Price factors for a quote that is not stored; ranges match the price_calculations columns."""
+    base_price: Decimal
+    distance_factor: Decimal = Decimal("0")
+    weight_factor: Decimal = Decimal("0")
+    urgency_factor: Decimal = Decimal("0")
+
+    @validator("base_price")
+    def price_in_range(cls, value):
+        return check_max_digits(value, 10)
+
+    @validator("distance_factor", "weight_factor", "urgency_factor")
+    def factor_in_range(cls, value):
+        return check_max_digits(value, 5)
+
+
+class PriceCalculationBulkIn_Pydantic(PriceQuoteIn_Pydantic):
+    """Price factors for a calculation stored on the given order."""
+    order_id: int
+
+
+class TariffQuoteIn_Pydantic(BaseModel):
+    """Shipment details for a quote priced from the tariff tables."""
+    base_price: Decimal
+    distance_km: float
+    weight_kg: float = 0
+    cargo_type: Optional[str] = None
+    urgency: str = "standard"
+
+    @validator("base_price")
+    def price_in_range(cls, value):
+        return check_max_digits(value, 10)
+
+
+class TariffPriceIn_Pydantic(BaseModel):
+    """Shipment details for pricing an order from the tariff tables."""
+    distance_km: float
+    urgency: str = "standard"
+    base_price: Optional[Decimal] = None
+
+    @validator("base_price")
+    def price_in_range(cls, value):
+        return value if value is None else check_max_digits(value, 10)
@@ -3,10 +3,19 @@ from .order import router as order_router
 from .order_item import router as order_item_router
 from .price_calculation import router as price_calculation_router
 from .status_history import router as status_history_router
+from .pricing import router as pricing_router
+from .reports import router as reports_router
+from .events import router as events_router
+from .metrics import router as metrics_router
 
 api_router = APIRouter()
 
+# Fixed /order/price, /order/reports and /order/events paths go before the /order/{order_id} routes
+api_router.include_router(pricing_router)
+api_router.include_router(reports_router)
+api_router.include_router(events_router)
 api_router.include_router(order_router)
 api_router.include_router(order_item_router)
 api_router.include_router(price_calculation_router)
-api_router.include_router(status_history_router)
\ No newline at end of file
+api_router.include_router(status_history_router)
+api_router.include_router(metrics_router)
\ No newline at end of file
@@ -0,0 +1,71 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from config.settings import EVENT_STREAM_KEEPALIVE
+from utils.event_hub import event_hub, format_sse, iter_events
+
+router = APIRouter(
+    prefix="/order/events",
+    tags=["events"],
+)
+
+
+def subscribe(order_id: Optional[int], customer_id: Optional[int]):
+    try:
+        return event_hub.subscribe(order_id=order_id, customer_id=customer_id)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def sse_stream(subscription):
+    try:
+        async for message in iter_events(subscription, EVENT_STREAM_KEEPALIVE):
+            yield b": keepalive\n\n" if message is None else format_sse(message)
+    finally:
+        event_hub.unsubscribe(subscription)
+
+
+@router.get("")
+async def stream_events(
+    order_id: Optional[int] = Query(None, description="Only events of this order"),
+    customer_id: Optional[int] = Query(None, description="Only events of this customer's orders"),
+):
+    """
+    Stream committed order events as server-sent events.
+
+    Sends the same events that are published to RabbitMQ, from every
+    worker (see EVENT_STREAM_SOURCE). A client that falls too far behind is
+    disconnected and should reconnect.
+    """
+    subscription = subscribe(order_id, customer_id)
+    return StreamingResponse(
+        sse_stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def stream_events_ws(
+    websocket: WebSocket,
+    order_id: Optional[int] = Query(None),
+    customer_id: Optional[int] = Query(None),
+):
+    """
+    Stream committed order events over a WebSocket, see stream_events().
+    """
+    try:
+        subscription = event_hub.subscribe(order_id=order_id, customer_id=customer_id)
+    except RuntimeError:
+        await websocket.close(code=1013)
+        return
+    try:
+        await websocket.accept()
+        async for message in iter_events(subscription, EVENT_STREAM_KEEPALIVE):
+            await websocket.send_json(message or {"type": "keepalive"})
+        # Dropped for falling behind
+        await websocket.close(code=1013)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        event_hub.unsubscribe(subscription)
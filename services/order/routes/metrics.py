@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+from utils.publisher import publisher
+from utils.outbox import outbox_relay
+from utils.cache import cache
+from config.db import pool_metrics
+from utils.tariffs import tariffs
+from utils.event_hub import broker_event_feed, event_hub
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+)
+
+
+@router.get("/")
+async def read_metrics():
+    """
+    Get runtime metrics for the service internals.
+    """
+    return {
+        "publisher": publisher.metrics(),
+        "outbox_relay": outbox_relay.metrics(),
+        "cache": cache.metrics(),
+        "database_pool": pool_metrics(),
+        "tariffs": tariffs.metrics(),
+        "event_stream": event_hub.metrics(),
+        "event_stream_feed": broker_event_feed.metrics(),
+    }
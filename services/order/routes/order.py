@@ -1,13 +1,31 @@
+import io
+from datetime import date, datetime
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Query
-from models.models import OrderIn_Pydantic, Order_Pydantic, OrderStatus
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from models.models import OrderCreate_Pydantic, OrderIn_Pydantic, Order_Pydantic, OrderStatus, OrderDetail_Pydantic, OrderTimeline_Pydantic
 from controllers.order_controller import (
     get_all_orders,
+    get_orders_in_status,
     get_order_by_id,
+    get_order_details,
+    get_order_detail,
     create_order,
     update_order,
     delete_order
 )
+from controllers.export_controller import EXPORT_FORMATS, export_orders
+from controllers.import_controller import import_orders
+from controllers.order_item_controller import get_load_summary
+from controllers.status_history_controller import get_status_timelines
+from utils.etags import etag_matches, if_match_versions, order_etag
+from utils.pagination import encode_cursor
+
+# Maximum number of orders per batched detail request
+MAX_DETAIL_IDS = 100
+
+# Maximum number of orders per batched timeline request
+MAX_TIMELINE_IDS = 1000
 
 router = APIRouter(
     prefix="/order",
@@ -16,46 +34,198 @@ router = APIRouter(
 )
 
 
+def order_filter_params(
+    status: Optional[OrderStatus] = Query(None, description="Filter by order status"),
+    customer_id: Optional[int] = Query(None, description="Filter by customer"),
+    pickup_from: Optional[date] = Query(None, description="Requested pickup on or after this date"),
+    pickup_to: Optional[date] = Query(None, description="Requested pickup on or before this date"),
+    created_after: Optional[datetime] = Query(None, description="Created at or after this time"),
+    created_before: Optional[datetime] = Query(None, description="Created before this time"),
+) -> dict:
+    """Order list filters shared by the list endpoints."""
+    return {
+        "status": status,
+        "customer_id": customer_id,
+        "pickup_from": pickup_from,
+        "pickup_to": pickup_to,
+        "created_after": created_after,
+        "created_before": created_before,
+    }
+
+
+def parse_order_ids(ids: str) -> List[int]:
+    """Parse comma-separated order IDs, raising a 400 for anything else."""
+    try:
+        return [int(order_id) for order_id in ids.split(",") if order_id.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid order IDs: {ids}")
+
+
 @router.get("/", response_model=List[Order_Pydantic])
 async def read_orders(
-    skip: int = Query(0, description="Skip N items"),
-    limit: int = Query(100, description="Limit to N items"),
-    status: Optional[OrderStatus] = Query(None, description="Filter by order status")
+    response: Response,
+    skip: int = Query(0, ge=0, description="Skip N items (ignored when a cursor is given)"),
+    limit: int = Query(100, ge=1, le=1000, description="Limit to N items"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    filters: dict = Depends(order_filter_params),
 ):
     """
-    Get all orders with optional pagination and filtering.
+    Get orders with filtering and pagination.
+
+    Orders are sorted by creation time. When a full page is returned, the
+    X-Next-Cursor response header holds the cursor for the next page.
     """
-    orders = await get_all_orders(skip=skip, limit=limit)
+    orders = await get_all_orders(skip=skip, limit=limit, cursor=cursor, **filters)
     
-    # Filter by status if provided
-    if status:
-        orders = [order for order in orders if order.status == status]
+    if len(orders) == limit:
+        last = orders[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.order_id)
         
     return orders
 
 
-@router.get("/{order_id}", response_model=Order_Pydantic)
-async def read_order(order_id: int):
+@router.get("/export")
+async def export_orders_file(
+    format: str = Query("ndjson", regex="^(ndjson|csv)$", description="ndjson or csv"),
+    include_items: bool = Query(False, description="Include order items"),
+    include_price: bool = Query(False, description="Include the latest calculated price"),
+    filters: dict = Depends(order_filter_params),
+):
+    """
+    Stream all orders matching the filters as NDJSON or CSV.
+
+    Orders are sorted by creation time and read in chunks, so exports of any
+    size run in constant memory.
+    """
+    return StreamingResponse(
+        export_orders(format, include_items=include_items, include_price=include_price, **filters),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="orders.{format}"'},
+    )
+
+
+@router.post("/import")
+async def import_orders_file(
+    file: UploadFile = File(..., description="CSV (with a header row) or NDJSON file"),
+    format: Optional[str] = Query(None, regex="^(ndjson|csv)$", description="Defaults to the file extension"),
+):
+    """
+    Import orders from a CSV or NDJSON file.
+
+    Valid rows are created in batches; invalid rows are skipped and listed
+    with their row number in the response.
+    """
+    import_format = format or ("ndjson" if (file.filename or "").endswith((".ndjson", ".jsonl")) else "csv")
+    # The upload is spooled to a temporary file, so rows are parsed as they are read
+    lines = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    return await import_orders(lines, import_format)
+
+
+@router.get("/load-summary")
+async def read_load_summary(
+    ids: Optional[str] = Query(None, description="Comma-separated order IDs, e.g. 1,2,3"),
+    limit: int = Query(10000, ge=1, le=100000, description="Limit to N orders"),
+    filters: dict = Depends(order_filter_params),
+):
+    """
+    Get item count, total weight, volume and chargeable weight per order.
+    """
+    order_ids = parse_order_ids(ids) if ids else None
+    return await get_load_summary(order_ids=order_ids, limit=limit, **filters)
+
+
+@router.get("/in-status", response_model=List[Order_Pydantic])
+async def read_orders_in_status(
+    status: OrderStatus = Query(..., description="Current order status"),
+    entered_after: Optional[datetime] = Query(None, description="Entered the status at or after this time"),
+    entered_before: Optional[datetime] = Query(None, description="Entered the status before this time"),
+    limit: int = Query(100, ge=1, le=1000, description="Limit to N orders"),
+):
+    """
+    Get orders currently in a status, longest in it first.
+    """
+    return await get_orders_in_status(status, entered_after=entered_after, entered_before=entered_before, limit=limit)
+
+
+@router.get("/timelines", response_model=List[OrderTimeline_Pydantic])
+async def read_status_timelines(
+    ids: str = Query(..., description="Comma-separated order IDs, e.g. 1,2,3"),
+    compact: bool = Query(True, description="Collapse repeated entries of the same status"),
+):
+    """
+    Get the status timelines of several orders.
+    """
+    order_ids = parse_order_ids(ids)
+    if len(order_ids) > MAX_TIMELINE_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_TIMELINE_IDS} orders per request")
+    return await get_status_timelines(order_ids, compact=compact)
+
+
+@router.get("/full", response_model=List[OrderDetail_Pydantic])
+async def read_orders_full(
+    ids: str = Query(..., description="Comma-separated order IDs, e.g. 1,2,3")
+):
+    """
+    Get several orders with their items, price calculations and status history.
+    """
+    order_ids = parse_order_ids(ids)
+    if len(order_ids) > MAX_DETAIL_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_DETAIL_IDS} orders per request")
+    return await get_order_details(order_ids)
+
+
+@router.get("/{order_id}/full", response_model=OrderDetail_Pydantic)
+async def read_order_full(order_id: int):
+    """
+    Get an order with its items, price calculations and status history.
+    """
+    return await get_order_detail(order_id)
+
+
+@router.get("/{order_id}", response_model=Order_Pydantic, responses={304: {"description": "Not modified"}})
+async def read_order(
+    order_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+):
     """
     Get a specific order by ID.
+
+    The ETag changes with every write to the order; send it back in
+    If-None-Match to get 304 Not Modified while the order is unchanged.
     """
-    return await get_order_by_id(order_id)
+    order = await get_order_by_id(order_id)
+    etag = order_etag(order.order_id, order.version)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return order
 
 
 @router.post("/", response_model=Order_Pydantic, status_code=201)
-async def create_new_order(order: OrderIn_Pydantic):
+async def create_new_order(order: OrderCreate_Pydantic):
     """
     Create a new order.
     """
     return await create_order(order)
 
 
-@router.put("/{order_id}", response_model=Order_Pydantic)
-async def update_existing_order(order_id: int, order: OrderIn_Pydantic):
+@router.put("/{order_id}", response_model=Order_Pydantic, responses={412: {"description": "Order has changed"}})
+async def update_existing_order(
+    order_id: int,
+    order: OrderIn_Pydantic,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+):
     """
     Update an existing order.
+
+    Send the order's ETag in If-Match to update only if nobody changed it
+    since it was read (412 Precondition Failed otherwise).
     """
-    return await update_order(order_id, order)
+    updated = await update_order(order_id, order, expected_versions=if_match_versions(if_match, order_id))
+    response.headers["ETag"] = order_etag(updated.order_id, updated.version)
+    return updated
 
 
 @router.delete("/{order_id}")
@@ -5,6 +5,7 @@ from controllers.order_item_controller import (
     get_order_items,
     get_order_item,
     create_order_item,
+    create_order_items_bulk,
     update_order_item,
     delete_order_item
 )
@@ -40,6 +41,14 @@ async def add_order_item(order_id: int, item: OrderItemIn_Pydantic):
     return await create_order_item(order_id, item)
 
 
+@router.post("/bulk", status_code=201)
+async def add_order_items_bulk(order_id: int, items: List[OrderItemIn_Pydantic]):
+    """
+    Add many items to an order in one request.
+    """
+    return await create_order_items_bulk(order_id, items)
+
+
 @router.put("/{item_id}", response_model=OrderItem_Pydantic)
 async def update_existing_item(order_id: int, item_id: int, item: OrderItemIn_Pydantic):
     """
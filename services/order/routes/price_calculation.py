@@ -1,10 +1,11 @@
 from typing import List
 from fastapi import APIRouter, HTTPException
-from models.models import PriceCalculationIn_Pydantic, PriceCalculation_Pydantic
+from models.models import PriceCalculationIn_Pydantic, PriceCalculation_Pydantic, TariffPriceIn_Pydantic
 from controllers.price_calculation_controller import (
     get_price_calculations,
     get_price_calculation,
     create_price_calculation,
+    create_tariff_price_calculation,
     update_price_calculation,
     delete_price_calculation
 )
@@ -40,6 +41,14 @@ async def create_new_price_calculation(order_id: int, calculation: PriceCalculat
     return await create_price_calculation(order_id, calculation)
 
 
+@router.post("/tariff", response_model=PriceCalculation_Pydantic, status_code=201)
+async def create_tariff_calculation(order_id: int, tariff: TariffPriceIn_Pydantic):
+    """
+    Price an order from the tariff tables and store the calculation.
+    """
+    return await create_tariff_price_calculation(order_id, tariff)
+
+
 @router.put("/{calculation_id}", response_model=PriceCalculation_Pydantic)
 async def update_existing_calculation(
     order_id: int, 
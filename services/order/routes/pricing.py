@@ -0,0 +1,58 @@
+from typing import List
+from fastapi import APIRouter
+from models.models import PriceQuoteIn_Pydantic, PriceCalculationBulkIn_Pydantic, TariffQuoteIn_Pydantic
+from controllers.price_calculation_controller import (
+    quote_price_batch,
+    quote_tariff_batch,
+    create_price_calculations_bulk
+)
+from utils.tariffs import tariffs
+
+router = APIRouter(
+    prefix="/order/price",
+    tags=["pricing"],
+)
+
+
+@router.post("/quote-batch")
+async def quote_batch(quotes: List[PriceQuoteIn_Pydantic]):
+    """
+    Price many quotes at once without storing them.
+
+    Final prices are returned in the order of the quotes.
+    """
+    return await quote_price_batch(quotes)
+
+
+@router.post("/bulk", status_code=201)
+async def create_calculations_bulk(calculations: List[PriceCalculationBulkIn_Pydantic]):
+    """
+    Price and store calculations for many orders in one request.
+    """
+    return await create_price_calculations_bulk(calculations)
+
+
+@router.post("/tariff-quote-batch")
+async def tariff_quote_batch(quotes: List[TariffQuoteIn_Pydantic]):
+    """
+    Price many shipments from the current tariff tables without storing them.
+    """
+    return await quote_tariff_batch(quotes)
+
+
+@router.get("/tariff")
+async def read_tariff():
+    """
+    Get the active tariff version.
+    """
+    tariffs.current()
+    return tariffs.metrics()
+
+
+@router.post("/tariff/reload")
+async def reload_tariff():
+    """
+    Reload the tariff file now instead of waiting for the change check.
+    """
+    tariffs.reload()
+    return tariffs.metrics()
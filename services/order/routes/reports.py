@@ -0,0 +1,85 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from models.models import OrderStatus
+from controllers.report_controller import (
+    get_daily_report,
+    get_order_report,
+    get_status_report,
+    get_customer_report,
+    get_on_time_report
+)
+from routes.order import order_filter_params
+
+router = APIRouter(
+    prefix="/order/reports",
+    tags=["reports"],
+)
+
+BUCKET_QUERY = Query("day", regex="^(day|week|month)$", description="Date bucket: day, week or month")
+
+
+@router.get("/orders")
+async def read_order_report(
+    bucket: str = BUCKET_QUERY,
+    by_status: bool = Query(False, description="Split each bucket by order status"),
+    filters: dict = Depends(order_filter_params),
+):
+    """
+    Get order count, revenue and average items per order by creation date.
+    """
+    return await get_order_report(bucket=bucket, by_status=by_status, **filters)
+
+
+@router.get("/status")
+async def read_status_report(filters: dict = Depends(order_filter_params)):
+    """
+    Get order count, revenue and share of orders per status.
+    """
+    return await get_status_report(**filters)
+
+
+@router.get("/customers")
+async def read_customer_report(
+    limit: int = Query(100, ge=1, le=10000, description="Limit to the top N customers by revenue"),
+    filters: dict = Depends(order_filter_params),
+):
+    """
+    Get order count and revenue per customer, highest revenue first.
+    """
+    return await get_customer_report(limit=limit, **filters)
+
+
+@router.get("/on-time")
+async def read_on_time_report(
+    bucket: str = BUCKET_QUERY,
+    filters: dict = Depends(order_filter_params),
+):
+    """
+    Get delivered orders and the share delivered by their deadline, by delivery date.
+    """
+    return await get_on_time_report(bucket=bucket, **filters)
+
+
+@router.get("/daily")
+async def read_daily_report(
+    bucket: str = BUCKET_QUERY,
+    by_status: bool = Query(False, description="Split each bucket by order status"),
+    day_from: Optional[date] = Query(None, description="Orders created on or after this day"),
+    day_to: Optional[date] = Query(None, description="Orders created on or before this day"),
+    status: Optional[OrderStatus] = Query(None, description="Filter by order status"),
+    customer_id: Optional[int] = Query(None, description="Filter by customer"),
+):
+    """
+    Get order count and revenue by creation date from the daily rollup table.
+
+    Dashboards should prefer this over /orders, which scans the orders.
+    """
+    return await get_daily_report(
+        bucket=bucket,
+        by_status=by_status,
+        day_from=day_from,
+        day_to=day_to,
+        status=status,
+        customer_id=customer_id,
+    )
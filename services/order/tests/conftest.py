@@ -0,0 +1,14 @@
+import pytest
+from tortoise import Tortoise
+
+from utils.cache import cache
+
+
+@pytest.fixture
+async def db():
+    """Fresh in-memory SQLite database with the service models."""
+    await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["models.models"]})
+    await Tortoise.generate_schemas()
+    await cache.clear()
+    yield
+    await Tortoise.close_connections()
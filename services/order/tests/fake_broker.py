@@ -0,0 +1,94 @@
+import asyncio
+
+
+class FakeBroker:
+    """In-process stand-in for the RabbitMQ transport used by AsyncPublisher."""
+
+    def __init__(self, fail_times: int = 0, delay: float = 0.0):
+        self.fail_times = fail_times
+        self.delay = delay
+        self.messages = []
+        self.routing_keys = []
+        self.closed = False
+
+    async def connect(self):
+        pass
+
+    async def send(self, message, message_type=None, routing_key=None):
+        await asyncio.sleep(self.delay)
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionError("broker unavailable")
+        self.messages.append((message_type, message))
+        self.routing_keys.append(routing_key)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeQueue:
+    """In-process stand-in for the transport used by OrderEventConsumer."""
+
+    def __init__(self, prefetch_limit: bool = True, fail_dead_letters: int = 0):
+        self.prefetch_limit = prefetch_limit
+        self.fail_dead_letters = fail_dead_letters
+        self.prefetch = None
+        self.acks = []
+        self.requeued = []
+        self.dead_letters = []
+        self.max_unacked = 0
+        self._messages = asyncio.Queue()
+        self._unacked = []
+        self._acked = asyncio.Condition()
+        self._next_tag = 1
+
+    def put(self, message, message_type=None, codec=None):
+        """Queue a message, encoded like the publisher would."""
+        from utils.consumer import Delivery
+        from utils.envelopes import EnvelopeCodec
+        body, content_type, content_encoding = (codec or EnvelopeCodec()).encode(message)
+        self._messages.put_nowait(Delivery(self._next_tag, message_type, body, content_type, content_encoding))
+        self._next_tag += 1
+
+    def put_raw(self, body, message_type=None, content_type=None):
+        from utils.consumer import Delivery
+        self._messages.put_nowait(Delivery(self._next_tag, message_type, body, content_type))
+        self._next_tag += 1
+
+    async def connect(self, prefetch):
+        self.prefetch = prefetch
+
+    async def deliveries(self):
+        """Hand out the queued messages, at most prefetch unacked at a time, then stop."""
+        while not self._messages.empty():
+            async with self._acked:
+                await self._acked.wait_for(lambda: len(self._unacked) < self.prefetch)
+            delivery = self._messages.get_nowait()
+            self._unacked.append(delivery.tag)
+            self.max_unacked = max(self.max_unacked, len(self._unacked))
+            yield delivery
+
+    async def _settle(self, tags):
+        async with self._acked:
+            self._unacked = [tag for tag in self._unacked if tag not in tags]
+            self._acked.notify_all()
+
+    async def ack(self, tag, multiple=False):
+        if tag not in self._unacked:
+            # RabbitMQ closes the channel on an unknown delivery tag
+            raise ValueError(f"PRECONDITION_FAILED - unknown delivery tag {tag}")
+        self.acks.append((tag, multiple))
+        await self._settle({t for t in self._unacked if t <= tag} if multiple else {tag})
+
+    async def requeue(self, tag):
+        self.requeued.append(tag)
+        await self._settle({tag})
+
+    async def dead_letter(self, delivery, reason):
+        if self.fail_dead_letters:
+            self.fail_dead_letters -= 1
+            raise ConnectionError("dead-letter publish not confirmed")
+        self.dead_letters.append((delivery, reason))
+
+    async def close(self):
+        pass
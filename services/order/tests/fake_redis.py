@@ -0,0 +1,33 @@
+import time
+
+
+class FakeRedis:
+    """Local stand-in for the subset of redis.asyncio.Redis used by RedisCache."""
+
+    def __init__(self):
+        self._data = {}
+
+    def _alive(self, key):
+        entry = self._data.get(key)
+        if entry and entry[1] is not None and entry[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    async def get(self, key):
+        entry = self._alive(key)
+        return entry[0] if entry else None
+
+    async def set(self, key, value, ex=None):
+        self._data[key] = (value.encode() if isinstance(value, str) else value,
+                           time.monotonic() + ex if ex else None)
+        return True
+
+    async def delete(self, *keys):
+        return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+    async def scan_iter(self, match="*"):
+        prefix = match.rstrip("*")
+        for key in list(self._data):
+            if key.startswith(prefix):
+                yield key
@@ -0,0 +1,31 @@
+import logging
+from contextlib import contextmanager
+
+# Tortoise logs every statement it sends through this logger
+DB_CLIENT_LOGGER = "tortoise.db_client"
+
+
+class _QueryRecorder(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.queries = []
+
+    def emit(self, record):
+        # Statements are logged as "<sql>: <params>"; skip connection messages
+        if record.msg == "%s: %s":
+            self.queries.append(str(record.args[0]))
+
+
+@contextmanager
+def count_queries():
+    """Collect the SQL statements executed inside the block."""
+    logger = logging.getLogger(DB_CLIENT_LOGGER)
+    recorder = _QueryRecorder()
+    previous_level = logger.level
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(recorder)
+    try:
+        yield recorder.queries
+    finally:
+        logger.removeHandler(recorder)
+        logger.setLevel(previous_level)
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from datetime import date, timedelta
+
+from controllers.order_controller import create_order, get_order_by_id, update_order
+from controllers.order_item_controller import create_order_item, get_order_items
+from models.models import OrderIn_Pydantic, OrderItemIn_Pydantic
+from utils.cache import LocalCache, RedisCache
+from tests.fake_redis import FakeRedis
+from tests.query_counter import count_queries
+
+
+def order_input(**overrides):
+    return OrderIn_Pydantic(**{
+        "customer_id": 1,
+        "pickup_location": "123 Pickup St, City",
+        "delivery_location": "456 Delivery St, City",
+        "requested_pickup_date": date.today() + timedelta(days=1),
+        "delivery_deadline": date.today() + timedelta(days=7),
+        "total_price": 10,
+        **overrides,
+    })
+
+
+@pytest.mark.asyncio
+async def test_local_cache_evicts_least_recently_used():
+    cache = LocalCache(max_entries=2, ttl=60)
+    await cache.set("a", 1)
+    await cache.set("b", 2)
+    assert await cache.get("a") == 1
+    await cache.set("c", 3)
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == 1
+    assert cache.metrics()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_local_cache_expires_entries():
+    cache = LocalCache(ttl=0.01)
+    await cache.set("a", 1)
+    await asyncio.sleep(0.02)
+
+    assert await cache.get("a") is None
+    assert cache.metrics()["expirations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_round_trips_json():
+    cache = RedisCache(FakeRedis(), ttl=60)
+    await cache.set("order:1", {"order_id": 1, "total_price": "10.50"})
+
+    assert await cache.get("order:1") == {"order_id": 1, "total_price": "10.50"}
+    await cache.delete("order:1")
+    assert await cache.get("order:1") is None
+    assert cache.metrics()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_reads_are_cached_until_a_write_commits(db):
+    order_id = (await create_order(order_input())).order_id
+    await get_order_by_id(order_id)
+    await get_order_items(order_id)
+
+    with count_queries() as queries:
+        await get_order_by_id(order_id)
+        await get_order_items(order_id)
+    assert queries == []
+
+    await update_order(order_id, order_input(pickup_location="New Pickup St"))
+    await create_order_item(order_id, OrderItemIn_Pydantic(
+        cargo_type="Electronics", weight_kg=1, dimensions_cm="1x2x3", item_price=5,
+    ))
+
+    assert (await get_order_by_id(order_id)).pickup_location == "New Pickup St"
+    assert len(await get_order_items(order_id)) == 1
@@ -0,0 +1,119 @@
+import asyncio
+import pytest
+
+from utils.consumer import OrderEventConsumer, PikaConsumerTransport
+from utils.envelopes import BATCH_MESSAGE_TYPE, EnvelopeCodec, batch_envelope
+from tests.fake_broker import FakeQueue
+
+
+def consumer_for(queue, **options):
+    options = {"ack_interval": 0.01, "retry_delay": 0.001, **options}
+    return OrderEventConsumer(queue, **options)
+
+
+@pytest.mark.asyncio
+async def test_dispatches_by_type_with_bounded_concurrency():
+    queue = FakeQueue()
+    for order_id in range(20):
+        queue.put({"order_id": order_id}, "order.created")
+    queue.put({"order_id": 1, "status": "processing"}, "order.updated")
+    queue.put({"order_id": 2}, "order.deleted")
+    consumer = consumer_for(queue, prefetch=8, concurrency=4, ack_batch_size=5)
+
+    created, updated, running = [], [], {"now": 0, "max": 0}
+
+    @consumer.handler("order.created")
+    async def on_created(event):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.001)
+        created.append(event["order_id"])
+        running["now"] -= 1
+
+    @consumer.handler("order.updated")
+    async def on_updated(event):
+        updated.append(event["status"])
+
+    await asyncio.wait_for(consumer.run(), 5)
+
+    assert sorted(created) == list(range(20))
+    assert updated == ["processing"]
+    assert running["max"] == 4
+    assert queue.max_unacked <= 8
+    # Cumulative acks, the last one covering every message
+    assert all(multiple for _, multiple in queue.acks)
+    assert queue.acks[-1][0] == 22
+    assert len(queue.acks) < 22
+    assert consumer.metrics()["ignored"] == 1
+
+
+@pytest.mark.asyncio
+async def test_poison_messages_go_to_dead_letter_queue():
+    queue = FakeQueue()
+    queue.put({"order_id": 1}, "order.created")
+    queue.put_raw(b"{not json", "order.created")
+    queue.put(batch_envelope([
+        ({"order_id": 2}, "order.created"),
+        ({"order_id": 3}, "order.created"),
+    ]), BATCH_MESSAGE_TYPE, codec=EnvelopeCodec(compression="gzip", compress_min_bytes=0))
+    consumer = consumer_for(queue, max_attempts=3)
+
+    attempts = {}
+
+    @consumer.handler("order.created")
+    async def on_created(event):
+        attempts[event["order_id"]] = attempts.get(event["order_id"], 0) + 1
+        if event["order_id"] == 3:
+            raise ValueError("bad order")
+
+    await asyncio.wait_for(consumer.run(), 5)
+
+    assert attempts == {1: 1, 2: 1, 3: 3}
+    reasons = [reason for _, reason in queue.dead_letters]
+    assert reasons[0].startswith("Undecodable message")
+    assert "bad order" in reasons[1]
+    # Only the failing event of the envelope is dead-lettered
+    dead = queue.dead_letters[1][0]
+    assert (dead.message_type, dead.body) == ("order.created", b'{"order_id":3}')
+    assert queue.acks[-1] == (3, True)
+    assert consumer.metrics()["dead_lettered"] == 2
+
+
+@pytest.mark.asyncio
+async def test_requeued_messages_are_left_out_of_cumulative_acks():
+    queue = FakeQueue(fail_dead_letters=1)
+    for order_id in range(1, 7):
+        queue.put({"order_id": order_id}, "order.created")
+    consumer = consumer_for(queue, ack_batch_size=100, ack_interval=10, max_attempts=1)
+
+    @consumer.handler("order.created")
+    async def on_created(event):
+        if event["order_id"] == 3:
+            raise ValueError("bad order")
+
+    await asyncio.wait_for(consumer.run(), 5)
+
+    # The dead-letter copy was not confirmed, so the message went back to the broker
+    assert queue.requeued == [3]
+    assert queue.dead_letters == []
+    # One ack up to the tag before it, one for the run after it
+    assert queue.acks == [(2, True), (6, True)]
+    assert consumer.metrics()["unacked"] == 0
+
+
+class BrokenChannel:
+    def consume(self, queue, **options):
+        raise ConnectionError("connection reset")
+
+
+@pytest.mark.asyncio
+async def test_pika_thread_failure_ends_the_deliveries():
+    transport = PikaConsumerTransport()
+    transport._loop = asyncio.get_running_loop()
+    transport._deliveries = asyncio.Queue()
+    transport.channel = BrokenChannel()
+    await transport._loop.run_in_executor(None, transport._consume)
+
+    # The error reaches run() instead of it waiting for deliveries forever
+    with pytest.raises(ConnectionError):
+        await asyncio.wait_for(transport.deliveries().__anext__(), 1)
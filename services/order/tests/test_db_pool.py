@@ -0,0 +1,43 @@
+import pytest
+from tortoise import Tortoise
+
+from config.db import pool_metrics, warm_up_pool
+from config.settings import TORTOISE_ORM, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE
+
+
+class FakePool:
+    def get_min_size(self):
+        return 2
+
+    def get_max_size(self):
+        return 10
+
+    def get_size(self):
+        return 4
+
+    def get_idle_size(self):
+        return 1
+
+
+def test_postgres_connection_passes_pool_settings():
+    connection = TORTOISE_ORM["connections"]["default"]
+    assert connection["engine"] == "tortoise.backends.asyncpg"
+    credentials = connection["credentials"]
+    assert credentials["minsize"] == DB_POOL_MIN_SIZE
+    assert credentials["maxsize"] == DB_POOL_MAX_SIZE
+    assert "statement_cache_size" in credentials
+    assert "command_timeout" in credentials
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics_without_pool(db):
+    await warm_up_pool(size=3)
+    assert pool_metrics() == {"initialized": True, "pooled": False}
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics_reports_utilization(db):
+    Tortoise.get_connection("default")._pool = FakePool()
+    metrics = pool_metrics()
+    assert metrics["in_use"] == 3
+    assert metrics["utilization"] == 0.3
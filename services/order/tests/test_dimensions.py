@@ -0,0 +1,102 @@
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+from httpx import ASGITransport, AsyncClient
+from pydantic import ValidationError
+
+from controllers.order_controller import create_order
+from controllers.order_item_controller import create_order_item, update_order_item
+from main import app
+from models.models import OrderIn_Pydantic, OrderItem, OrderItemIn_Pydantic
+from utils.backfill_dimensions import backfill_item_dimensions
+from utils.dimensions import measure_item
+
+
+async def new_order(customer_id=1):
+    order = await create_order(OrderIn_Pydantic(
+        customer_id=customer_id,
+        pickup_location="123 Pickup St, City",
+        delivery_location="456 Delivery St, City",
+        requested_pickup_date=date.today() + timedelta(days=1),
+        delivery_deadline=date.today() + timedelta(days=7),
+        total_price=0,
+    ))
+    return order.order_id
+
+
+def new_item(dimensions_cm="10x20x30", weight_kg="2.00"):
+    return OrderItemIn_Pydantic(
+        cargo_type="General",
+        weight_kg=weight_kg,
+        dimensions_cm=dimensions_cm,
+        item_price="10.00",
+    )
+
+
+def test_measure_item_uses_larger_of_actual_and_volumetric_weight():
+    # 50 * 40 * 30 = 60000 cm3, / 5000 = 12 kg volumetric
+    measures = measure_item("50x40x30", "2.5")
+    assert measures["volume_cm3"] == Decimal("60000.00")
+    assert measures["chargeable_weight_kg"] == Decimal("12.00")
+    assert measure_item("10x10x10", "2.5")["chargeable_weight_kg"] == Decimal("2.50")
+    assert measure_item("a box", "2.5") == dict.fromkeys(measures)
+    # The largest box still fits the columns: DECIMAL(16,2) volume, DECIMAL(12,2) weight
+    largest = measure_item("10000x10000x10000", "2.5")
+    assert largest["volume_cm3"] == Decimal("1000000000000.00")
+    assert largest["chargeable_weight_kg"] == Decimal("200000000.00")
+
+
+@pytest.mark.asyncio
+async def test_item_writes_store_numeric_dimensions(db):
+    order_id = await new_order()
+    item = await create_order_item(order_id, new_item("10.5x20x30"))
+    stored = await OrderItem.get(item_id=item.item_id)
+    assert (stored.length_cm, stored.width_cm, stored.height_cm) == (Decimal("10.50"), Decimal("20.00"), Decimal("30.00"))
+    assert stored.volume_cm3 == Decimal("6300.00")
+
+    await update_order_item(order_id, item.item_id, new_item("100x50x40", "3.00"))
+    stored = await OrderItem.get(item_id=item.item_id)
+    assert stored.volume_cm3 == Decimal("200000.00")
+    assert stored.chargeable_weight_kg == Decimal("40.00")
+
+    with pytest.raises(ValidationError):
+        new_item("1000000x1x1")
+
+
+@pytest.mark.asyncio
+async def test_backfill_fills_legacy_items(db):
+    order_id = await new_order()
+    await OrderItem.bulk_create([
+        OrderItem(order_id=order_id, cargo_type="General", weight_kg="1.00", dimensions_cm=dimensions, item_price="5.00")
+        for dimensions in ("10x10x10", "20x20x20", "20 by 20", "30x30x30", "1000000x1x1")
+    ])
+
+    result = await backfill_item_dimensions(chunk_size=2)
+
+    # Oversized legacy boxes are left empty rather than overflowing the columns
+    assert result == {"updated": 3, "unparseable": 2}
+    volumes = await OrderItem.all().order_by("item_id").values_list("volume_cm3", flat=True)
+    assert volumes == [Decimal("1000.00"), Decimal("8000.00"), None, Decimal("27000.00"), None]
+
+
+@pytest.mark.asyncio
+async def test_load_summary_aggregates_per_order(db):
+    first, second, other = await new_order(), await new_order(), await new_order(customer_id=2)
+    await create_order_item(first, new_item("50x40x30", "2.00"))
+    await create_order_item(first, new_item("10x10x10", "4.00"))
+    await create_order_item(second, new_item("10x10x10", "1.00"))
+    await create_order_item(other, new_item("10x10x10", "1.00"))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/order/load-summary", params={"customer_id": 1})
+        by_id = await client.get("/order/load-summary", params={"ids": f"{second}"})
+
+    assert response.status_code == 200
+    summary = response.json()
+    assert [row["order_id"] for row in summary] == [first, second]
+    assert summary[0]["item_count"] == 2
+    assert summary[0]["measured_items"] == 2
+    assert Decimal(str(summary[0]["total_weight_kg"])) == Decimal("6.00")
+    assert Decimal(str(summary[0]["total_volume_cm3"])) == Decimal("61000.00")
+    assert Decimal(str(summary[0]["total_chargeable_weight_kg"])) == Decimal("16.00")
+    assert [row["order_id"] for row in by_id.json()] == [second]
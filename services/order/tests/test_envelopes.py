@@ -0,0 +1,67 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from utils.envelopes import BATCH_MESSAGE_TYPE, EnvelopeCodec, batch_envelope, decode_body
+from utils.rabbit_utils import RabbitMQClient
+
+MESSAGE = {
+    "order_id": 1,
+    "total_price": Decimal("100.10"),
+    "delivery_deadline": date(2026, 10, 20),
+    "created_at": datetime(2026, 10, 16, 12, 0, tzinfo=timezone.utc),
+}
+
+
+def test_json_encoding_keeps_decimals_and_dates():
+    body, content_type, content_encoding = EnvelopeCodec().encode(MESSAGE)
+
+    assert (content_type, content_encoding) == ("application/json", None)
+    assert decode_body(body, content_type) == {
+        "order_id": 1,
+        "total_price": "100.10",
+        "delivery_deadline": "2026-10-20",
+        "created_at": "2026-10-16T12:00:00+00:00",
+    }
+
+
+def test_large_bodies_are_compressed():
+    codec = EnvelopeCodec(compression="gzip", compress_min_bytes=200)
+    small = codec.encode(MESSAGE)
+    envelope = batch_envelope([(MESSAGE, "order.created")] * 50)
+    body, content_type, content_encoding = codec.encode(envelope)
+
+    assert small[2] is None
+    assert content_encoding == "gzip"
+    assert len(body) * 10 < len(EnvelopeCodec().encode(envelope)[0])
+    assert decode_body(body, content_type, content_encoding)["count"] == 50
+
+
+def test_unknown_settings_are_rejected():
+    with pytest.raises(ValueError):
+        EnvelopeCodec(serializer="xml")
+    with pytest.raises(ValueError):
+        EnvelopeCodec(compression="brotli")
+
+
+class FakeChannel:
+    def __init__(self):
+        self.published = []
+
+    def basic_publish(self, **kwargs):
+        self.published.append(kwargs)
+
+
+def test_client_sets_content_headers(monkeypatch):
+    client = RabbitMQClient()
+    channel = FakeChannel()
+    monkeypatch.setattr(client, "connect", lambda: channel)
+
+    client.send(batch_envelope([(MESSAGE, "order.created"), (MESSAGE, "order.updated")]), BATCH_MESSAGE_TYPE)
+
+    properties = channel.published[0]["properties"]
+    assert properties.type == BATCH_MESSAGE_TYPE
+    assert properties.content_type == "application/json"
+    assert properties.headers == {"x-event-count": 2}
+    assert decode_body(channel.published[0]["body"])["events"][1]["type"] == "order.updated"
@@ -0,0 +1,81 @@
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+from httpx import ASGITransport, AsyncClient
+
+from controllers.order_controller import save_order_fields
+from main import app
+from models.models import Order, OrderStatusHistory, OutboxEvent
+
+ORDER = {
+    "customer_id": 1,
+    "pickup_location": "123 Pickup St, City",
+    "delivery_location": "456 Delivery St, City",
+    "requested_pickup_date": (date.today() + timedelta(days=1)).isoformat(),
+    "delivery_deadline": (date.today() + timedelta(days=7)).isoformat(),
+    "total_price": "10.00",
+}
+
+
+def client():
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_returns_not_modified_until_the_order_changes(db):
+    async with client() as http:
+        order_id = (await http.post("/order/", json=ORDER)).json()["order_id"]
+        first = await http.get(f"/order/{order_id}")
+        etag = first.headers["etag"]
+        unchanged = await http.get(f"/order/{order_id}", headers={"If-None-Match": etag})
+
+        # Item writes change the total, and so the ETag
+        await http.post(f"/order/{order_id}/item/", json={
+            "cargo_type": "General", "weight_kg": "1.00", "dimensions_cm": "10x10x10", "item_price": "5.00",
+        })
+        changed = await http.get(f"/order/{order_id}", headers={"If-None-Match": f'W/{etag}'})
+
+    assert etag == f'"{order_id}-1"'
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+    assert changed.status_code == 200
+    assert changed.headers["etag"] == f'"{order_id}-2"'
+    assert changed.json()["version"] == 2
+
+
+@pytest.mark.asyncio
+async def test_if_match_rejects_stale_updates(db):
+    async with client() as http:
+        order_id = (await http.post("/order/", json=ORDER)).json()["order_id"]
+        etag = (await http.get(f"/order/{order_id}")).headers["etag"]
+
+        first = await http.put(f"/order/{order_id}", json={**ORDER, "status": "processing"}, headers={"If-Match": etag})
+        # A second client still holding the old ETag
+        stale = await http.put(f"/order/{order_id}", json={**ORDER, "status": "cancelled"}, headers={"If-Match": etag})
+        other_order = await http.put(f"/order/{order_id}", json=ORDER, headers={"If-Match": '"999-2"'})
+
+    assert first.status_code == 200
+    assert first.headers["etag"] == f'"{order_id}-2"'
+    assert stale.status_code == other_order.status_code == 412
+    assert stale.headers["etag"] == f'"{order_id}-2"'
+    order = await Order.get(order_id=order_id)
+    assert (order.status, order.version) == ("processing", 2)
+    assert await OrderStatusHistory.filter(order_id=order_id).count() == 2
+
+
+@pytest.mark.asyncio
+async def test_updates_write_only_changed_fields(db):
+    async with client() as http:
+        order_id = (await http.post("/order/", json=ORDER)).json()["order_id"]
+        unchanged = await http.put(f"/order/{order_id}", json=ORDER)
+
+    assert unchanged.json()["version"] == 1
+    assert await OutboxEvent.filter(message_type="order.updated").count() == 0
+
+    # A write based on an outdated read does not overwrite the newer row
+    order = await Order.get(order_id=order_id)
+    await Order.filter(order_id=order_id).update(pickup_location="Elsewhere", version=2)
+    assert not await save_order_fields(order, {"total_price": Decimal("20.00")}, expected_version=order.version)
+    assert await save_order_fields(order, {"total_price": Decimal("20.00")}, expected_version=2)
+    stored = await Order.get(order_id=order_id)
+    assert (stored.pickup_location, stored.total_price, stored.version) == ("Elsewhere", Decimal("20.00"), 3)
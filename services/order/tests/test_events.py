@@ -0,0 +1,161 @@
+import asyncio
+import orjson
+import pytest
+from datetime import date, timedelta
+
+from controllers.order_controller import create_order
+from controllers.order_item_controller import create_order_item
+from models.models import OrderIn_Pydantic, OrderItemIn_Pydantic
+from routes.events import sse_stream
+from utils.consumer import Delivery
+from utils.envelopes import BATCH_MESSAGE_TYPE, EnvelopeCodec, batch_envelope
+from utils.event_hub import BrokerEventFeed, EventHub, event_hub, format_sse
+
+
+async def new_order(customer_id):
+    order = await create_order(OrderIn_Pydantic(
+        customer_id=customer_id,
+        pickup_location="123 Pickup St, City",
+        delivery_location="456 Delivery St, City",
+        requested_pickup_date=date.today() + timedelta(days=1),
+        delivery_deadline=date.today() + timedelta(days=7),
+        total_price=0,
+    ))
+    return order.order_id
+
+
+def drain(subscription):
+    messages = []
+    while not subscription.queue.empty():
+        messages.append(subscription.queue.get_nowait())
+    return [(message["type"], message["order_id"]) for message in messages]
+
+
+@pytest.mark.asyncio
+async def test_committed_events_reach_matching_subscribers(db, monkeypatch):
+    monkeypatch.setattr("utils.event_hub.EVENT_STREAM_SOURCE", "local")
+    everything = event_hub.subscribe()
+    customer = event_hub.subscribe(customer_id=1)
+    try:
+        first = await new_order(1)
+        other = await new_order(2)
+        single = event_hub.subscribe(order_id=first)
+        try:
+            # Item events carry no customer_id, it is looked up for the customer filter
+            await create_order_item(first, OrderItemIn_Pydantic(
+                cargo_type="General", weight_kg="1.00", dimensions_cm="10x10x10", item_price="5.00",
+            ))
+            await create_order_item(other, OrderItemIn_Pydantic(
+                cargo_type="General", weight_kg="1.00", dimensions_cm="10x10x10", item_price="5.00",
+            ))
+            assert drain(single) == [("order_item.created", first)]
+        finally:
+            event_hub.unsubscribe(single)
+        assert drain(customer) == [("order.created", first), ("order_item.created", first)]
+        assert drain(everything) == [
+            ("order.created", first), ("order.created", other),
+            ("order_item.created", first), ("order_item.created", other),
+        ]
+    finally:
+        event_hub.unsubscribe(everything)
+        event_hub.unsubscribe(customer)
+    assert event_hub.subscriber_count == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_dropped():
+    hub = EventHub(queue_size=2, max_subscribers=2)
+    slow, fast = hub.subscribe(order_id=1), hub.subscribe(order_id=2)
+    with pytest.raises(RuntimeError):
+        hub.subscribe()
+
+    for event_id in range(3):
+        hub.publish({"event_id": event_id, "type": "order.updated", "order_id": 1}, order_id=1)
+    hub.publish({"event_id": 3, "type": "order.updated", "order_id": 2}, order_id=2)
+
+    assert slow.closed and await slow.get() is None
+    assert (await fast.get())["event_id"] == 3
+    assert hub.metrics() == {
+        "published": 4, "delivered": 3, "dropped_subscribers": 1, "rejected_subscribers": 1, "subscribers": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_sse_stream_formats_events_and_unsubscribes():
+    message = {"event_id": 7, "type": "order.updated", "order_id": 3, "data": {"status": "processing"}}
+    encoded = format_sse(message)
+    assert encoded.startswith(b"id: 7\nevent: order.updated\ndata: ")
+    assert orjson.loads(encoded.split(b"data: ", 1)[1]) == message
+
+    subscription = event_hub.subscribe(order_id=3)
+    stream = sse_stream(subscription)
+    event_hub.publish(message, order_id=3)
+    assert await asyncio.wait_for(stream.__anext__(), 1) == encoded
+    await stream.aclose()
+    assert event_hub.subscriber_count == 0
+
+
+@pytest.mark.asyncio
+async def test_broker_feed_streams_events_of_every_worker(db):
+    hub = EventHub()
+    feed = BrokerEventFeed(hub)
+    everything, customer = hub.subscribe(), hub.subscribe(customer_id=1)
+    # Committed by this worker, but not streamed until it comes back from the broker
+    order_id = await new_order(1)
+    assert drain(everything) == []
+
+    # A batched envelope as another worker's relay publishes it
+    codec = EnvelopeCodec(compression="gzip", compress_min_bytes=0)
+    body, content_type, content_encoding = codec.encode(batch_envelope([
+        ({"order_id": order_id, "customer_id": 1}, "order.created"),
+        ({"order_id": order_id, "item_id": 1}, "order_item.created"),
+        ({"order_id": 999, "item_id": 2}, "order_item.created"),
+    ]))
+    await feed.handle(Delivery(1, BATCH_MESSAGE_TYPE, body, content_type, content_encoding))
+    await feed.handle(Delivery(2, "order.created", b"{not json", "application/json"))
+
+    assert drain(everything) == [
+        ("order.created", order_id), ("order_item.created", order_id), ("order_item.created", 999),
+    ]
+    # The item event's customer is looked up, as for local events
+    assert drain(customer) == [("order.created", order_id), ("order_item.created", order_id)]
+    assert feed.metrics()["undecodable"] == 1
+
+
+class FlakyTransport:
+    def __init__(self, deliveries):
+        self._deliveries = deliveries
+        self.closed = False
+
+    async def connect(self, prefetch):
+        pass
+
+    async def deliveries(self):
+        for delivery in self._deliveries:
+            if isinstance(delivery, Exception):
+                raise delivery
+            yield delivery
+        await asyncio.Event().wait()
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_broker_feed_reconnects_after_a_failure():
+    hub = EventHub()
+    subscription = hub.subscribe(order_id=5)
+    body, content_type, content_encoding = EnvelopeCodec().encode({"order_id": 5})
+    transports = [
+        FlakyTransport([ConnectionError("connection reset")]),
+        FlakyTransport([Delivery(1, "order.updated", body, content_type, content_encoding)]),
+    ]
+    feed = BrokerEventFeed(hub, transport_factory=iter(transports).__next__, retry_delay=0)
+
+    await feed.start()
+    message = await asyncio.wait_for(subscription.get(), 1)
+    await feed.stop()
+
+    assert (message["type"], message["order_id"]) == ("order.updated", 5)
+    assert feed.metrics() == {"received": 1, "undecodable": 0, "reconnects": 1, "running": False}
+    assert all(transport.closed for transport in transports)
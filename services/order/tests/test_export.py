@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+import pytest
+from datetime import date, timedelta
+from httpx import ASGITransport, AsyncClient
+
+from controllers.export_controller import export_orders, iter_order_chunks
+from controllers.order_controller import create_order
+from controllers.order_item_controller import create_order_item
+from main import app
+from models.models import OrderIn_Pydantic, OrderItemIn_Pydantic, OrderStatus, PriceCalculation
+
+
+async def new_order(customer_id=1, status=OrderStatus.PENDING):
+    order = await create_order(OrderIn_Pydantic(
+        customer_id=customer_id,
+        pickup_location="123 Pickup St, City",
+        delivery_location="456 Delivery St, City",
+        requested_pickup_date=date.today() + timedelta(days=1),
+        delivery_deadline=date.today() + timedelta(days=7),
+        total_price=0,
+        status=status,
+    ))
+    return order.order_id
+
+
+async def add_item(order_id, price):
+    await create_order_item(order_id, OrderItemIn_Pydantic(
+        cargo_type="Electronics", weight_kg=1, dimensions_cm="1x2x3", item_price=price,
+    ))
+
+
+@pytest.mark.asyncio
+async def test_chunks_cover_every_order_once(db):
+    order_ids = [await new_order() for _ in range(5)]
+    chunks = [chunk async for chunk in iter_order_chunks(chunk_size=2)]
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert [order["order_id"] for chunk in chunks for order in chunk] == order_ids
+
+
+@pytest.mark.asyncio
+async def test_ndjson_export_with_items_and_latest_price(db):
+    first = await new_order(customer_id=1)
+    await new_order(customer_id=2)
+    await add_item(first, 10)
+    await add_item(first, 15)
+    for final_price in (40, 50):
+        await PriceCalculation.create(
+            order_id=first, base_price=final_price, distance_factor=0, weight_factor=0,
+            urgency_factor=0, final_price=final_price,
+        )
+
+    body = b"".join([
+        part async for part in export_orders("ndjson", include_items=True, include_price=True, customer_id=1, chunk_size=1)
+    ])
+    rows = [json.loads(line) for line in body.decode().splitlines()]
+    assert len(rows) == 1
+    assert rows[0]["order_id"] == first
+    assert [item["item_price"] for item in rows[0]["items"]] == ["10.00", "15.00"]
+    assert rows[0]["latest_price"] == "50.00"
+
+
+@pytest.mark.asyncio
+async def test_csv_export_endpoint_applies_filters(db):
+    await new_order(status=OrderStatus.PENDING)
+    delivered = await new_order(status=OrderStatus.DELIVERED)
+    await add_item(delivered, 5)
+    await add_item(delivered, 7)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/order/export", params={"format": "csv", "status": "delivered", "include_items": "true"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["order_id"] for row in rows] == [str(delivered)] * 2
+    assert [row["status"] for row in rows] == ["delivered"] * 2
+    assert [row["item_price"] for row in rows] == ["5.00", "7.00"]
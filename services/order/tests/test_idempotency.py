@@ -0,0 +1,203 @@
+import asyncio
+import pytest
+from datetime import date, timedelta
+from httpx import ASGITransport, AsyncClient
+
+from main import app
+from models.models import IdempotencyKey, Order, OrderItem, OutboxEvent
+from tortoise import timezone
+from utils.idempotency import IdempotencyMiddleware
+
+ORDER = {
+    "customer_id": 1,
+    "pickup_location": "123 Pickup St, City",
+    "delivery_location": "456 Delivery St, City",
+    "requested_pickup_date": (date.today() + timedelta(days=1)).isoformat(),
+    "delivery_deadline": (date.today() + timedelta(days=7)).isoformat(),
+    "total_price": "0.00",
+}
+
+ITEM = {"cargo_type": "General", "weight_kg": "1.00", "dimensions_cm": "10x10x10", "item_price": "5.00"}
+
+
+def client():
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_retries_replay_the_stored_response(db):
+    async with client() as http:
+        first = await http.post("/order/", json=ORDER, headers={"Idempotency-Key": "order-1"})
+        retry = await http.post("/order/", json=ORDER, headers={"Idempotency-Key": "order-1"})
+        order_id = first.json()["order_id"]
+        item_path = f"/order/{order_id}/item/"
+        item = await http.post(item_path, json=ITEM, headers={"Idempotency-Key": "item-1"})
+        item_retry = await http.post(item_path, json=ITEM, headers={"Idempotency-Key": "item-1"})
+        # Without the header every request is a new write
+        await http.post(item_path, json=ITEM)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert item_retry.json() == item.json()
+    assert await Order.all().count() == 1
+    assert await OrderItem.all().count() == 2
+    assert await OutboxEvent.filter(message_type="order.created").count() == 1
+
+
+@pytest.mark.asyncio
+async def test_replays_keep_response_and_cors_headers(db):
+    cors = {"Origin": "http://app.test"}
+    async with client() as http:
+        order_id = (await http.post("/order/", json=ORDER)).json()["order_id"]
+        update = {**ORDER, "status": "processing"}
+        first = await http.put(f"/order/{order_id}", json=update, headers={**cors, "Idempotency-Key": "put-1"})
+        retry = await http.put(f"/order/{order_id}", json=update, headers={**cors, "Idempotency-Key": "put-1"})
+        reused = await http.put(f"/order/{order_id}", json=ORDER, headers={**cors, "Idempotency-Key": "put-1"})
+
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.headers["etag"] == first.headers["etag"]
+    assert retry.headers["content-type"] == first.headers["content-type"]
+    assert retry.headers["content-length"] == str(len(first.content))
+    # Replays and the middleware's own errors pass through CORS like any response
+    assert reused.status_code == 422
+    for response in (first, retry, reused):
+        assert response.headers["access-control-allow-origin"] == cors["Origin"]
+
+
+@pytest.mark.asyncio
+async def test_key_reuse_and_concurrent_retry_are_rejected(db):
+    async with client() as http:
+        await http.post("/order/", json=ORDER, headers={"Idempotency-Key": "order-1"})
+        other = await http.post("/order/", json={**ORDER, "customer_id": 2}, headers={"Idempotency-Key": "order-1"})
+
+        # First attempt still running
+        now = timezone.now()
+        await IdempotencyKey.create(
+            key="order-2", fingerprint="", locked_until=now + timedelta(minutes=1), expires_at=now + timedelta(days=1)
+        )
+        in_progress = await http.post("/order/", json=ORDER, headers={"Idempotency-Key": "order-2"})
+
+    assert other.status_code == 422
+    assert in_progress.status_code == 409
+    assert await Order.all().count() == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_takes_over_a_lapsed_claim(db):
+    # The worker running the first attempt died without releasing the key
+    now = timezone.now()
+    await IdempotencyKey.create(
+        key="order-1", fingerprint="", locked_until=now - timedelta(seconds=1), expires_at=now + timedelta(days=1)
+    )
+    async with client() as http:
+        retry = await http.post("/order/", json=ORDER, headers={"Idempotency-Key": "order-1"})
+        replay = await http.post("/order/", json=ORDER, headers={"Idempotency-Key": "order-1"})
+
+    assert retry.status_code == 201
+    assert replay.headers["idempotent-replayed"] == "true"
+    assert await Order.all().count() == 1
+
+
+@pytest.mark.asyncio
+async def test_running_request_renews_its_claim(db):
+    leases = []
+
+    async def slow_app(scope, receive, send):
+        for _ in range(3):
+            await asyncio.sleep(0.05)
+            leases.append((await IdempotencyKey.get(key="slow")).locked_until)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"done"})
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    middleware = IdempotencyMiddleware(slow_app, lock_timeout=0.06)
+    scope = {"type": "http", "method": "POST", "path": "/slow", "query_string": b"", "headers": [(b"idempotency-key", b"slow")]}
+    await middleware(scope, receive, send)
+
+    assert leases == sorted(leases) and leases[0] < leases[-1]
+    assert (await IdempotencyKey.get(key="slow")).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_expired_and_failed_requests_run_again(db):
+    async with client() as http:
+        invalid = await http.post("/order/", json={**ORDER, "total_price": "-1"}, headers={"Idempotency-Key": "k"})
+        await IdempotencyKey.filter(key="k").update(expires_at=timezone.now() - timedelta(seconds=1))
+        created = await http.post("/order/", json=ORDER, headers={"Idempotency-Key": "k"})
+        missing = await http.delete("/order/999", headers={"Idempotency-Key": "delete-999"})
+
+    # Client errors are stored like any other response, until they expire
+    assert invalid.status_code == 422
+    assert created.status_code == 201
+    assert missing.status_code == 404
+    assert (await IdempotencyKey.get(key="delete-999")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_request_body_streams_through_and_is_fingerprinted(db):
+    received = []
+
+    async def upload_app(scope, receive, send):
+        while True:
+            message = await receive()
+            received.append(message["body"])
+            if not message["more_body"]:
+                break
+        await send({"type": "http.response.start", "status": 201, "headers": []})
+        await send({"type": "http.response.body", "body": b"imported"})
+
+    async def call(chunks):
+        messages = iter([{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+                         for i, chunk in enumerate(chunks)])
+        sent = []
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "POST", "path": "/order/import", "query_string": b"",
+                 "headers": [(b"idempotency-key", b"upload-1")]}
+        await IdempotencyMiddleware(upload_app)(scope, receive, send)
+        return sent[0]["status"], dict(sent[0]["headers"])
+
+    status, _ = await call([b"id,", b"customer", b"\n1,2\n"])
+    replay_status, replay_headers = await call([b"id,customer\n", b"1,2\n"])
+    other_status, _ = await call([b"id,customer\n", b"1,3\n"])
+
+    # The app got each chunk as it arrived, not one buffered body
+    assert received == [b"id,", b"customer", b"\n1,2\n"]
+    assert status == replay_status == 201
+    assert replay_headers[b"idempotent-replayed"] == b"true"
+    assert other_status == 422
+
+
+@pytest.mark.asyncio
+async def test_oversized_responses_are_not_stored(db):
+    async def big_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 201, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b"x" * 10, "more_body": True})
+        await send({"type": "http.response.body", "body": b"x" * 10})
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/big", "query_string": b"", "headers": [(b"idempotency-key", b"big")]}
+    await IdempotencyMiddleware(big_app, max_response_bytes=15)(scope, receive, send)
+
+    # The client got the whole response, but a retry runs again instead of replaying an empty body
+    assert b"".join(message.get("body", b"") for message in sent[1:]) == b"x" * 20
+    assert not await IdempotencyKey.filter(key="big").exists()
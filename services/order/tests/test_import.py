@@ -0,0 +1,66 @@
+import io
+import json
+import pytest
+from datetime import date, timedelta
+from httpx import ASGITransport, AsyncClient
+
+from controllers.import_controller import import_orders
+from main import app
+from models.models import Order, OrderStatus, OrderStatusHistory, OutboxEvent
+
+PICKUP = date.today() - timedelta(days=30)
+DEADLINE = PICKUP + timedelta(days=5)
+
+CSV_FILE = f"""customer_id,pickup_location,delivery_location,requested_pickup_date,delivery_deadline,total_price,status
+1,A St,B St,{PICKUP},{DEADLINE},10.50,delivered
+2,A St,B St,{PICKUP},{PICKUP},10,
+x,A St,B St,{PICKUP},{DEADLINE},10,
+3,A St,B St,{PICKUP},{DEADLINE},12,
+4,A St,B St,not-a-date,{DEADLINE},12,
+5,A St,B St,{PICKUP},{DEADLINE},-1,
+6,A St,B St,{PICKUP},{DEADLINE},7,
+7,A St,B St,{PICKUP},{DEADLINE},123456789012.5,
+"""
+
+
+@pytest.mark.asyncio
+async def test_csv_import_reports_bad_rows_and_batches_the_rest(db):
+    result = await import_orders(io.StringIO(CSV_FILE, newline=""), "csv", batch_size=2)
+
+    assert result["rows"] == 8
+    assert result["imported"] == 3
+    # An amount too large for its column is a row error, not a failed batch insert
+    assert [error["row"] for error in result["errors"]] == [3, 4, 6, 7, 9]
+    assert "Delivery deadline" in result["errors"][0]["error"]
+
+    orders = await Order.all().order_by("order_id")
+    assert [order.customer_id for order in orders] == [1, 3, 6]
+    assert orders[0].status == OrderStatus.DELIVERED
+    assert orders[1].status == OrderStatus.PENDING
+    assert await OrderStatusHistory.all().count() == 3
+
+    events = await OutboxEvent.filter(message_type="order.imported").order_by("event_id")
+    assert [event.order_id for event in events] == [order.order_id for order in orders]
+    assert [event.payload["customer_id"] for event in events] == [1, 3, 6]
+
+
+@pytest.mark.asyncio
+async def test_ndjson_import_endpoint_continues_after_existing_ids(db):
+    rows = [
+        {"customer_id": 1, "pickup_location": "A", "delivery_location": "B",
+         "requested_pickup_date": str(PICKUP), "delivery_deadline": str(DEADLINE), "total_price": 5},
+        "not json",
+        {"customer_id": 2, "pickup_location": "A", "delivery_location": "B",
+         "requested_pickup_date": str(PICKUP), "delivery_deadline": str(DEADLINE), "total_price": 6},
+    ]
+    body = "\n".join(row if isinstance(row, str) else json.dumps(row) for row in rows)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        first = await client.post("/order/import", files={"file": ("orders.ndjson", body)})
+        second = await client.post("/order/import", files={"file": ("orders.ndjson", body)})
+
+    assert first.status_code == 200
+    assert first.json()["imported"] == 2
+    assert first.json()["errors"][0]["row"] == 2
+    assert second.json()["imported"] == 2
+    assert await Order.all().order_by("order_id").values_list("order_id", flat=True) == [1, 2, 3, 4]
@@ -0,0 +1,46 @@
+import pytest
+from datetime import date, timedelta
+
+from controllers.order_controller import create_order, get_all_orders
+from models.models import OrderIn_Pydantic, OrderStatus
+from utils.pagination import encode_cursor
+
+
+async def new_order(customer_id=1, status=OrderStatus.PENDING):
+    return await create_order(OrderIn_Pydantic(
+        customer_id=customer_id,
+        pickup_location="123 Pickup St, City",
+        delivery_location="456 Delivery St, City",
+        requested_pickup_date=date.today() + timedelta(days=1),
+        delivery_deadline=date.today() + timedelta(days=7),
+        total_price=10,
+        status=status,
+    ))
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages_cover_all_orders_once(db):
+    created = [(await new_order()).order_id for _ in range(7)]
+
+    seen, cursor = [], None
+    while True:
+        page = await get_all_orders(limit=3, cursor=cursor)
+        seen += [order.order_id for order in page]
+        if len(page) < 3:
+            break
+        cursor = encode_cursor(page[-1].created_at, page[-1].order_id)
+
+    assert seen == created
+
+
+@pytest.mark.asyncio
+async def test_filters_are_applied_before_limit(db):
+    for _ in range(3):
+        await new_order(customer_id=1)
+    wanted = [(await new_order(customer_id=2, status=OrderStatus.PROCESSING)).order_id for _ in range(2)]
+
+    page = await get_all_orders(limit=2, status=OrderStatus.PROCESSING)
+    assert [order.order_id for order in page] == wanted
+
+    page = await get_all_orders(limit=10, customer_id=2)
+    assert [order.order_id for order in page] == wanted
@@ -0,0 +1,124 @@
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+
+from controllers.order_controller import create_order
+from controllers.order_item_controller import (
+    create_order_item,
+    create_order_items_bulk,
+    update_order_item,
+    delete_order_item,
+)
+from models.models import Order, OrderItem, OrderIn_Pydantic, OrderItemIn_Pydantic, OutboxEvent
+from utils.reconciliation import fix_order_total, reconcile_order_totals
+
+
+async def new_order(total_price=0):
+    order = await create_order(OrderIn_Pydantic(
+        customer_id=1,
+        pickup_location="123 Pickup St, City",
+        delivery_location="456 Delivery St, City",
+        requested_pickup_date=date.today() + timedelta(days=1),
+        delivery_deadline=date.today() + timedelta(days=7),
+        total_price=total_price,
+    ))
+    return order.order_id
+
+
+def item_input(price):
+    return OrderItemIn_Pydantic(
+        cargo_type="Electronics",
+        weight_kg=5.75,
+        dimensions_cm="30x20x15",
+        item_price=price,
+    )
+
+
+async def order_total(order_id):
+    return (await Order.get(order_id=order_id)).total_price
+
+
+@pytest.mark.asyncio
+async def test_item_mutations_apply_deltas(db):
+    order_id = await new_order()
+
+    first = await create_order_item(order_id, item_input("50.25"))
+    await create_order_item(order_id, item_input("0.10"))
+    assert await order_total(order_id) == Decimal("50.35")
+
+    await update_order_item(order_id, first.item_id, item_input("40.00"))
+    assert await order_total(order_id) == Decimal("40.10")
+
+    await delete_order_item(order_id, first.item_id)
+    assert await order_total(order_id) == Decimal("0.10")
+
+
+@pytest.mark.asyncio
+async def test_first_item_replaces_the_order_total(db):
+    order_id = await new_order(total_price="100.50")
+    await create_order_item(order_id, item_input("50.25"))
+    assert await order_total(order_id) == Decimal("50.25")
+
+    bulk_order_id = await new_order(total_price="100.50")
+    await create_order_items_bulk(bulk_order_id, [item_input("1.50"), item_input("2.00")])
+    assert await order_total(bulk_order_id) == Decimal("3.50")
+
+    # The totals are the item sums reconciliation checks against
+    assert (await reconcile_order_totals())["mismatches"] == []
+
+
+@pytest.mark.asyncio
+async def test_item_on_missing_order_is_rejected(db):
+    with pytest.raises(Exception) as exc_info:
+        await create_order_item(999, item_input("1.00"))
+    assert exc_info.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_reconciliation_reports_and_fixes_drift(db):
+    order_id = await new_order()
+    await create_order_item(order_id, item_input("12.00"))
+    await Order.filter(order_id=order_id).update(total_price=Decimal("99.00"))
+
+    result = await reconcile_order_totals()
+    assert [m["order_id"] for m in result["mismatches"]] == [order_id]
+
+    assert (await reconcile_order_totals(fix=True))["fixed"] == 1
+    assert await order_total(order_id) == Decimal("12.00")
+    assert (await reconcile_order_totals())["mismatches"] == []
+    event = await OutboxEvent.filter(order_id=order_id).order_by("-event_id").first()
+    assert event.message_type == "order.updated"
+    assert Decimal(event.payload["total_price"]) == Decimal("12.00")
+
+
+@pytest.mark.asyncio
+async def test_reconciliation_fix_skips_orders_changed_since_read(db):
+    order_id = await new_order()
+    await create_order_item(order_id, item_input("12.00"))
+    await Order.filter(order_id=order_id).update(total_price=Decimal("99.00"))
+    stale = await Order.get(order_id=order_id).values(
+        "order_id", "version", "created_at", "status", "customer_id", "total_price"
+    )
+
+    # An item write commits between the scan and the fix
+    await create_order_item(order_id, item_input("3.00"))
+    assert not await fix_order_total(stale, Decimal("12.00"))
+    assert await order_total(order_id) == Decimal("102.00")
+
+
+@pytest.mark.asyncio
+async def test_bulk_items_update_total_once(db):
+    order_id = await new_order()
+
+    await create_order_item(order_id, item_input("1.00"))
+    result = await create_order_items_bulk(order_id, [item_input("1.50") for _ in range(500)])
+    assert result["created"] == 500
+    assert await order_total(order_id) == Decimal("751.00")
+    item_ids = await OrderItem.filter(order_id=order_id, item_price=Decimal("1.50")).order_by("item_id").values_list("item_id", flat=True)
+    assert result["item_ids"] == item_ids and len(item_ids) == 500
+
+    # Same event shape as a single insert, one per item
+    events = await OutboxEvent.filter(message_type="order_item.created").order_by("event_id")
+    assert len(events) == 501
+    assert events[0].payload.keys() == events[1].payload.keys()
+    assert [event.payload["item_id"] for event in events[1:]] == item_ids
@@ -0,0 +1,83 @@
+import pytest
+from datetime import date, timedelta
+
+from controllers.order_controller import create_order, delete_order
+from controllers.order_item_controller import create_order_item
+from models.models import OrderIn_Pydantic, OrderItemIn_Pydantic, OutboxEvent
+from utils.envelopes import unpack_events
+from utils.outbox import OutboxRelay
+from utils.publisher import AsyncPublisher
+from utils.rabbit_utils import EventRouter
+from tests.fake_broker import FakeBroker
+
+
+def order_input():
+    return OrderIn_Pydantic(
+        customer_id=1,
+        pickup_location="123 Pickup St, City",
+        delivery_location="456 Delivery St, City",
+        requested_pickup_date=date.today() + timedelta(days=1),
+        delivery_deadline=date.today() + timedelta(days=7),
+        total_price=100.50,
+    )
+
+
+@pytest.mark.asyncio
+async def test_write_records_event_in_outbox(db):
+    order = await create_order(order_input())
+
+    events = await OutboxEvent.all()
+    assert [event.message_type for event in events] == ["order.created"]
+    assert events[0].payload["order_id"] == order.order_id
+
+
+@pytest.mark.asyncio
+async def test_relay_publishes_and_clears_outbox(db):
+    order = await create_order(order_input())
+    await delete_order(order.order_id)
+
+    broker = FakeBroker(fail_times=1)
+    publisher = AsyncPublisher(broker, retry_delay=0.01)
+    await publisher.start()
+    relay = OutboxRelay(publisher, batch_size=10)
+
+    assert await relay.relay_batch() == 2
+    assert await OutboxEvent.all().count() == 0
+    assert [message_type for message_type, _ in broker.messages] == ["order.created", "order.deleted"]
+    await publisher.stop()
+
+
+@pytest.mark.asyncio
+async def test_relay_keeps_events_when_broker_is_down(db):
+    await create_order(order_input())
+
+    publisher = AsyncPublisher(FakeBroker(fail_times=100), retry_delay=0.01)
+    await publisher.start()
+    relay = OutboxRelay(publisher, publish_timeout=0.05)
+
+    with pytest.raises(Exception):
+        await relay.relay_batch()
+    assert await OutboxEvent.all().count() == 1
+    await publisher.stop(timeout=0.1)
+
+
+@pytest.mark.asyncio
+async def test_relay_routes_by_type_and_customer_shard(db):
+    order = await create_order(order_input())
+    await create_order_item(order.order_id, OrderItemIn_Pydantic(
+        cargo_type="General", weight_kg="1.00", dimensions_cm="10x10x10", item_price="5.00",
+    ))
+    await create_order_item(order.order_id, OrderItemIn_Pydantic(
+        cargo_type="General", weight_kg="2.00", dimensions_cm="10x10x10", item_price="6.00",
+    ))
+
+    broker = FakeBroker()
+    publisher = AsyncPublisher(broker, batch_size=10, batch_window=0.01)
+    await publisher.start()
+    relay = OutboxRelay(publisher, router=EventRouter("topic", customer_shards=4))
+
+    assert await relay.relay_batch() == 3
+    # Item events carry no customer, the relay looks it up; batches are split by key
+    assert broker.routing_keys == ["order.created.1", "order_item.created.1"]
+    assert [len(unpack_events(message, message_type)) for message_type, message in broker.messages] == [1, 2]
+    await publisher.stop()
@@ -0,0 +1,106 @@
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+from httpx import ASGITransport, AsyncClient
+
+from controllers.order_controller import create_order
+from main import app
+from models.models import Order, OrderIn_Pydantic, OutboxEvent, PriceCalculation
+from utils.pricing import calculate_final_price, quote_prices
+
+
+async def new_order():
+    order = await create_order(OrderIn_Pydantic(
+        customer_id=1,
+        pickup_location="123 Pickup St, City",
+        delivery_location="456 Delivery St, City",
+        requested_pickup_date=date.today() + timedelta(days=1),
+        delivery_deadline=date.today() + timedelta(days=7),
+        total_price=0,
+    ))
+    return order.order_id
+
+
+def test_quote_prices_rounds_half_up_in_cents():
+    # 10.05 * 1.50 = 15.075, which float rounding turns into 15.07
+    assert calculate_final_price("10.05", "0.20", "0.20", "0.10") == Decimal("15.08")
+    assert quote_prices(["100", "0.01"], ["0.5", "0"], ["0", "0"], ["0.25", "0"]) == [
+        Decimal("175.00"),
+        Decimal("0.01"),
+    ]
+
+
+def test_quote_prices_rejects_mismatched_inputs():
+    with pytest.raises(ValueError):
+        quote_prices(["1", "2"], ["0"], ["0"], ["0"])
+
+
+@pytest.mark.asyncio
+async def test_quote_batch_endpoint_does_not_persist(db):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/order/price/quote-batch", json=[
+            {"base_price": "100.00", "distance_factor": "0.50"},
+            {"base_price": "10.05", "distance_factor": "0.20", "weight_factor": "0.20", "urgency_factor": "0.10"},
+        ])
+    assert response.status_code == 200
+    body = response.json()
+    assert body["count"] == 2
+    assert [Decimal(str(price)) for price in body["final_prices"]] == [Decimal("150.00"), Decimal("15.08")]
+    assert await PriceCalculation.all().count() == 0
+
+
+@pytest.mark.asyncio
+async def test_out_of_range_price_inputs_are_rejected(db):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        huge_price = await client.post("/order/price/quote-batch", json=[{"base_price": "1e20"}])
+        huge_factor = await client.post("/order/price/quote-batch", json=[{"base_price": "1", "urgency_factor": "1000"}])
+        largest = await client.post("/order/price/quote-batch", json=[{"base_price": "99999999.99", "urgency_factor": "999.99"}])
+    assert huge_price.status_code == huge_factor.status_code == 422
+    assert largest.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_bulk_price_calculations_update_order_totals(db):
+    first, second = await new_order(), await new_order()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/order/price/bulk", json=[
+            {"order_id": first, "base_price": "100.00", "distance_factor": "0.10"},
+            {"order_id": second, "base_price": "50.00"},
+            {"order_id": first, "base_price": "100.00", "urgency_factor": "0.25"},
+        ])
+        missing = await client.post("/order/price/bulk", json=[{"order_id": 999, "base_price": "1"}])
+    assert response.status_code == 201
+    assert response.json()["created"] == 3
+    assert missing.status_code == 404
+
+    assert await PriceCalculation.filter(order_id=first).count() == 2
+    assert (await Order.get(order_id=first)).total_price == Decimal("125.00")
+    assert (await Order.get(order_id=second)).total_price == Decimal("50.00")
+    events = await OutboxEvent.filter(message_type="price_calculation.created").order_by("order_id")
+    assert [event.order_id for event in events] == [first, second]
+    assert len(events[0].payload["calculations"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_out_of_range_computed_prices_are_rejected(db):
+    order_id = await new_order()
+    # Both inputs fit their columns, but 99999999.99 * 1000.99 does not fit DECIMAL(10,2)
+    overflowing = {"base_price": "99999999.99", "urgency_factor": "999.99"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        bulk = await client.post("/order/price/bulk", json=[
+            {"order_id": order_id, "base_price": "1"},
+            {"order_id": order_id, **overflowing},
+        ])
+        calculation = await client.post(f"/order/{order_id}/price/", json={
+            "base_price": "100", "distance_factor": "0", "weight_factor": "0", "urgency_factor": "0", "final_price": "100",
+        })
+        update = await client.put(f"/order/{order_id}/price/{calculation.json()['calculation_id']}", json={
+            **overflowing, "distance_factor": "0", "weight_factor": "0", "final_price": "1",
+        })
+
+    assert bulk.status_code == 422
+    assert "calculation 1" in bulk.json()["detail"]
+    assert update.status_code == 422
+    assert update.json()["detail"].startswith("Final price")
+    assert await PriceCalculation.all().count() == 1
+    assert (await Order.get(order_id=order_id)).total_price == Decimal("100.00")
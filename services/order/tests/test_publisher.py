@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+
+from utils.envelopes import BATCH_MESSAGE_TYPE, unpack_events
+from utils.publisher import AsyncPublisher
+from tests.fake_broker import FakeBroker
+
+
+@pytest.mark.asyncio
+async def test_publish_does_not_wait_for_broker():
+    broker = FakeBroker(delay=0.05)
+    publisher = AsyncPublisher(broker)
+    await publisher.start()
+
+    # Enqueueing returns immediately even though the broker is slow
+    assert publisher.publish_message({"order_id": 1}, "order.created") is True
+    assert broker.messages == []
+
+    await publisher.stop()
+    assert broker.messages == [("order.created", {"order_id": 1})]
+    assert broker.closed
+
+
+@pytest.mark.asyncio
+async def test_submit_resolves_after_retries():
+    broker = FakeBroker(fail_times=2)
+    publisher = AsyncPublisher(broker, retry_delay=0.01)
+    await publisher.start()
+
+    future = publisher.submit({"order_id": 2}, "order.updated")
+    assert await asyncio.wait_for(future, 1) is True
+
+    metrics = publisher.metrics()
+    assert metrics["published"] == 1
+    assert metrics["failed_attempts"] == 2
+    await publisher.stop()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_applies_backpressure():
+    broker = FakeBroker(delay=0.05)
+    publisher = AsyncPublisher(broker, max_queue_size=2)
+    await publisher.start()
+
+    results = [publisher.publish_message({"n": n}, "order.created") for n in range(3)]
+    assert results == [True, True, False]
+    assert publisher.metrics()["dropped"] == 1
+    await publisher.stop()
+
+
+@pytest.mark.asyncio
+async def test_publish_before_start_fails():
+    publisher = AsyncPublisher(FakeBroker())
+    assert publisher.publish_message({"order_id": 3}, "order.created") is False
+
+
+@pytest.mark.asyncio
+async def test_burst_is_sent_as_batched_envelopes():
+    broker = FakeBroker()
+    publisher = AsyncPublisher(broker, batch_size=3, batch_window=0.01)
+    await publisher.start()
+
+    futures = [publisher.submit({"n": n}, "order.created") for n in range(5)]
+    assert await asyncio.wait_for(asyncio.gather(*futures), 1) == [True] * 5
+
+    assert [message_type for message_type, _ in broker.messages] == [BATCH_MESSAGE_TYPE, BATCH_MESSAGE_TYPE]
+    events = [event for message_type, message in broker.messages for event in unpack_events(message, message_type)]
+    assert events == [("order.created", {"n": n}) for n in range(5)]
+    assert publisher.metrics()["published"] == 5
+    assert publisher.metrics()["broker_messages"] == 2
+
+    # A lone event is sent as it is
+    await publisher.submit({"n": 5}, "order.updated")
+    assert broker.messages[-1] == ("order.updated", {"n": 5})
+    await publisher.stop()
@@ -0,0 +1,103 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from main import app
+from tests.query_counter import count_queries
+
+ORDER = {
+    "customer_id": 1,
+    "pickup_location": "123 Pickup St, City",
+    "delivery_location": "456 Delivery St, City",
+    "requested_pickup_date": "2030-01-01",
+    "delivery_deadline": "2030-01-08",
+    "total_price": 100.50,
+    "status": "pending",
+}
+ITEM = {
+    "cargo_type": "Electronics",
+    "weight_kg": 5.75,
+    "dimensions_cm": "30x20x15",
+    "item_price": 50.25,
+}
+PRICE = {
+    "base_price": 100,
+    "distance_factor": 0.1,
+    "weight_factor": 0.2,
+    "urgency_factor": 0.3,
+    "final_price": 160,
+}
+HISTORY = {"status": "processing", "changed_by": 1}
+
+
+@pytest.fixture
+async def client(db):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+async def order_id(client):
+    response = await client.post("/order/", json=ORDER)
+    return response.json()["order_id"]
+
+
+async def assert_budget(client, method, url, budget, json=None):
+    with count_queries() as queries:
+        response = await client.request(method, url, json=json)
+    assert response.status_code < 400, response.text
+    assert len(queries) <= budget, f"{method} {url} ran {len(queries)} queries:\n" + "\n".join(queries)
+    return response
+
+
+@pytest.mark.asyncio
+async def test_order_endpoints_query_budget(client, order_id):
+    await assert_budget(client, "GET", "/order/", 1)
+    await assert_budget(client, "GET", f"/order/{order_id}", 1)
+    # Writes that change an order's count or revenue also upsert its daily rollup row
+    await assert_budget(client, "POST", "/order/", 4, json=ORDER)
+    await assert_budget(client, "PUT", f"/order/{order_id}", 5, json={**ORDER, "status": "processing"})
+    await assert_budget(client, "DELETE", f"/order/{order_id}", 4)
+
+
+@pytest.mark.asyncio
+async def test_item_endpoints_query_budget(client, order_id):
+    # Adding an item locks the order and checks for existing items to set its total
+    item_id = (await assert_budget(client, "POST", f"/order/{order_id}/item/", 6, json=ITEM)).json()["item_id"]
+    await assert_budget(client, "GET", f"/order/{order_id}/item/", 2)
+    await assert_budget(client, "GET", f"/order/{order_id}/item/{item_id}", 1)
+    await assert_budget(client, "PUT", f"/order/{order_id}/item/{item_id}", 5, json={**ITEM, "item_price": 10})
+    await assert_budget(client, "DELETE", f"/order/{order_id}/item/{item_id}", 5)
+
+
+@pytest.mark.asyncio
+async def test_price_endpoints_query_budget(client, order_id):
+    calc_id = (await assert_budget(client, "POST", f"/order/{order_id}/price/", 5, json=PRICE)).json()["calculation_id"]
+    await assert_budget(client, "GET", f"/order/{order_id}/price/", 2)
+    await assert_budget(client, "GET", f"/order/{order_id}/price/{calc_id}", 1)
+    await assert_budget(client, "DELETE", f"/order/{order_id}/price/{calc_id}", 3)
+
+
+@pytest.mark.asyncio
+async def test_history_endpoints_query_budget(client, order_id):
+    history_id = (
+        await assert_budget(client, "POST", f"/order/{order_id}/history-status/", 5, json=HISTORY)
+    ).json()["history_id"]
+    await assert_budget(client, "GET", f"/order/{order_id}/history-status/", 2)
+    await assert_budget(client, "GET", f"/order/{order_id}/history-status/{history_id}", 1)
+    await assert_budget(client, "DELETE", f"/order/{order_id}/history-status/{history_id}", 3)
+
+
+@pytest.mark.asyncio
+async def test_order_detail_query_budget_is_constant(client, order_id):
+    other_id = (await client.post("/order/", json=ORDER)).json()["order_id"]
+    for target in (order_id, other_id):
+        await client.post(f"/order/{target}/item/", json=ITEM)
+        await client.post(f"/order/{target}/price/", json=PRICE)
+
+    detail = (await assert_budget(client, "GET", f"/order/{order_id}/full", 4)).json()
+    assert detail["order"]["order_id"] == order_id
+    assert len(detail["items"]) == 1 and len(detail["price_calculations"]) == 1
+    assert len(detail["status_history"]) == 1
+
+    details = (await assert_budget(client, "GET", f"/order/full?ids={other_id},{order_id},999", 4)).json()
+    assert [d["order"]["order_id"] for d in details] == [other_id, order_id]
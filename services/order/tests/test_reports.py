@@ -0,0 +1,116 @@
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from httpx import ASGITransport, AsyncClient
+
+from controllers.order_controller import create_order
+from controllers.order_item_controller import create_order_item
+from controllers.status_history_controller import create_status_history_entry
+from main import app
+from models.models import (
+    Order,
+    OrderIn_Pydantic,
+    OrderItemIn_Pydantic,
+    OrderStatus,
+    OrderStatusHistory,
+    OrderStatusHistoryIn_Pydantic,
+)
+
+
+async def new_order(customer_id, total_price, created_at, deadline_days=7):
+    order = await create_order(OrderIn_Pydantic(
+        customer_id=customer_id,
+        pickup_location="123 Pickup St, City",
+        delivery_location="456 Delivery St, City",
+        requested_pickup_date=date.today() + timedelta(days=1),
+        delivery_deadline=date.today() + timedelta(days=7),
+        total_price=total_price,
+    ))
+    await Order.filter(order_id=order.order_id).update(
+        created_at=created_at,
+        delivery_deadline=created_at.date() + timedelta(days=deadline_days),
+    )
+    return order.order_id
+
+
+async def deliver(order_id, delivered_at):
+    entry = await create_status_history_entry(order_id, OrderStatusHistoryIn_Pydantic(
+        status=OrderStatus.DELIVERED,
+        changed_by=1,
+    ))
+    await OrderStatusHistory.filter(history_id=entry.history_id).update(changed_at=delivered_at)
+
+
+async def get(path, **params):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get(path, params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+# Wednesday and Friday of one week, and the Monday after
+WEDNESDAY = datetime(2026, 10, 7, 12, 0, tzinfo=timezone.utc)
+FRIDAY = datetime(2026, 10, 9, 12, 0, tzinfo=timezone.utc)
+MONDAY = datetime(2026, 10, 12, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_order_report_buckets_by_creation_date(db):
+    first = await new_order(1, "100.00", WEDNESDAY)
+    await new_order(2, "50.50", FRIDAY)
+    await new_order(1, "25.00", MONDAY)
+    for _ in range(2):
+        await create_order_item(first, OrderItemIn_Pydantic(
+            cargo_type="General", weight_kg="1.00", dimensions_cm="10x10x10", item_price="50.00",
+        ))
+
+    daily = await get("/order/reports/orders")
+    weekly = await get("/order/reports/orders", bucket="week")
+
+    assert [row["bucket"] for row in daily] == ["2026-10-07", "2026-10-09", "2026-10-12"]
+    assert [(row["bucket"], row["order_count"]) for row in weekly] == [("2026-10-05", 2), ("2026-10-12", 1)]
+    assert Decimal(str(weekly[0]["revenue"])) == Decimal("150.50")
+    assert weekly[0]["avg_items"] == 1.0
+
+    by_status = await get("/order/reports/orders", bucket="month", by_status=True, customer_id=1)
+    assert [(row["status"], row["order_count"]) for row in by_status] == [("pending", 2)]
+
+
+@pytest.mark.asyncio
+async def test_status_and_customer_reports(db):
+    await new_order(1, "100.00", WEDNESDAY)
+    await new_order(1, "20.00", FRIDAY)
+    delivered = await new_order(2, "30.00", FRIDAY)
+    await deliver(delivered, FRIDAY)
+
+    statuses = await get("/order/reports/status")
+    assert [(row["status"], row["order_count"]) for row in statuses] == [("delivered", 1), ("pending", 2)]
+    assert statuses[1]["share"] == round(2 / 3, 4)
+
+    customers = await get("/order/reports/customers", limit=1)
+    assert [(row["customer_id"], row["order_count"]) for row in customers] == [(1, 2)]
+    assert Decimal(str(customers[0]["revenue"])) == Decimal("120.00")
+
+
+@pytest.mark.asyncio
+async def test_on_time_report_compares_delivery_with_deadline(db):
+    on_time = await new_order(1, "10.00", WEDNESDAY, deadline_days=7)
+    late = await new_order(1, "10.00", WEDNESDAY, deadline_days=1)
+    await new_order(1, "10.00", WEDNESDAY)
+    await deliver(on_time, FRIDAY)
+    await deliver(late, FRIDAY)
+
+    report = await get("/order/reports/on-time")
+
+    assert report == [{"bucket": "2026-10-09", "delivered": 2, "on_time": 1, "late": 1, "on_time_ratio": 0.5}]
+
+
+@pytest.mark.asyncio
+async def test_reports_are_cached_for_the_window(db):
+    await new_order(1, "10.00", WEDNESDAY)
+    assert (await get("/order/reports/status"))[0]["order_count"] == 1
+
+    await new_order(1, "10.00", WEDNESDAY)
+
+    assert (await get("/order/reports/status"))[0]["order_count"] == 1
+    assert (await get("/order/reports/status", customer_id=1))[0]["order_count"] == 2
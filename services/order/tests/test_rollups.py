@@ -0,0 +1,94 @@
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from httpx import ASGITransport, AsyncClient
+
+from controllers.order_controller import create_order, delete_order
+from controllers.order_item_controller import create_order_item
+from controllers.price_calculation_controller import create_price_calculation
+from controllers.status_history_controller import create_status_history_entry
+from main import app
+from models.models import (
+    Order,
+    OrderDailyRollup,
+    OrderIn_Pydantic,
+    OrderItemIn_Pydantic,
+    OrderStatus,
+    OrderStatusHistoryIn_Pydantic,
+    PriceCalculationIn_Pydantic,
+)
+from utils.rollups import rebuild_rollups
+
+
+async def new_order(customer_id=1, total_price="0.00"):
+    order = await create_order(OrderIn_Pydantic(
+        customer_id=customer_id,
+        pickup_location="123 Pickup St, City",
+        delivery_location="456 Delivery St, City",
+        requested_pickup_date=date.today() + timedelta(days=1),
+        delivery_deadline=date.today() + timedelta(days=7),
+        total_price=total_price,
+    ))
+    return order.order_id
+
+
+async def rollup_rows():
+    rows = await OrderDailyRollup.filter(order_count__gt=0).order_by("day", "status", "customer_id").values(
+        "day", "status", "customer_id", "order_count", "revenue"
+    )
+    return [(row["day"], row["status"], row["customer_id"], row["order_count"], Decimal(str(row["revenue"]))) for row in rows]
+
+
+@pytest.mark.asyncio
+async def test_write_paths_keep_rollups_in_sync(db):
+    first, second, deleted = await new_order(1, "10.00"), await new_order(1), await new_order(2, "5.00")
+    await create_order_item(second, OrderItemIn_Pydantic(
+        cargo_type="General", weight_kg="1.00", dimensions_cm="10x10x10", item_price="7.25",
+    ))
+    await create_status_history_entry(first, OrderStatusHistoryIn_Pydantic(status=OrderStatus.PROCESSING, changed_by=1))
+    await create_price_calculation(first, PriceCalculationIn_Pydantic(
+        base_price="100.00", distance_factor="0.10", weight_factor="0", urgency_factor="0", final_price="110.00",
+    ))
+    await delete_order(deleted)
+
+    today = date.today()
+    incremental = await rollup_rows()
+    assert incremental == [
+        (today, "pending", 1, 1, Decimal("7.25")),
+        (today, "processing", 1, 1, Decimal("110.00")),
+    ]
+
+    # A full rebuild from the orders table gives the same rows
+    await rebuild_rollups()
+    assert await rollup_rows() == incremental
+
+
+@pytest.mark.asyncio
+async def test_rebuild_since_only_touches_later_days(db):
+    old_id, recent_id = await new_order(1, "1.00"), await new_order(1, "2.00")
+    await Order.filter(order_id=old_id).update(created_at=datetime(2026, 1, 5, 9, 0, tzinfo=timezone.utc))
+    await Order.filter(order_id=recent_id).update(created_at=datetime(2026, 2, 5, 9, 0, tzinfo=timezone.utc))
+    await OrderDailyRollup.all().delete()
+
+    result = await rebuild_rollups(since=date(2026, 2, 1), chunk_size=1)
+
+    assert result == {"orders": 1}
+    assert await rollup_rows() == [(date(2026, 2, 5), "pending", 1, 1, Decimal("2.00"))]
+
+
+@pytest.mark.asyncio
+async def test_daily_report_reads_rollups(db):
+    await new_order(1, "10.00")
+    await new_order(2, "2.50")
+    await OrderDailyRollup.create(
+        day=date(2026, 1, 5), status=OrderStatus.DELIVERED, customer_id=1, order_count=3, revenue="30.00"
+    )
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        daily = (await client.get("/order/reports/daily")).json()
+        monthly = (await client.get("/order/reports/daily", params={"bucket": "month", "customer_id": 1})).json()
+
+    today = date.today().isoformat()
+    assert [(row["bucket"], row["order_count"]) for row in daily] == [("2026-01-05", 3), (today, 2)]
+    assert Decimal(str(daily[1]["revenue"])) == Decimal("12.50")
+    assert [row["order_count"] for row in monthly] == [3, 1]
@@ -0,0 +1,50 @@
+import pytest
+
+from utils.rabbit_utils import EventRouter
+
+
+class FakeChannel:
+    def __init__(self):
+        self.calls = []
+
+    def exchange_declare(self, **kwargs):
+        self.calls.append(("exchange", kwargs["exchange"], kwargs["exchange_type"]))
+
+    def queue_declare(self, **kwargs):
+        self.calls.append(("queue", kwargs["queue"]))
+
+    def queue_bind(self, **kwargs):
+        self.calls.append(("bind", kwargs["queue"], kwargs["routing_key"]))
+
+
+def test_direct_router_uses_one_key():
+    router = EventRouter("direct", default_key="order_key", customer_shards=8)
+
+    assert router.routing_key("order.created", 5) == "order_key"
+    assert not router.needs_customer
+    channel = FakeChannel()
+    router.declare(channel, "order_exchange", "order_queue")
+    assert channel.calls[-1] == ("bind", "order_queue", "order_key")
+
+
+def test_topic_router_keys_by_type_and_customer_shard():
+    plain = EventRouter("topic")
+    sharded = EventRouter("topic", customer_shards=4, binding_keys=["order.created.*", "order_item.#"])
+
+    assert plain.routing_key("order_item.deleted", 5) == "order_item.deleted"
+    assert sharded.routing_key("order.created", 7) == "order.created.3"
+    assert sharded.routing_key("order.created") == "order.created.none"
+
+    channel = FakeChannel()
+    sharded.declare(channel, "order_events", "billing")
+    assert channel.calls == [
+        ("exchange", "order_events", "topic"),
+        ("queue", "billing"),
+        ("bind", "billing", "order.created.*"),
+        ("bind", "billing", "order_item.#"),
+    ]
+
+
+def test_unknown_exchange_type_is_rejected():
+    with pytest.raises(ValueError):
+        EventRouter("fanout")
@@ -0,0 +1,105 @@
+import json
+import os
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+from httpx import ASGITransport, AsyncClient
+
+from controllers.order_controller import create_order
+from controllers.order_item_controller import create_order_item
+from main import app
+from models.models import Order, OrderIn_Pydantic, OrderItemIn_Pydantic
+from utils.tariffs import TariffStore, TariffTable
+
+TARIFF = {
+    "version": "test-1",
+    "distance_bands": [
+        {"max_km": None, "factor": "0.50"},
+        {"max_km": 100, "factor": "0.10"},
+        {"max_km": 25, "factor": "0.00"},
+    ],
+    "weight_breaks": [
+        {"min_kg": 0, "factor": "0.00"},
+        {"min_kg": 50, "factor": "0.05"},
+    ],
+    "cargo_surcharges": {"default": "0.01", "Hazardous": "0.40"},
+    "urgency": {"standard": "0.00", "express": "0.25"},
+}
+
+
+def write_tariff(path, document, mtime):
+    path.write_text(json.dumps(document))
+    os.utime(path, (mtime, mtime))
+
+
+def test_lookups_use_band_boundaries():
+    table = TariffTable(TARIFF)
+    assert [table.distance_factor(km) for km in (0, 25, 25.1, 100, 5000)] == [0, 0, 10, 10, 50]
+    assert [table.weight_factor(kg) for kg in (0, 49.9, 50)] == [1, 1, 6]
+    assert table.weight_factor(10, "HAZARDOUS") == 40
+
+    distance, weight, urgency = table.factors([25, 25.1, 5000], [0, 50, 10], [None, "other", "hazardous"], ["standard", "express", "Express"])
+    assert distance.tolist() == [0, 10, 50]
+    assert weight.tolist() == [1, 6, 40]
+    assert urgency.tolist() == [0, 25, 25]
+
+    with pytest.raises(ValueError):
+        table.urgency_factor("overnight")
+
+
+def test_store_reloads_changed_file_and_keeps_last_good(tmp_path):
+    path = tmp_path / "tariffs.json"
+    write_tariff(path, TARIFF, 1_000_000)
+    store = TariffStore(str(path), reload_interval=0)
+    assert store.current().version == "test-1"
+
+    write_tariff(path, {**TARIFF, "version": "test-2"}, 2_000_000)
+    assert store.current().version == "test-2"
+
+    write_tariff(path, {**TARIFF, "version": "test-3", "urgency": None}, 3_000_000)
+    assert store.current().version == "test-2"
+    assert store.current().version == "test-2"
+    assert store.metrics()["failed_reloads"] == 1
+
+
+@pytest.mark.asyncio
+async def test_tariff_endpoints_price_quotes_and_orders(db):
+    order = await create_order(OrderIn_Pydantic(
+        customer_id=1,
+        pickup_location="123 Pickup St, City",
+        delivery_location="456 Delivery St, City",
+        requested_pickup_date=date.today() + timedelta(days=1),
+        delivery_deadline=date.today() + timedelta(days=7),
+        total_price=0,
+    ))
+    for cargo_type, weight in (("General", 30), ("Hazardous", 30)):
+        await create_order_item(order.order_id, OrderItemIn_Pydantic(
+            cargo_type=cargo_type, weight_kg=weight, dimensions_cm="10x10x10", item_price=50,
+        ))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        quotes = await client.post("/order/price/tariff-quote-batch", json=[
+            {"base_price": "100", "distance_km": 10},
+            {"base_price": "100", "distance_km": 150, "weight_kg": 300, "cargo_type": "hazardous", "urgency": "express"},
+        ])
+        bad_urgency = await client.post("/order/price/tariff-quote-batch", json=[
+            {"base_price": "100", "distance_km": 10, "urgency": "overnight"},
+        ])
+        calculation = await client.post(f"/order/{order.order_id}/price/tariff", json={"distance_km": 150})
+        # The base price fits, the final price with surcharges does not
+        overflowing = await client.post(
+            f"/order/{order.order_id}/price/tariff", json={"distance_km": 150, "base_price": "99999999.99"}
+        )
+
+    assert quotes.status_code == 200
+    final_prices = [Decimal(str(quote["final_price"])) for quote in quotes.json()["quotes"]]
+    # 100 * 1.00, and 100 * (1 + 0.25 distance + 0.15 weight + 0.40 hazardous + 0.25 express)
+    assert final_prices == [Decimal("100.00"), Decimal("205.00")]
+    assert bad_urgency.status_code == 400
+
+    # Items total 100 and weigh 60 kg (0.05 break) including a hazardous one (0.40)
+    assert calculation.status_code == 201
+    assert Decimal(str(calculation.json()["final_price"])) == Decimal("170.00")
+    assert (await Order.get(order_id=order.order_id)).total_price == Decimal("170.00")
+    assert overflowing.status_code == 422
+    assert overflowing.json()["detail"][0].startswith("final_price:")
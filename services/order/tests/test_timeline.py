@@ -0,0 +1,100 @@
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from httpx import ASGITransport, AsyncClient
+
+from controllers.order_controller import create_order, update_order
+from controllers.status_history_controller import create_status_history_entry
+from main import app
+from models.models import (
+    Order,
+    OrderIn_Pydantic,
+    OrderStatus,
+    OrderStatusHistory,
+    OrderStatusHistoryIn_Pydantic,
+)
+from tests.query_counter import count_queries
+
+ORDER = dict(
+    customer_id=1,
+    pickup_location="123 Pickup St, City",
+    delivery_location="456 Delivery St, City",
+    requested_pickup_date=date.today() + timedelta(days=1),
+    delivery_deadline=date.today() + timedelta(days=7),
+    total_price=0,
+)
+
+
+async def new_order():
+    return (await create_order(OrderIn_Pydantic(**ORDER))).order_id
+
+
+async def set_status(order_id, status):
+    return await create_status_history_entry(order_id, OrderStatusHistoryIn_Pydantic(status=status, changed_by=1))
+
+
+@pytest.mark.asyncio
+async def test_status_changes_set_status_timestamps(db):
+    order_id = await new_order()
+    order = await Order.get(order_id=order_id)
+    assert order.status_changed_at is not None
+    assert order.entered_in_transit_at is None
+
+    entry = await set_status(order_id, OrderStatus.IN_TRANSIT)
+    order = await Order.get(order_id=order_id)
+    assert order.entered_in_transit_at == order.status_changed_at == entry.changed_at
+
+    await update_order(order_id, OrderIn_Pydantic(**ORDER, status=OrderStatus.DELIVERED))
+    order = await Order.get(order_id=order_id)
+    assert order.delivered_at == order.status_changed_at
+    assert order.delivered_at > order.entered_in_transit_at
+
+
+@pytest.mark.asyncio
+async def test_repeated_status_keeps_status_timestamps(db):
+    order_id = await new_order()
+    entry = await set_status(order_id, OrderStatus.IN_TRANSIT)
+    await set_status(order_id, OrderStatus.IN_TRANSIT)
+
+    order = await Order.get(order_id=order_id)
+    assert order.entered_in_transit_at == order.status_changed_at == entry.changed_at
+    assert await OrderStatusHistory.filter(order_id=order_id).count() == 3
+
+
+@pytest.mark.asyncio
+async def test_orders_in_status_since(db):
+    stuck, recent, other = await new_order(), await new_order(), await new_order()
+    for order_id in (stuck, recent):
+        await set_status(order_id, OrderStatus.IN_TRANSIT)
+    await Order.filter(order_id=stuck).update(status_changed_at=datetime(2026, 1, 1, tzinfo=timezone.utc))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        in_transit = await client.get("/order/in-status", params={"status": "in_transit"})
+        stuck_only = await client.get("/order/in-status", params={
+            "status": "in_transit",
+            "entered_before": "2026-02-01T00:00:00+00:00",
+        })
+
+    assert [order["order_id"] for order in in_transit.json()] == [stuck, recent]
+    assert [order["order_id"] for order in stuck_only.json()] == [stuck]
+
+
+@pytest.mark.asyncio
+async def test_timelines_for_many_orders_in_one_query(db):
+    first, second = await new_order(), await new_order()
+    await set_status(first, OrderStatus.PROCESSING)
+    await set_status(first, OrderStatus.PROCESSING)
+    await set_status(first, OrderStatus.IN_TRANSIT)
+    await OrderStatusHistory.create(order_id=second, status=OrderStatus.PENDING, changed_by=2, notes="Re-sent")
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        with count_queries() as queries:
+            response = await client.get("/order/timelines", params={"ids": f"{second},{first},999"})
+        full = await client.get("/order/timelines", params={"ids": f"{first}", "compact": "false"})
+
+    assert response.status_code == 200
+    assert len(queries) == 1
+    timelines = response.json()
+    assert [timeline["order_id"] for timeline in timelines] == [second, first]
+    assert [entry["status"] for entry in timelines[0]["timeline"]] == ["pending"]
+    assert [entry["status"] for entry in timelines[1]["timeline"]] == ["pending", "processing", "in_transit"]
+    assert len(full.json()[0]["timeline"]) == 4
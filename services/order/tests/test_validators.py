@@ -0,0 +1,120 @@
+import pytest
+from datetime import date, timedelta
+from httpx import ASGITransport, AsyncClient
+from pydantic import ValidationError
+
+from main import app
+from models.models import OrderCreate_Pydantic, OrderIn_Pydantic, OrderItemIn_Pydantic
+from utils.validators import parse_dimensions, validate_records
+
+TOMORROW = date.today() + timedelta(days=1)
+
+
+def order_data(**overrides):
+    return {
+        "customer_id": 1,
+        "pickup_location": "123 Pickup St, City",
+        "delivery_location": "456 Delivery St, City",
+        "requested_pickup_date": TOMORROW,
+        "delivery_deadline": TOMORROW + timedelta(days=6),
+        "total_price": 10,
+        **overrides,
+    }
+
+
+def item_data(**overrides):
+    return {
+        "cargo_type": "Electronics",
+        "weight_kg": 5.75,
+        "dimensions_cm": "30x20x15",
+        "item_price": 10,
+        **overrides,
+    }
+
+
+def test_parse_dimensions():
+    assert parse_dimensions("10.5x20x30") == (10.5, 20.0, 30.0)
+    assert parse_dimensions(" 10 X 20 x 30 ") == (10.0, 20.0, 30.0)
+    assert parse_dimensions("10000x10000x10000") == (10000.0, 10000.0, 10000.0)
+    for invalid in ("10x20", "10x20x30x40", "axbxc", "-1x2x3", "", "1000000x1x1", "1x1x10000.01"):
+        with pytest.raises(ValueError):
+            parse_dimensions(invalid)
+
+
+def test_item_input_checks_dimensions_weight_and_price():
+    item = OrderItemIn_Pydantic(**item_data())
+    assert item.dimensions_cm == "30x20x15"
+
+    with pytest.raises(ValidationError) as error:
+        OrderItemIn_Pydantic(**item_data(dimensions_cm="30by20", weight_kg=0, item_price=-1))
+    assert {str(entry["loc"][0]) for entry in error.value.errors()} == {"dimensions_cm", "weight_kg", "item_price"}
+
+    # Amounts must fit DECIMAL(8,2) and DECIMAL(10,2)
+    with pytest.raises(ValidationError) as error:
+        OrderItemIn_Pydantic(**item_data(weight_kg=1000000, item_price="123456789012.5"))
+    assert {str(entry["loc"][0]) for entry in error.value.errors()} == {"weight_kg", "item_price"}
+    assert OrderItemIn_Pydantic(**item_data(weight_kg="999999.99", item_price="99999999.99"))
+
+
+def test_order_input_checks_dates():
+    with pytest.raises(ValidationError):
+        OrderIn_Pydantic(**order_data(delivery_deadline=TOMORROW))
+    with pytest.raises(ValidationError):
+        OrderIn_Pydantic(**order_data(total_price="123456789012.5"))
+    with pytest.raises(ValidationError):
+        OrderCreate_Pydantic(**order_data(requested_pickup_date=date.today() - timedelta(days=1)))
+
+    # Updates and imports may describe orders whose pickup has passed
+    past = date.today() - timedelta(days=10)
+    record = OrderIn_Pydantic(**order_data(requested_pickup_date=past, delivery_deadline=past + timedelta(days=1)))
+    assert record.requested_pickup_date == past
+
+
+def test_validate_records_reports_every_invalid_record():
+    valid, invalid = validate_records(OrderItemIn_Pydantic, [
+        item_data(),
+        item_data(dimensions_cm="1x1", weight_kg=0),
+        item_data(),
+        item_data(item_price=-5),
+    ])
+    assert len(valid) == 2
+    assert [entry["index"] for entry in invalid] == [1, 3]
+    assert len(invalid[0]["errors"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_create_order_rejects_deadline_before_pickup(db):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/order/", json={
+            **order_data(),
+            "requested_pickup_date": str(TOMORROW),
+            "delivery_deadline": str(TOMORROW),
+        })
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_update_order_allows_past_pickup(db):
+    past = date.today() - timedelta(days=10)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/order/", json={
+            **order_data(),
+            "requested_pickup_date": str(past),
+            "delivery_deadline": str(past + timedelta(days=1)),
+        })
+        assert response.status_code == 422
+
+        created = await client.post("/order/", json={
+            **order_data(),
+            "requested_pickup_date": str(TOMORROW),
+            "delivery_deadline": str(TOMORROW + timedelta(days=6)),
+        })
+        order_id = created.json()["order_id"]
+        response = await client.put(f"/order/{order_id}", json={
+            **order_data(),
+            "requested_pickup_date": str(past),
+            "delivery_deadline": str(past + timedelta(days=1)),
+            "status": "delivered",
+        })
+    assert response.status_code == 200
+    assert response.json()["status"] == "delivered"
@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import logging
+from typing import Dict
+
+from tortoise import Tortoise
+
+from config.settings import TORTOISE_ORM
+from models.models import OrderItem
+from utils.dimensions import MEASURE_FIELDS, measure_item
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill_item_dimensions(chunk_size: int = 1000) -> Dict[str, int]:
+    """
+    Fill the numeric dimension columns of items written before they existed.
+
+    Items without a volume are scanned in item_id chunks, and each chunk is
+    written back with one bulk update. Items whose dimensions cannot be
+    parsed are counted and left empty.
+
+    Args:
+        chunk_size: Number of items read and updated per round trip
+
+    Returns:
+        Number of updated and unparseable items
+    """
+    updated = 0
+    unparseable = 0
+    last_id = 0
+
+    while True:
+        items = await (
+            OrderItem.filter(volume_cm3__isnull=True, item_id__gt=last_id)
+            .order_by("item_id")
+            .limit(chunk_size)
+            .only("item_id", *MEASURE_FIELDS, "dimensions_cm", "weight_kg")
+        )
+        if not items:
+            break
+        last_id = items[-1].item_id
+
+        measured = []
+        for item in items:
+            measures = measure_item(item.dimensions_cm, item.weight_kg)
+            if measures["volume_cm3"] is None:
+                unparseable += 1
+                continue
+            for field, value in measures.items():
+                setattr(item, field, value)
+            measured.append(item)
+        if measured:
+            await OrderItem.bulk_update(measured, fields=list(MEASURE_FIELDS), batch_size=chunk_size)
+            updated += len(measured)
+        logger.info(f"Backfilled dimensions up to item {last_id}")
+
+    if unparseable:
+        logger.warning(f"{unparseable} items have dimensions that cannot be parsed")
+    return {"updated": updated, "unparseable": unparseable}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Fill numeric dimension columns of existing order items")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    await Tortoise.init(config=TORTOISE_ORM)
+    try:
+        result = await backfill_item_dimensions(chunk_size=args.chunk_size)
+    finally:
+        await Tortoise.close_connections()
+
+    print(f"Updated {result['updated']} items, {result['unparseable']} with unparseable dimensions")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,155 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config.settings import (
+    CACHE_BACKEND,
+    CACHE_TTL,
+    CACHE_MAX_ENTRIES,
+    REDIS_URL,
+)
+from models.models import OutboxEvent
+from utils.outbox import on_commit
+
+logger = logging.getLogger(__name__)
+
+
+class LocalCache:
+    """In-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            if self._entries.pop(key, None) is not None:
+                self._stats["invalidations"] += 1
+
+    async def clear(self):
+        self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self._stats, "backend": "memory", "size": len(self._entries), "max_entries": self.max_entries}
+
+
+class RedisCache:
+    """
+    Cache backed by a Redis-compatible server, shared by all replicas.
+
+    Values are stored as JSON; expiry and eviction are left to the server.
+    """
+
+    def __init__(self, client, ttl: float = CACHE_TTL, prefix: str = "order-service:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        await self.client.set(self.prefix + key, json.dumps(value), ex=int(ttl or self.ttl))
+
+    async def delete(self, *keys: str):
+        if keys:
+            self._stats["invalidations"] += await self.client.delete(*(self.prefix + key for key in keys))
+
+    async def clear(self):
+        keys = [key async for key in self.client.scan_iter(match=self.prefix + "*")]
+        if keys:
+            await self.client.delete(*keys)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self._stats, "backend": "redis"}
+
+
+def create_cache():
+    """Build the cache backend selected by CACHE_BACKEND."""
+    if CACHE_BACKEND == "redis":
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package (pip install redis)")
+        return RedisCache(redis_asyncio.from_url(REDIS_URL))
+    return LocalCache()
+
+
+async def get_or_load(key: str, loader: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+    """
+    Return the cached value for key, loading and caching it on a miss.
+
+    The loader must return JSON-compatible data, or None for "not found"
+    (which is not cached).
+    """
+    value = await cache.get(key)
+    if value is None:
+        value = await loader()
+        if value is not None:
+            await cache.set(key, value)
+    return value
+
+
+def order_key(order_id: int, part: Optional[str] = None) -> str:
+    """Cache key for an order or one of its child collections."""
+    return f"order:{order_id}:{part}" if part else f"order:{order_id}"
+
+
+# Child collections affected by each event family, besides the order itself
+_INVALIDATED_PARTS = {
+    "order": ("items", "prices", "history"),
+    "order_item": ("items",),
+    "price_calculation": ("prices",),
+    "order_status": ("history",),
+    "order_status_history": ("history",),
+}
+
+
+@on_commit
+async def invalidate_order_cache(events: List[OutboxEvent]):
+    """Drop cached data touched by committed writes."""
+    keys = set()
+    for event in events:
+        if event.order_id is None:
+            continue
+        keys.add(order_key(event.order_id))
+        family = event.message_type.split(".", 1)[0]
+        keys.update(order_key(event.order_id, part) for part in _INVALIDATED_PARTS.get(family, ()))
+    if keys:
+        await cache.delete(*keys)
+
+
+# Singleton instance
+cache = create_cache()
@@ -0,0 +1,411 @@
+import argparse
+import asyncio
+import concurrent.futures
+import importlib
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+import pika
+
+from config.settings import (
+    RABBITMQ_HOST,
+    RABBITMQ_PORT,
+    RABBITMQ_USER,
+    RABBITMQ_PASSWORD,
+    RABBITMQ_QUEUE,
+    RABBITMQ_EXCHANGE,
+    RABBITMQ_DEAD_LETTER_QUEUE,
+    CONSUMER_PREFETCH,
+    CONSUMER_CONCURRENCY,
+    CONSUMER_ACK_BATCH_SIZE,
+    CONSUMER_ACK_INTERVAL,
+    CONSUMER_MAX_ATTEMPTS,
+    CONSUMER_RETRY_DELAY,
+)
+from utils.envelopes import codec, decode_body, unpack_events
+from utils.rabbit_utils import EventRouter, event_router
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class Delivery:
+    """One message received from the broker."""
+
+    __slots__ = ("tag", "message_type", "body", "content_type", "content_encoding")
+
+    def __init__(
+        self,
+        tag: int,
+        message_type: Optional[str],
+        body: bytes,
+        content_type: Optional[str] = None,
+        content_encoding: Optional[str] = None,
+    ):
+        self.tag = tag
+        self.message_type = message_type
+        self.body = body
+        self.content_type = content_type
+        self.content_encoding = content_encoding
+
+
+class PikaConsumerTransport:
+    """
+    Consumes order_queue with a blocking pika connection on its own thread.
+
+    With exclusive set it consumes a private queue instead, bound with
+    binding_keys and deleted when the connection closes (e.g. one per
+    worker for the event stream); without a dead_letter_queue nothing is
+    dead-lettered, and with auto_ack the broker needs no acks.
+
+    Deliveries are handed to the event loop through an asyncio queue; acks
+    and dead-letter publishes are scheduled back onto the pika thread, since
+    the channel is not thread safe. The channel is in confirm mode, so a
+    dead-letter publish returns once the broker has stored the copy.
+    """
+
+    def __init__(
+        self,
+        queue: str = RABBITMQ_QUEUE,
+        dead_letter_queue: Optional[str] = RABBITMQ_DEAD_LETTER_QUEUE,
+        router: EventRouter = event_router,
+        exclusive: bool = False,
+        binding_keys: Optional[List[str]] = None,
+        auto_ack: bool = False,
+    ):
+        self.queue = queue
+        self.dead_letter_queue = dead_letter_queue
+        self.router = router
+        self.exclusive = exclusive
+        self.binding_keys = binding_keys
+        self.auto_ack = auto_ack
+        self.connection = None
+        self.channel = None
+        self._deliveries: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rabbitmq-consumer")
+        self._consuming = None
+
+    def _connect(self, prefetch: int):
+        credentials = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASSWORD)
+        self.connection = pika.BlockingConnection(
+            pika.ConnectionParameters(host=RABBITMQ_HOST, port=RABBITMQ_PORT, credentials=credentials)
+        )
+        self.channel = self.connection.channel()
+        self.queue = self.router.declare(
+            self.channel, RABBITMQ_EXCHANGE, self.queue, exclusive=self.exclusive, binding_keys=self.binding_keys
+        )
+        if self.dead_letter_queue:
+            self.channel.queue_declare(queue=self.dead_letter_queue, durable=True)
+            self.channel.confirm_delivery()
+        self.channel.basic_qos(prefetch_count=prefetch)
+        logger.info(f"Consuming {self.queue} at {RABBITMQ_HOST}:{RABBITMQ_PORT} (prefetch {prefetch})")
+
+    def _consume(self):
+        # Ends the deliveries with None, or with the error that stopped the
+        # pika thread (e.g. the connection dropped), so run() does not hang
+        end = None
+        try:
+            for method, properties, body in self.channel.consume(
+                self.queue, auto_ack=self.auto_ack, inactivity_timeout=1
+            ):
+                if self._stopping.is_set():
+                    break
+                if method is None:
+                    continue
+                delivery = Delivery(
+                    method.delivery_tag, properties.type, body, properties.content_type, properties.content_encoding
+                )
+                self._loop.call_soon_threadsafe(self._deliveries.put_nowait, delivery)
+            self.channel.cancel()
+        except Exception as e:
+            logger.error(f"Consuming {self.queue} failed: {e!r}")
+            end = e
+        finally:
+            self._loop.call_soon_threadsafe(self._deliveries.put_nowait, end)
+
+    async def connect(self, prefetch: int):
+        self._loop = asyncio.get_running_loop()
+        self._deliveries = asyncio.Queue()
+        await self._loop.run_in_executor(self._executor, self._connect, prefetch)
+        self._consuming = self._loop.run_in_executor(self._executor, self._consume)
+
+    async def deliveries(self):
+        """Yield deliveries until the consumer stops; raises the error that stopped it."""
+        while True:
+            delivery = await self._deliveries.get()
+            if delivery is None:
+                return
+            if isinstance(delivery, Exception):
+                raise delivery
+            yield delivery
+
+    def _threadsafe(self, callback: Callable[[], None]):
+        self.connection.add_callback_threadsafe(callback)
+
+    async def _call(self, callback: Callable[[], Any]) -> Any:
+        """Run callback on the pika thread and wait for its result."""
+        future = concurrent.futures.Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(callback())
+            except Exception as e:
+                future.set_exception(e)
+
+        self._threadsafe(run)
+        return await asyncio.wrap_future(future)
+
+    async def ack(self, tag: int, multiple: bool = False):
+        self._threadsafe(lambda: self.channel.basic_ack(delivery_tag=tag, multiple=multiple))
+
+    async def requeue(self, tag: int):
+        self._threadsafe(lambda: self.channel.basic_nack(delivery_tag=tag, requeue=True))
+
+    async def dead_letter(self, delivery: Delivery, reason: str):
+        if not self.dead_letter_queue:
+            logger.error(f"Dropping delivery {delivery.tag} ({delivery.message_type}): {reason}")
+            return
+        properties = pika.BasicProperties(
+            content_type=delivery.content_type,
+            content_encoding=delivery.content_encoding,
+            type=delivery.message_type,
+            headers={"x-dead-letter-reason": reason[:1000]},
+            delivery_mode=2,
+        )
+        # Waits for the broker's confirm (raises if it nacks or cannot route
+        # the copy), so the original is only acked once the copy is stored
+        await self._call(lambda: self.channel.basic_publish(
+            exchange="", routing_key=self.dead_letter_queue, body=delivery.body, properties=properties,
+            mandatory=True,
+        ))
+
+    async def close(self):
+        self._stopping.set()
+        if self._consuming is not None:
+            await self._consuming
+        if self.connection and self.connection.is_open:
+            await self._loop.run_in_executor(self._executor, self.connection.close)
+        self._executor.shutdown(wait=False)
+
+
+class OrderEventConsumer:
+    """
+    Runs registered async handlers for the order events in order_queue.
+
+    Deliveries are dispatched by their AMQP type (batched envelopes are
+    unpacked) and handled with at most `concurrency` messages in flight.
+    Acks are cumulative: once every message up to a delivery tag is done,
+    one ack covers all of them, sent every ack_batch_size messages or
+    ack_interval seconds. A message whose handler still fails after
+    max_attempts, or that cannot be decoded, is copied to the dead-letter
+    queue and acked. A message handed back to the broker (requeued) is never
+    covered by a cumulative ack: the run of finished messages before it is
+    acked on its own, and acks resume after it. Delivery is at-least-once and handlers for the same
+    order may run concurrently, so handlers must be idempotent.
+    """
+
+    def __init__(
+        self,
+        transport,
+        prefetch: int = CONSUMER_PREFETCH,
+        concurrency: int = CONSUMER_CONCURRENCY,
+        ack_batch_size: int = CONSUMER_ACK_BATCH_SIZE,
+        ack_interval: float = CONSUMER_ACK_INTERVAL,
+        max_attempts: int = CONSUMER_MAX_ATTEMPTS,
+        retry_delay: float = CONSUMER_RETRY_DELAY,
+    ):
+        self.transport = transport
+        self.prefetch = prefetch
+        self.concurrency = concurrency
+        self.ack_batch_size = ack_batch_size
+        self.ack_interval = ack_interval
+        self.max_attempts = max(max_attempts, 1)
+        self.retry_delay = retry_delay
+        self._handlers: Dict[str, List[Handler]] = {}
+        # Delivery tags in arrival order, the finished ones not yet acked, and
+        # the requeued ones, which close a run of cumulatively acked tags
+        self._unacked: deque = deque()
+        self._finished: Set[int] = set()
+        self._requeued: Set[int] = set()
+        self._ackable: Optional[int] = None
+        self._ackable_count = 0
+        # Last tags of runs closed by a requeue, acked before the current one
+        self._closed_runs: List[int] = []
+        self._ack_lock = asyncio.Lock()
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats = {
+            "received": 0,
+            "handled": 0,
+            "ignored": 0,
+            "retries": 0,
+            "dead_lettered": 0,
+            "requeued": 0,
+            "acks": 0,
+        }
+
+    def handler(self, *message_types: str):
+        """
+        Register a coroutine for events of the given types ('*' for all).
+
+        The handler is called with the event payload, as published.
+        """
+        def register(func: Handler) -> Handler:
+            for message_type in message_types:
+                self._handlers.setdefault(message_type, []).append(func)
+            return func
+        return register
+
+    def handlers_for(self, message_type: Optional[str]) -> List[Handler]:
+        return self._handlers.get(message_type or "", []) + self._handlers.get("*", [])
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self._stats, "in_flight": len(self._tasks), "unacked": len(self._unacked)}
+
+    async def run(self):
+        """Consume until the transport stops delivering, then ack what was handled."""
+        await self.transport.connect(self.prefetch)
+        slots = asyncio.Semaphore(self.concurrency)
+        flusher = asyncio.create_task(self._flush_periodically())
+        try:
+            async for delivery in self.transport.deliveries():
+                await slots.acquire()
+                self._stats["received"] += 1
+                self._unacked.append(delivery.tag)
+                task = asyncio.create_task(self._process(delivery))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                task.add_done_callback(lambda _: slots.release())
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            flusher.cancel()
+            await self.flush_acks()
+
+    async def _process(self, delivery: Delivery):
+        try:
+            try:
+                message = decode_body(delivery.body, delivery.content_type, delivery.content_encoding)
+                events = unpack_events(message, delivery.message_type)
+            except Exception as e:
+                await self._dead_letter(delivery, f"Undecodable message: {e!r}")
+                events = []
+            for message_type, payload in events:
+                error = await self._dispatch(message_type, payload)
+                if error is None:
+                    continue
+                if len(events) > 1:
+                    # Only the failing event of an envelope is dead-lettered
+                    body, content_type, content_encoding = codec.encode(payload)
+                    failed = Delivery(delivery.tag, message_type, body, content_type, content_encoding)
+                    await self._dead_letter(failed, error)
+                else:
+                    await self._dead_letter(delivery, error)
+        except Exception as e:
+            # e.g. the dead-letter publish failed; hand the message back to the broker
+            logger.error(f"Consumer failed on delivery {delivery.tag}, requeueing: {e!r}")
+            await self.transport.requeue(delivery.tag)
+            self._requeued.add(delivery.tag)
+            self._stats["requeued"] += 1
+        self._finish(delivery.tag)
+
+    async def _dispatch(self, message_type: Optional[str], payload: Any) -> Optional[str]:
+        """Run the handlers of one event; returns the error if it kept failing."""
+        handlers = self.handlers_for(message_type)
+        if not handlers:
+            self._stats["ignored"] += 1
+            return None
+        for func in handlers:
+            delay = self.retry_delay
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    await func(payload)
+                    break
+                except Exception as e:
+                    if attempt == self.max_attempts:
+                        logger.error(f"Handler {func.__qualname__} failed on {message_type} {attempt} times: {e!r}")
+                        return f"{func.__qualname__}: {e!r}"
+                    self._stats["retries"] += 1
+                    await asyncio.sleep(delay)
+                    delay *= 2
+        self._stats["handled"] += 1
+        return None
+
+    async def _dead_letter(self, delivery: Delivery, reason: str):
+        await self.transport.dead_letter(delivery, reason)
+        self._stats["dead_lettered"] += 1
+
+    def _finish(self, tag: int):
+        self._finished.add(tag)
+        # Advance over the contiguous run of finished tags; a cumulative ack
+        # must not cover a message that is still being handled
+        while self._unacked and self._unacked[0] in self._finished:
+            tag = self._unacked.popleft()
+            self._finished.discard(tag)
+            if tag in self._requeued:
+                # Already settled by its nack: ack up to the tag before it,
+                # and start a new run after it
+                self._requeued.discard(tag)
+                if self._ackable is not None:
+                    self._closed_runs.append(self._ackable)
+                    self._ackable = None
+                continue
+            self._ackable = tag
+            self._ackable_count += 1
+        if self._ackable_count >= self.ack_batch_size or self._closed_runs:
+            task = asyncio.create_task(self.flush_acks())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def flush_acks(self):
+        """Ack every message finished so far, one cumulative ack per run."""
+        tags, self._closed_runs = self._closed_runs, []
+        if self._ackable is not None:
+            tags.append(self._ackable)
+        self._ackable, self._ackable_count = None, 0
+        # In order, so a later run's ack never goes out before an earlier one
+        async with self._ack_lock:
+            for tag in tags:
+                await self.transport.ack(tag, multiple=True)
+                self._stats["acks"] += 1
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.ack_interval)
+            try:
+                await self.flush_acks()
+            except Exception as e:
+                logger.error(f"Consumer ack failed: {e!r}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run registered handlers for the order events in RabbitMQ")
+    parser.add_argument(
+        "modules", nargs="+",
+        help="Modules that register handlers on utils.consumer.order_events, e.g. myteam.order_handlers",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # Handler modules import utils.consumer, which is not this __main__ module
+    consumer = importlib.import_module("utils.consumer").order_events
+    for module in args.modules:
+        importlib.import_module(module)
+    try:
+        await consumer.run()
+    finally:
+        await consumer.transport.close()
+
+
+# Singleton instance
+order_events = OrderEventConsumer(PikaConsumerTransport())
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,32 @@
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Optional
+
+from config.settings import VOLUMETRIC_DIVISOR
+from utils.validators import parse_dimensions
+
+MEASURE_FIELDS = ("length_cm", "width_cm", "height_cm", "volume_cm3", "chargeable_weight_kg")
+
+CENT = Decimal("0.01")
+
+
+def measure_item(dimensions_cm: str, weight_kg, divisor: int = VOLUMETRIC_DIVISOR) -> Dict[str, Optional[Decimal]]:
+    """
+    Compute the numeric dimension columns of an order item.
+
+    The chargeable weight is the larger of the actual weight and the
+    volumetric weight (volume / divisor). Dimensions that cannot be parsed
+    (legacy rows) leave every column empty.
+    """
+    try:
+        length, width, height = (Decimal(str(part)) for part in parse_dimensions(dimensions_cm))
+    except (TypeError, ValueError):
+        return dict.fromkeys(MEASURE_FIELDS)
+    volume = length * width * height
+    chargeable_weight = max(Decimal(str(weight_kg)), volume / divisor)
+    return {
+        "length_cm": length.quantize(CENT, rounding=ROUND_HALF_UP),
+        "width_cm": width.quantize(CENT, rounding=ROUND_HALF_UP),
+        "height_cm": height.quantize(CENT, rounding=ROUND_HALF_UP),
+        "volume_cm3": volume.quantize(CENT, rounding=ROUND_HALF_UP),
+        "chargeable_weight_kg": chargeable_weight.quantize(CENT, rounding=ROUND_HALF_UP),
+    }
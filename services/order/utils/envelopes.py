@@ -0,0 +1,109 @@
+import gzip
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+from config.settings import (
+    EVENT_SERIALIZER,
+    EVENT_COMPRESSION,
+    EVENT_COMPRESS_MIN_BYTES,
+)
+
+# AMQP message type of an envelope carrying several events
+BATCH_MESSAGE_TYPE = "order.batch"
+
+CONTENT_TYPES = {
+    "json": "application/json",
+    "msgpack": "application/msgpack",
+}
+
+
+def batch_envelope(events: List[Tuple[Dict[str, Any], Optional[str]]]) -> Dict[str, Any]:
+    """
+    Wrap (message, message_type) pairs into one envelope, in order.
+
+    Published with the BATCH_MESSAGE_TYPE type; unpack_events() restores the
+    individual events.
+    """
+    return {
+        "count": len(events),
+        "events": [{"type": message_type, "data": message} for message, message_type in events],
+    }
+
+
+def unpack_events(message: Any, message_type: Optional[str]) -> List[Tuple[Optional[str], Any]]:
+    """Get the (message_type, message) pairs carried by a decoded broker message."""
+    if message_type == BATCH_MESSAGE_TYPE:
+        return [(event["type"], event["data"]) for event in message["events"]]
+    return [(message_type, message)]
+
+
+def _default(value: Any) -> Any:
+    # Decimals are sent as strings so amounts keep their exact value
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class EnvelopeCodec:
+    """
+    Encodes broker message bodies with the configured serializer and compression.
+
+    The content type and encoding are returned with the body, to be set as
+    AMQP properties, so consumers can decode without knowing the settings.
+    """
+
+    def __init__(self, serializer: str = "json", compression: str = "none", compress_min_bytes: int = 1024):
+        if serializer not in CONTENT_TYPES:
+            raise ValueError(f"Unknown event serializer: {serializer}")
+        if compression not in ("none", "gzip"):
+            raise ValueError(f"Unknown event compression: {compression}")
+        if serializer == "msgpack":
+            try:
+                import msgpack
+            except ImportError:
+                raise RuntimeError("EVENT_SERIALIZER=msgpack requires the 'msgpack' package (pip install msgpack)")
+            self._msgpack = msgpack
+        self.serializer = serializer
+        self.compression = compression
+        self.compress_min_bytes = compress_min_bytes
+
+    @property
+    def content_type(self) -> str:
+        return CONTENT_TYPES[self.serializer]
+
+    def encode(self, message: Any) -> Tuple[bytes, str, Optional[str]]:
+        """
+        Returns:
+            (body, content_type, content_encoding); the encoding is None when
+            the body is not compressed
+        """
+        if self.serializer == "msgpack":
+            body = self._msgpack.packb(message, default=_default)
+        else:
+            body = orjson.dumps(message, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        # Small bodies are not worth the CPU on either side
+        if self.compression == "gzip" and len(body) >= self.compress_min_bytes:
+            return gzip.compress(body, compresslevel=5), self.content_type, "gzip"
+        return body, self.content_type, None
+
+
+def decode_body(body: bytes, content_type: Optional[str] = None, content_encoding: Optional[str] = None) -> Any:
+    """Decode a message body from its AMQP content type and encoding."""
+    if content_encoding == "gzip":
+        body = gzip.decompress(body)
+    elif content_encoding:
+        raise ValueError(f"Unsupported content encoding: {content_encoding}")
+    if content_type == CONTENT_TYPES["msgpack"]:
+        import msgpack
+        return msgpack.unpackb(body)
+    # Messages without a content type were always JSON
+    return orjson.loads(body)
+
+
+# Singleton instance
+codec = EnvelopeCodec(EVENT_SERIALIZER, EVENT_COMPRESSION, EVENT_COMPRESS_MIN_BYTES)
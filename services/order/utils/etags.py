@@ -0,0 +1,47 @@
+from typing import Optional, Set
+
+# ETags look like "<order_id>-<version>"; weak validators (W/) compare equal
+
+
+def order_etag(order_id: int, version: int) -> str:
+    return f'"{order_id}-{version}"'
+
+
+def _tags(header: str) -> Set[str]:
+    tags = set()
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag:
+            tags.add(tag)
+    return tags
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches etag."""
+    if not header:
+        return False
+    tags = _tags(header)
+    return "*" in tags or etag in tags
+
+
+def if_match_versions(header: Optional[str], order_id: int) -> Optional[Set[int]]:
+    """
+    Get the order versions an If-Match header allows.
+
+    Returns:
+        None if any version is allowed (no header or *); an empty set if no
+        tag belongs to this order, so the update fails its precondition
+    """
+    if not header:
+        return None
+    tags = _tags(header)
+    if "*" in tags:
+        return None
+    prefix = f'"{order_id}-'
+    versions = set()
+    for tag in tags:
+        if tag.startswith(prefix) and tag.endswith('"') and tag[len(prefix):-1].isdigit():
+            versions.add(int(tag[len(prefix):-1]))
+    return versions
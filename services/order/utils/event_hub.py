@@ -0,0 +1,307 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+
+import orjson
+
+from config.settings import (
+    EVENT_STREAM_QUEUE_SIZE,
+    EVENT_STREAM_MAX_SUBSCRIBERS,
+    EVENT_STREAM_SOURCE,
+)
+from models.models import OutboxEvent
+from utils.consumer import Delivery, PikaConsumerTransport
+from utils.envelopes import decode_body, unpack_events
+from utils.outbox import event_customers, on_commit
+from utils.rabbit_utils import event_router
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    One streaming client's view of the hub.
+
+    Events are handed over through a bounded queue; a client that falls
+    more than queue_size events behind is closed (it should reconnect and
+    re-read the orders it cares about) rather than holding events forever.
+    """
+
+    __slots__ = ("order_id", "customer_id", "queue", "closed")
+
+    def __init__(self, order_id: Optional[int], customer_id: Optional[int], queue_size: int):
+        self.order_id = order_id
+        self.customer_id = customer_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+
+    def matches(self, order_id: Optional[int], customer_id: Optional[int]) -> bool:
+        if self.order_id is not None and self.order_id != order_id:
+            return False
+        if self.customer_id is not None and self.customer_id != customer_id:
+            return False
+        return True
+
+    async def get(self) -> Optional[Dict[str, Any]]:
+        """Wait for the next event; None once the subscription is closed."""
+        if self.closed and self.queue.empty():
+            return None
+        return await self.queue.get()
+
+
+class EventHub:
+    """
+    In-process fan-out of committed order events to streaming clients.
+
+    Subscriptions are indexed by order_id and customer_id, so publishing an
+    event only touches the clients that asked for it, and idle clients cost
+    nothing but their queue (no per-connection polling). The hub is fed
+    by a BrokerEventFeed, or with EVENT_STREAM_SOURCE=local by the events
+    this worker commits.
+    """
+
+    def __init__(self, queue_size: int = EVENT_STREAM_QUEUE_SIZE, max_subscribers: int = EVENT_STREAM_MAX_SUBSCRIBERS):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._by_order: Dict[int, Set[Subscription]] = {}
+        self._by_customer: Dict[int, Set[Subscription]] = {}
+        self._unfiltered: Set[Subscription] = set()
+        self._count = 0
+        self._customer_filtered = 0
+        self._stats = {"published": 0, "delivered": 0, "dropped_subscribers": 0, "rejected_subscribers": 0}
+
+    @property
+    def subscriber_count(self) -> int:
+        return self._count
+
+    @property
+    def has_customer_subscribers(self) -> bool:
+        return self._customer_filtered > 0
+
+    def subscribe(self, order_id: Optional[int] = None, customer_id: Optional[int] = None) -> Subscription:
+        """
+        Register a client for events of one order, one customer's orders or all orders.
+
+        Raises:
+            RuntimeError: The worker already serves max_subscribers clients
+        """
+        if self._count >= self.max_subscribers:
+            self._stats["rejected_subscribers"] += 1
+            raise RuntimeError(f"Too many event stream subscribers (max {self.max_subscribers})")
+        subscription = Subscription(order_id, customer_id, self.queue_size)
+        if order_id is not None:
+            self._by_order.setdefault(order_id, set()).add(subscription)
+        elif customer_id is not None:
+            self._by_customer.setdefault(customer_id, set()).add(subscription)
+        else:
+            self._unfiltered.add(subscription)
+        self._count += 1
+        if customer_id is not None:
+            self._customer_filtered += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription.order_id is not None:
+            index, key = self._by_order, subscription.order_id
+        elif subscription.customer_id is not None:
+            index, key = self._by_customer, subscription.customer_id
+        else:
+            index, key = None, None
+        subscriptions = self._unfiltered if index is None else index.get(key, set())
+        if subscription not in subscriptions:
+            return
+        subscriptions.discard(subscription)
+        if index is not None and not subscriptions:
+            del index[key]
+        self._count -= 1
+        if subscription.customer_id is not None:
+            self._customer_filtered -= 1
+
+    def publish(self, message: Dict[str, Any], order_id: Optional[int] = None, customer_id: Optional[int] = None):
+        """Hand an event to every matching subscriber without blocking."""
+        self._stats["published"] += 1
+        candidates: List[Subscription] = list(self._unfiltered)
+        if order_id is not None:
+            candidates.extend(self._by_order.get(order_id, ()))
+        if customer_id is not None:
+            candidates.extend(self._by_customer.get(customer_id, ()))
+        for subscription in candidates:
+            if subscription.closed or not subscription.matches(order_id, customer_id):
+                continue
+            try:
+                subscription.queue.put_nowait(message)
+                self._stats["delivered"] += 1
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    def _drop(self, subscription: Subscription):
+        subscription.closed = True
+        self.unsubscribe(subscription)
+        self._stats["dropped_subscribers"] += 1
+        # Wake the client up, so it notices it was closed
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self._stats, "subscribers": self._count}
+
+
+async def iter_events(subscription: Subscription, keepalive: float) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """
+    Yield a subscription's events as they arrive, and None after every
+    keepalive seconds without one. Ends once the hub closes the subscription.
+    """
+    while True:
+        try:
+            message = await asyncio.wait_for(subscription.get(), keepalive)
+        except asyncio.TimeoutError:
+            yield None
+            continue
+        if message is None:
+            return
+        yield message
+
+
+def event_message(event: OutboxEvent) -> Dict[str, Any]:
+    """
+    The streamed form of an outbox event (same payload as sent to RabbitMQ).
+
+    event_id is only known for events committed by this worker, not for
+    those received from the broker.
+    """
+    return {
+        "event_id": event.event_id,
+        "type": event.message_type,
+        "order_id": event.order_id,
+        "data": event.payload,
+    }
+
+
+def format_sse(message: Dict[str, Any]) -> bytes:
+    """Encode a message as a server-sent event."""
+    lines = []
+    if message.get("event_id") is not None:
+        lines.append(f"id: {message['event_id']}")
+    lines.append(f"event: {message['type']}")
+    return ("\n".join(lines) + "\ndata: ").encode() + orjson.dumps(message) + b"\n\n"
+
+
+async def publish_events(hub: EventHub, events: List[OutboxEvent]):
+    """Hand events to the hub's matching subscribers."""
+    if not events or not hub.subscriber_count:
+        return
+    # Item, price and history events carry no customer; look it up only when someone filters by it
+    customers = await event_customers(events) if hub.has_customer_subscribers else {}
+    for event in events:
+        hub.publish(event_message(event), event.order_id, customers.get(event.order_id))
+
+
+@on_commit
+async def publish_to_event_hub(events: List[OutboxEvent]):
+    """Stream events committed by this worker, unless the hub is fed from the broker."""
+    if EVENT_STREAM_SOURCE == "local":
+        await publish_events(event_hub, events)
+
+
+def _payload_order(payload: Any) -> Optional[int]:
+    order_id = payload.get("order_id") if isinstance(payload, dict) else None
+    return order_id if isinstance(order_id, int) else None
+
+
+class BrokerEventFeed:
+    """
+    Feeds the hub from RABBITMQ_EXCHANGE, so the clients of every worker
+    and replica see every event, whichever of them committed it.
+
+    Each worker consumes its own exclusive queue bound to every event and
+    deleted with its connection; messages are auto-acked, since a live
+    stream has nothing to redeliver. Events published while the feed is
+    disconnected are missed, and clients reconnect and re-read as they do
+    after being dropped. Events reach the broker through the outbox relay.
+    """
+
+    def __init__(
+        self,
+        hub: EventHub,
+        transport_factory: Optional[Callable[[], Any]] = None,
+        retry_delay: float = 5.0,
+    ):
+        self.hub = hub
+        self.transport_factory = transport_factory or (lambda: PikaConsumerTransport(
+            queue="",
+            dead_letter_queue=None,
+            exclusive=True,
+            binding_keys=[event_router.all_events_key],
+            auto_ack=True,
+        ))
+        self.retry_delay = retry_delay
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"received": 0, "undecodable": 0, "reconnects": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Start consuming in the background."""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info("Event stream feed started")
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        logger.info("Event stream feed stopped")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self._stats, "running": self.running}
+
+    async def handle(self, delivery: Delivery):
+        """Publish the events of one broker message (batched envelopes are unpacked)."""
+        self._stats["received"] += 1
+        try:
+            message = decode_body(delivery.body, delivery.content_type, delivery.content_encoding)
+            events = unpack_events(message, delivery.message_type)
+        except Exception as e:
+            self._stats["undecodable"] += 1
+            logger.error(f"Event stream feed skipped an undecodable message: {e!r}")
+            return
+        await publish_events(self.hub, [
+            OutboxEvent(message_type=message_type, order_id=_payload_order(payload), payload=payload)
+            for message_type, payload in events
+        ])
+
+    async def _run(self):
+        while True:
+            transport = self.transport_factory()
+            try:
+                await transport.connect(0)
+                async for delivery in transport.deliveries():
+                    try:
+                        await self.handle(delivery)
+                    except Exception as e:
+                        # e.g. the customer lookup failed; skip the event, keep streaming
+                        logger.error(f"Event stream feed failed on a message: {e!r}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Event stream feed disconnected, retrying in {self.retry_delay}s: {e!r}")
+            finally:
+                try:
+                    await transport.close()
+                except Exception as e:
+                    logger.error(f"Closing the event stream feed failed: {e!r}")
+            self._stats["reconnects"] += 1
+            await asyncio.sleep(self.retry_delay)
+
+
+# Singleton instances
+event_hub = EventHub()
+broker_event_feed = BrokerEventFeed(event_hub)
@@ -0,0 +1,253 @@
+import asyncio
+import hashlib
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from tortoise import timezone
+from tortoise.exceptions import IntegrityError
+from tortoise.expressions import Q
+
+from config.settings import (
+    IDEMPOTENCY_TTL,
+    IDEMPOTENCY_LOCK_TIMEOUT,
+    IDEMPOTENCY_MAX_RESPONSE_BYTES,
+    IDEMPOTENCY_PURGE_INTERVAL,
+)
+from models.models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+HEADER = b"idempotency-key"
+# Recomputed or connection-specific, so not stored with a response
+UNSTORED_HEADERS = {b"content-length", b"transfer-encoding", b"connection"}
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+MAX_KEY_LENGTH = 255
+
+
+def request_digest(method: str, path: str, query_string: bytes):
+    """
+    Start the hash identifying a request, so a key cannot be reused for a
+    different one. The body is added chunk by chunk as it is received.
+    """
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), query_string):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest
+
+
+class HashingReceive:
+    """ASGI receive wrapper adding the request body to a digest as it passes through."""
+
+    def __init__(self, receive, digest):
+        self.receive = receive
+        self.digest = digest
+        self.done = False
+
+    async def __call__(self):
+        message = await self.receive()
+        if message["type"] == "http.request":
+            self.digest.update(message.get("body", b""))
+            self.done = not message.get("more_body")
+        elif message["type"] == "http.disconnect":
+            self.done = True
+        return message
+
+    async def drain(self):
+        """Hash the rest of a body the app did not read."""
+        while not self.done:
+            await self()
+
+    def fingerprint(self) -> str:
+        return self.digest.hexdigest()
+
+
+class IdempotencyMiddleware:
+    """
+    Replays the stored response (status, headers and body) of write
+    requests retried with the same Idempotency-Key header.
+
+    The key is claimed with an insert before the request runs, so a retry
+    racing the first attempt gets 409 instead of a second write, and reusing
+    a key for a different request gets 422. Responses below 500 are stored
+    for ttl seconds; on a 5xx, an exception or a response over
+    max_response_bytes the claim is released so the client can retry. A
+    running request holds the key for lock_timeout seconds and renews it
+    while it runs, so the claim of a worker that died
+    lapses quickly and a retry takes it over. Keys live in the database, so
+    retries may land on any replica. Request bodies are hashed as they
+    stream through, never buffered (e.g. the import upload). Requests
+    without the header are passed through untouched.
+    """
+
+    def __init__(
+        self,
+        app,
+        ttl: float = IDEMPOTENCY_TTL,
+        lock_timeout: float = IDEMPOTENCY_LOCK_TIMEOUT,
+        max_response_bytes: int = IDEMPOTENCY_MAX_RESPONSE_BYTES,
+        purge_interval: float = IDEMPOTENCY_PURGE_INTERVAL,
+    ):
+        self.app = app
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.max_response_bytes = max_response_bytes
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS:
+            return await self.app(scope, receive, send)
+        key = dict(scope["headers"]).get(HEADER)
+        if key is None:
+            return await self.app(scope, receive, send)
+        key = key.decode("latin-1").strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            response = JSONResponse(
+                {"detail": f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"}, status_code=400
+            )
+            return await response(scope, receive, send)
+
+        receive = HashingReceive(receive, request_digest(scope["method"], scope["path"], scope["query_string"]))
+        existing, locked_until = await self._claim(key)
+        if locked_until is None:
+            return await self._respond_existing(existing, scope, receive, send)
+
+        await self._run({"key": key, "locked_until": locked_until}, scope, receive, send)
+
+    async def _claim(self, key: str) -> Tuple[Optional[IdempotencyKey], Optional[datetime]]:
+        """
+        Claim the key for this request; the fingerprint is stored with the
+        response, once the body has been received.
+
+        Returns:
+            (None, locked_until) if the key was claimed, otherwise
+            (existing record or None, None)
+        """
+        now = timezone.now()
+        await self._purge_expired(now)
+        locked_until = now + timedelta(seconds=self.lock_timeout)
+        record = dict(key=key, fingerprint="", locked_until=locked_until, expires_at=now + timedelta(seconds=self.ttl))
+        try:
+            await IdempotencyKey.create(**record)
+            return None, locked_until
+        except IntegrityError:
+            pass
+        # Take over a key that expired, or whose request stopped renewing it
+        await IdempotencyKey.filter(
+            Q(expires_at__lte=now) | Q(status_code__isnull=True, locked_until__lte=now), key=key
+        ).delete()
+        try:
+            await IdempotencyKey.create(**record)
+            return None, locked_until
+        except IntegrityError:
+            return await IdempotencyKey.get_or_none(key=key), None
+
+    async def _renew(self, claim: Dict[str, Any], stop: asyncio.Event):
+        """Extend the lease of a running request until stop is set or the key is taken over."""
+        while True:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.lock_timeout / 3)
+                return
+            except asyncio.TimeoutError:
+                pass
+            locked_until = timezone.now() + timedelta(seconds=self.lock_timeout)
+            try:
+                renewed = await IdempotencyKey.filter(
+                    key=claim["key"], locked_until=claim["locked_until"]
+                ).update(locked_until=locked_until)
+            except Exception as e:
+                logger.error(f"Renewing idempotency key {claim['key']} failed: {e!r}")
+                continue
+            if not renewed:
+                return
+            claim["locked_until"] = locked_until
+
+    async def _purge_expired(self, now):
+        if time.monotonic() - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = time.monotonic()
+        deleted = await IdempotencyKey.filter(expires_at__lte=now).delete()
+        if deleted:
+            logger.info(f"Purged {deleted} expired idempotency keys")
+
+    async def _respond_existing(self, existing: Optional[IdempotencyKey], scope, receive: HashingReceive, send):
+        if existing is None or existing.status_code is None:
+            response = JSONResponse(
+                {"detail": "A request with this Idempotency-Key is still in progress"}, status_code=409
+            )
+            return await response(scope, receive, send)
+        await receive.drain()
+        if existing.fingerprint != receive.fingerprint():
+            response = JSONResponse(
+                {"detail": "Idempotency-Key was already used for a different request"}, status_code=422
+            )
+            return await response(scope, receive, send)
+        body = bytes(existing.response_body or b"")
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in existing.response_headers or []]
+        headers += [(b"content-length", str(len(body)).encode()), (b"idempotent-replayed", b"true")]
+        await send({"type": "http.response.start", "status": existing.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _run(self, claim: Dict[str, Any], scope, receive: HashingReceive, send):
+        response = {"status": None, "headers": [], "chunks": [], "size": 0}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                # The fingerprint covers the whole body, even if the app stopped reading
+                await receive.drain()
+                response["status"] = message["status"]
+                response["headers"] = [
+                    [name.decode("latin-1"), value.decode("latin-1")]
+                    for name, value in message.get("headers", [])
+                    if name.lower() not in UNSTORED_HEADERS
+                ]
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                response["size"] += len(chunk)
+                if response["size"] <= self.max_response_bytes:
+                    response["chunks"].append(chunk)
+                else:
+                    response["chunks"] = []
+            await send(message)
+
+        stop = asyncio.Event()
+        renewing = asyncio.create_task(self._renew(claim, stop))
+        try:
+            await self.app(scope, receive, capture_send)
+        except BaseException:
+            stop.set()
+            await renewing
+            await self._claimed(claim).delete()
+            raise
+        stop.set()
+        await renewing
+
+        status = response["status"]
+        if status is None or status >= 500:
+            await self._claimed(claim).delete()
+            return
+        if response["size"] > self.max_response_bytes:
+            # Too large to replay, so it is not stored and a retry runs again
+            logger.warning(
+                f"Response to idempotency key {claim['key']} is over {self.max_response_bytes} bytes, not stored"
+            )
+            await self._claimed(claim).delete()
+            return
+        stored = b"".join(response["chunks"])
+        stored_rows = await self._claimed(claim).update(
+            fingerprint=receive.fingerprint(),
+            status_code=status,
+            response_headers=response["headers"],
+            response_body=stored,
+        )
+        if not stored_rows:
+            logger.warning(f"Idempotency key {claim['key']} was taken over while its request ran")
+
+    @staticmethod
+    def _claimed(claim: Dict[str, Any]):
+        # Only while this request still holds the lease, not a retry that took it over
+        return IdempotencyKey.filter(key=claim["key"], locked_until=claim["locked_until"])
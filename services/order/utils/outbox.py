@@ -0,0 +1,247 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from tortoise.transactions import in_transaction
+
+from config.settings import (
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_POLL_INTERVAL,
+    OUTBOX_PUBLISH_TIMEOUT,
+)
+from models.models import Order, OutboxEvent
+from utils.publisher import AsyncPublisher, publisher
+from utils.rabbit_utils import EventRouter, event_router
+
+logger = logging.getLogger(__name__)
+
+
+# Events recorded by the outbox_transaction() currently running in this task
+_pending_events: ContextVar[Optional[List[OutboxEvent]]] = ContextVar("pending_outbox_events", default=None)
+
+# Callbacks run with the committed events, e.g. cache invalidation
+_commit_listeners: List[Callable[[List[OutboxEvent]], Awaitable[None]]] = []
+
+
+def on_commit(listener: Callable[[List[OutboxEvent]], Awaitable[None]]):
+    """
+    Register a coroutine called with the events of every committed outbox_transaction().
+    """
+    _commit_listeners.append(listener)
+    return listener
+
+
+async def record_event(message: Dict[str, Any], message_type: str, order_id: Optional[int] = None) -> OutboxEvent:
+    """
+    Store an event in the outbox table.
+
+    Call this inside outbox_transaction() together with the change it
+    describes, so the event is committed (or rolled back) with it.
+
+    Args:
+        message: Dictionary containing the message data
+        message_type: Type of message (e.g., 'order.created', 'order.updated')
+        order_id: Order the event belongs to
+    """
+    event = await OutboxEvent.create(
+        message_type=message_type,
+        order_id=order_id,
+        payload=jsonable_encoder(message),
+    )
+    pending = _pending_events.get()
+    if pending is not None:
+        pending.append(event)
+    return event
+
+
+async def record_events(events: List[Tuple[Dict[str, Any], str, Optional[int]]]) -> List[OutboxEvent]:
+    """
+    Store many events with batched inserts, see record_event().
+
+    Args:
+        events: (message, message_type, order_id) tuples
+    """
+    rows = [
+        OutboxEvent(message_type=message_type, order_id=order_id, payload=jsonable_encoder(message))
+        for message, message_type, order_id in events
+    ]
+    await OutboxEvent.bulk_create(rows, batch_size=500)
+    pending = _pending_events.get()
+    if pending is not None:
+        pending.extend(rows)
+    return rows
+
+
+def _payload_customer(payload: Any) -> Optional[int]:
+    if not isinstance(payload, dict):
+        return None
+    customer_id = payload.get("customer_id")
+    if customer_id is None and isinstance(payload.get("details"), dict):
+        customer_id = payload["details"].get("customer_id")
+    return customer_id
+
+
+async def event_customers(events: Iterable[OutboxEvent]) -> Dict[int, int]:
+    """
+    Map the order_id of every event to its customer_id.
+
+    Taken from the payload where it is there; item, price and history
+    events need one query for all of them.
+    """
+    customers = {}
+    missing = set()
+    for event in events:
+        if event.order_id is None:
+            continue
+        customer_id = _payload_customer(event.payload)
+        if customer_id is None:
+            missing.add(event.order_id)
+        else:
+            customers[event.order_id] = customer_id
+    missing -= set(customers)
+    if missing:
+        customers.update(await Order.filter(order_id__in=missing).values_list("order_id", "customer_id"))
+    return customers
+
+
+@asynccontextmanager
+async def outbox_transaction():
+    """
+    Database transaction for writes that record outbox events.
+
+    Once the transaction has committed, the relay is woken up (so events are
+    not left waiting for the next poll) and the on_commit listeners run.
+    """
+    events: List[OutboxEvent] = []
+    token = _pending_events.set(events)
+    try:
+        async with in_transaction() as connection:
+            yield connection
+    finally:
+        _pending_events.reset(token)
+    outbox_relay.notify()
+    for listener in _commit_listeners:
+        try:
+            await listener(events)
+        except Exception as e:
+            logger.error(f"Outbox commit listener {listener.__qualname__} failed: {e!r}")
+
+
+class OutboxRelay:
+    """
+    Moves committed outbox events to RabbitMQ in batches.
+
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+    replicas can run a relay against the same table without double-sending.
+    A row is deleted only after the broker confirmed it (at-least-once).
+    """
+
+    def __init__(
+        self,
+        publisher: AsyncPublisher,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+        publish_timeout: float = OUTBOX_PUBLISH_TIMEOUT,
+        router: EventRouter = event_router,
+    ):
+        self.publisher = publisher
+        self.router = router
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.publish_timeout = publish_timeout
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"relayed": 0, "failed_batches": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def notify(self):
+        """Wake the relay up early, e.g. right after a write committed."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self):
+        """Start the background relay task."""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Outbox relay started")
+
+    async def stop(self):
+        """Stop the background relay task."""
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        logger.info("Outbox relay stopped")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self._stats, "running": self.running}
+
+    async def relay_batch(self) -> int:
+        """
+        Publish one batch of pending events.
+
+        Returns:
+            Number of events published and removed from the outbox
+        """
+        async with in_transaction():
+            events = await (
+                OutboxEvent.all()
+                .order_by("event_id")
+                .limit(self.batch_size)
+                .select_for_update(skip_locked=True)
+            )
+            if not events:
+                return 0
+
+            customers = await event_customers(events) if self.router.needs_customer else {}
+            futures = []
+            try:
+                for event in events:
+                    routing_key = self.router.routing_key(event.message_type, customers.get(event.order_id))
+                    futures.append(self.publisher.submit(event.payload, event.message_type, routing_key))
+                await asyncio.wait_for(asyncio.gather(*futures), self.publish_timeout)
+            except BaseException:
+                # Unsent events stay queued in the publisher otherwise; the
+                # rows are released by the rollback and retried next round
+                for future in futures:
+                    future.cancel()
+                raise
+
+            await OutboxEvent.filter(event_id__in=[event.event_id for event in events]).delete()
+
+        self._stats["relayed"] += len(events)
+        return len(events)
+
+    async def _run(self):
+        while True:
+            try:
+                relayed = await self.relay_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["failed_batches"] += 1
+                logger.error(f"Outbox relay batch failed: {e!r}")
+                relayed = 0
+
+            # A full batch means there is probably more waiting
+            if relayed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+
+# Singleton instance
+outbox_relay = OutboxRelay(publisher)
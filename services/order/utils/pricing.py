@@ -0,0 +1,79 @@
+from decimal import Decimal, ROUND_HALF_UP
+from typing import List, Sequence, Union
+
+import numpy as np
+
+Number = Union[Decimal, float, int, str]
+
+
+def to_hundredths(values: Sequence[Number]) -> np.ndarray:
+    """
+    Convert money amounts or factors to exact integer hundredths.
+
+    Values are rounded half-up to two decimals first, like the DecimalFields
+    they are stored in.
+    """
+    return np.fromiter(
+        (
+            int((value if isinstance(value, Decimal) else Decimal(str(value))).scaleb(2).to_integral_value(ROUND_HALF_UP))
+            for value in values
+        ),
+        dtype=np.int64,
+        count=len(values),
+    )
+
+
+def quote_cents(
+    base_cents: np.ndarray,
+    distance_factors: np.ndarray,
+    weight_factors: np.ndarray,
+    urgency_factors: np.ndarray,
+) -> np.ndarray:
+    """
+    Price quotes in integer cents: base_price * (1 + distance + weight + urgency).
+
+    All inputs are int64 arrays in hundredths (cents for the base price), so
+    the product is exact and the only rounding is the final half-up division.
+    """
+    numerator = base_cents * (100 + distance_factors + weight_factors + urgency_factors)
+    return np.sign(numerator) * ((np.abs(numerator) + 50) // 100)
+
+
+def quote_prices(
+    base_prices: Sequence[Number],
+    distance_factors: Sequence[Number],
+    weight_factors: Sequence[Number],
+    urgency_factors: Sequence[Number],
+) -> List[Decimal]:
+    """
+    Price many quotes at once.
+
+    Args:
+        base_prices: Base price of each quote
+        distance_factors: Distance factor of each quote
+        weight_factors: Weight factor of each quote
+        urgency_factors: Urgency factor of each quote
+
+    Returns:
+        Final prices as Decimals with two decimal places, in input order
+    """
+    if not (len(base_prices) == len(distance_factors) == len(weight_factors) == len(urgency_factors)):
+        raise ValueError("All price inputs must have the same length")
+
+    cents = quote_cents(
+        to_hundredths(base_prices),
+        to_hundredths(distance_factors),
+        to_hundredths(weight_factors),
+        to_hundredths(urgency_factors),
+    )
+    return [Decimal(value).scaleb(-2) for value in cents.tolist()]
+
+
+def calculate_final_price(
+    base_price: Number,
+    distance_factor: Number,
+    weight_factor: Number,
+    urgency_factor: Number,
+) -> Decimal:
+    """Price a single quote, see quote_prices()."""
+    return quote_prices([base_price], [distance_factor], [weight_factor], [urgency_factor])[0]
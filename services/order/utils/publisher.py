@@ -0,0 +1,228 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import (
+    PUBLISHER_QUEUE_SIZE,
+    PUBLISHER_RETRY_DELAY,
+    PUBLISHER_MAX_RETRY_DELAY,
+    PUBLISHER_BATCH_SIZE,
+    PUBLISHER_BATCH_WINDOW,
+)
+from utils.envelopes import BATCH_MESSAGE_TYPE, batch_envelope
+from utils.rabbit_utils import RabbitMQClient, rabbit_client
+
+logger = logging.getLogger(__name__)
+
+
+class PikaTransport:
+    """
+    Runs the blocking pika client on a dedicated thread.
+
+    pika's BlockingConnection is not thread safe, so every call goes through
+    a single-worker executor and the event loop only awaits the result.
+    """
+
+    def __init__(self, client: RabbitMQClient):
+        self.client = client
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rabbitmq")
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def connect(self):
+        await self._run(self.client.connect)
+
+    async def send(self, message: Dict[str, Any], message_type: Optional[str], routing_key: Optional[str] = None):
+        await self._run(self.client.send, message, message_type, routing_key)
+
+    async def close(self):
+        await self._run(self.client.close)
+
+
+class AsyncPublisher:
+    """
+    Non-blocking RabbitMQ publisher.
+
+    publish_message() only enqueues; a background task drains the queue and
+    waits for publisher confirms, so broker I/O never sits on the request path.
+
+    With batch_size > 1, events queued within batch_window of each other are
+    sent as one envelope per routing key (see utils.envelopes), so bulk
+    writes cost a fraction of the broker messages.
+    """
+
+    def __init__(
+        self,
+        transport,
+        max_queue_size: int = PUBLISHER_QUEUE_SIZE,
+        retry_delay: float = PUBLISHER_RETRY_DELAY,
+        max_retry_delay: float = PUBLISHER_MAX_RETRY_DELAY,
+        batch_size: int = PUBLISHER_BATCH_SIZE,
+        batch_window: float = PUBLISHER_BATCH_WINDOW,
+    ):
+        self.transport = transport
+        self.max_queue_size = max_queue_size
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.batch_size = max(batch_size, 1)
+        self.batch_window = batch_window
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "enqueued": 0,
+            "published": 0,
+            "broker_messages": 0,
+            "dropped": 0,
+            "failed_attempts": 0,
+            "max_queue_depth": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Start the background sender task."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run())
+        logger.info("Publisher started")
+
+    async def stop(self, timeout: float = 5.0):
+        """Flush pending messages (up to timeout) and stop the sender task."""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Publisher stopped with {self._queue.qsize()} unsent messages")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        await self.transport.close()
+        logger.info("Publisher stopped")
+
+    def submit(
+        self,
+        message: Dict[str, Any],
+        message_type: Optional[str] = None,
+        routing_key: Optional[str] = None,
+    ) -> asyncio.Future:
+        """
+        Enqueue a message and return a future resolved once the broker confirms it.
+
+        routing_key defaults to the transport's key for message_type.
+
+        Raises:
+            RuntimeError: If the publisher has not been started
+            asyncio.QueueFull: If the queue is at capacity
+        """
+        if not self.running:
+            raise RuntimeError("Publisher is not running")
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((message, message_type, routing_key, future))
+        except asyncio.QueueFull:
+            self._stats["dropped"] += 1
+            raise
+        self._stats["enqueued"] += 1
+        self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._queue.qsize())
+        return future
+
+    def publish_message(self, message: Dict[str, Any], message_type: Optional[str] = None) -> bool:
+        """
+        Enqueue a message for publishing without waiting on the broker.
+
+        Args:
+            message: Dictionary containing the message data
+            message_type: Type of message (e.g., 'order.created', 'order.updated')
+
+        Returns:
+            False if the message could not be queued (publisher stopped or full)
+        """
+        try:
+            self.submit(message, message_type)
+            return True
+        except (RuntimeError, asyncio.QueueFull) as e:
+            logger.error(f"Failed to queue message {message_type or 'message'}: {e!r}")
+            return False
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth and delivery counters."""
+        depth = self._queue.qsize() if self._queue is not None else 0
+        return {
+            **self._stats,
+            "queue_depth": depth,
+            "queue_capacity": self.max_queue_size,
+            "running": self.running,
+        }
+
+    async def _next_batch(self) -> List[Tuple[Dict[str, Any], Optional[str], Optional[str], asyncio.Future]]:
+        batch = [await self._queue.get()]
+        if self.batch_size > 1 and self._queue.qsize() < self.batch_size - 1:
+            # Give a burst of writes the chance to fill the envelope
+            await asyncio.sleep(self.batch_window)
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            # Callers may have given up waiting (e.g. outbox relay timeout)
+            pending = [item for item in batch if not item[3].cancelled()]
+            try:
+                # One broker message per routing key, events in queue order
+                groups: Dict[Optional[str], list] = {}
+                for item in pending:
+                    groups.setdefault(item[2], []).append(item)
+                for routing_key, group in groups.items():
+                    await self._send_group(group, routing_key)
+            except asyncio.CancelledError:
+                for *_, future in pending:
+                    if not future.done():
+                        future.cancel()
+                raise
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _send_group(self, group, routing_key: Optional[str]):
+        if len(group) == 1:
+            message, message_type, _, _ = group[0]
+        else:
+            message = batch_envelope([(message, message_type) for message, message_type, _, _ in group])
+            message_type = BATCH_MESSAGE_TYPE
+        futures = [future for *_, future in group]
+        if await self._send_with_retry(message, message_type, routing_key, futures):
+            self._stats["published"] += len(group)
+            self._stats["broker_messages"] += 1
+            for future in futures:
+                if not future.done():
+                    future.set_result(True)
+
+    async def _send_with_retry(self, message, message_type, routing_key, futures) -> bool:
+        delay = self.retry_delay
+        while True:
+            try:
+                await self.transport.send(message, message_type, routing_key)
+                return True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["failed_attempts"] += 1
+                if all(future.cancelled() for future in futures):
+                    return False
+                logger.error(f"Failed to publish {message_type or 'message'}, retrying in {delay}s: {e!r}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+
+
+# Singleton instance
+publisher = AsyncPublisher(PikaTransport(rabbit_client))
@@ -1,6 +1,6 @@
-import json
 import pika
 import logging
+from typing import List, Optional
 from config.settings import (
     RABBITMQ_HOST,
     RABBITMQ_PORT,
@@ -9,15 +9,89 @@ from config.settings import (
     RABBITMQ_QUEUE,
     RABBITMQ_EXCHANGE,
     RABBITMQ_ROUTING_KEY,
+    RABBITMQ_EXCHANGE_TYPE,
+    RABBITMQ_CUSTOMER_SHARDS,
+    RABBITMQ_BINDING_KEYS,
 )
+from utils.envelopes import BATCH_MESSAGE_TYPE, codec
 
 logger = logging.getLogger(__name__)
 
 
+class EventRouter:
+    """
+    Chooses the routing key of every event and declares the order exchange.
+
+    With a direct exchange everything goes under one routing key. With a
+    topic exchange the key is the event type, e.g. order_item.deleted, so
+    consumers bind only to the events they handle; with customer_shards set
+    a shard segment is appended (order.created.3, 'none' for events without
+    a customer) so a consumer can take a slice of the customers.
+    """
+
+    def __init__(
+        self,
+        exchange_type: str = RABBITMQ_EXCHANGE_TYPE,
+        default_key: str = RABBITMQ_ROUTING_KEY,
+        customer_shards: int = RABBITMQ_CUSTOMER_SHARDS,
+        binding_keys: Optional[List[str]] = None,
+    ):
+        if exchange_type not in ("direct", "topic"):
+            raise ValueError(f"Unsupported exchange type: {exchange_type}")
+        self.exchange_type = exchange_type
+        self.default_key = default_key
+        self.customer_shards = customer_shards if exchange_type == "topic" else 0
+        self.binding_keys = binding_keys or (RABBITMQ_BINDING_KEYS if exchange_type == "topic" else [default_key])
+
+    @property
+    def needs_customer(self) -> bool:
+        """Whether routing_key() uses the customer_id."""
+        return self.customer_shards > 0
+
+    def routing_key(self, message_type: Optional[str], customer_id: Optional[int] = None) -> str:
+        if self.exchange_type != "topic":
+            return self.default_key
+        key = message_type or "order.unknown"
+        if self.customer_shards:
+            key += "." + ("none" if customer_id is None else str(customer_id % self.customer_shards))
+        return key
+
+    @property
+    def all_events_key(self) -> str:
+        """Binding key that matches every event."""
+        return "#" if self.exchange_type == "topic" else self.default_key
+
+    def declare(
+        self,
+        channel,
+        exchange: str,
+        queue: str,
+        exclusive: bool = False,
+        binding_keys: Optional[List[str]] = None,
+    ) -> str:
+        """
+        Declare the exchange and queue, and bind the queue with the binding keys.
+
+        An exclusive queue is private to the connection and deleted with it;
+        pass an empty name to have the broker pick one.
+
+        Returns:
+            The queue name
+        """
+        channel.exchange_declare(exchange=exchange, exchange_type=self.exchange_type, durable=True)
+        if exclusive:
+            queue = channel.queue_declare(queue=queue, exclusive=True, auto_delete=True).method.queue
+        else:
+            channel.queue_declare(queue=queue, durable=True)
+        for binding_key in binding_keys or self.binding_keys:
+            channel.queue_bind(queue=queue, exchange=exchange, routing_key=binding_key)
+        return queue
+
+
 class RabbitMQClient:
     """Client for interacting with RabbitMQ."""
 
-    def __init__(self):
+    def __init__(self, router: Optional[EventRouter] = None):
         self.host = RABBITMQ_HOST
         self.port = RABBITMQ_PORT
         self.username = RABBITMQ_USER
@@ -25,12 +99,15 @@ class RabbitMQClient:
         self.queue = RABBITMQ_QUEUE
         self.exchange = RABBITMQ_EXCHANGE
         self.routing_key = RABBITMQ_ROUTING_KEY
+        self.router = router or event_router
         self.connection = None
         self.channel = None
 
     def connect(self):
         """Establish connection to RabbitMQ server."""
-        if self.connection is None or self.connection.is_closed:
+        if self.channel is None or self.channel.is_closed:
+            # A closed channel on an open connection is not reusable either
+            self.close()
             credentials = pika.PlainCredentials(self.username, self.password)
             parameters = pika.ConnectionParameters(
                 host=self.host,
@@ -41,22 +118,10 @@ class RabbitMQClient:
             self.channel = self.connection.channel()
             
             # Declare exchange and queue
-            self.channel.exchange_declare(
-                exchange=self.exchange,
-                exchange_type='direct',
-                durable=True
-            )
-            
-            self.channel.queue_declare(
-                queue=self.queue,
-                durable=True
-            )
-            
-            self.channel.queue_bind(
-                queue=self.queue,
-                exchange=self.exchange,
-                routing_key=self.routing_key
-            )
+            self.router.declare(self.channel, self.exchange, self.queue)
+
+            # Broker acks/nacks every publish so failures surface in send()
+            self.channel.confirm_delivery()
             
             logger.info(f"Connected to RabbitMQ at {self.host}:{self.port}")
         return self.channel
@@ -67,6 +132,42 @@ class RabbitMQClient:
             self.connection.close()
             logger.info("Closed connection to RabbitMQ")
     
+    def send(self, message, message_type=None, routing_key=None):
+        """
+        Publish a message and wait for the broker to confirm it.
+
+        Unlike publish_message, errors are raised so callers can retry.
+        This call blocks on network I/O and must not run on the event loop.
+
+        Args:
+            message: Dictionary containing the message data
+            message_type: Type of message (e.g., 'order.created', 'order.updated')
+            routing_key: Defaults to the router's key for message_type
+        """
+        channel = self.connect()
+        
+        # Encode with the configured serializer; content type and encoding
+        # tell consumers how to decode the body
+        body, content_type, content_encoding = codec.encode(message)
+        headers = None
+        if message_type == BATCH_MESSAGE_TYPE:
+            headers = {'x-event-count': message['count']}
+        properties = pika.BasicProperties(
+            content_type=content_type,
+            content_encoding=content_encoding,
+            type=message_type,
+            headers=headers,
+            delivery_mode=2  # make message persistent
+        )
+        
+        # Publish message, raises if the broker nacks it
+        channel.basic_publish(
+            exchange=self.exchange,
+            routing_key=routing_key or self.router.routing_key(message_type),
+            body=body,
+            properties=properties
+        )
+    
     def publish_message(self, message, message_type=None):
         """
         Publish a message to the RabbitMQ exchange
@@ -76,28 +177,7 @@ class RabbitMQClient:
             message_type: Type of message (e.g., 'order.created', 'order.updated')
         """
         try:
-            channel = self.connect()
-            
-            # Add message type to properties if provided
-            properties = None
-            if message_type:
-                properties = pika.BasicProperties(
-                    content_type='application/json',
-                    type=message_type,
-                    delivery_mode=2  # make message persistent
-                )
-            
-            # Convert message to JSON string
-            message_json = json.dumps(message)
-            
-            # Publish message
-            channel.basic_publish(
-                exchange=self.exchange,
-                routing_key=self.routing_key,
-                body=message_json,
-                properties=properties
-            )
-            
+            self.send(message, message_type)
             logger.info(f"Published message: {message_type or 'message'}")
             return True
             
@@ -106,5 +186,6 @@ class RabbitMQClient:
             return False
 
 
-# Singleton instance
+# Singleton instances
+event_router = EventRouter()
 rabbit_client = RabbitMQClient()
\ No newline at end of file
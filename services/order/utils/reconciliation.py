@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import logging
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from tortoise import Tortoise, timezone
+from tortoise.expressions import F
+from tortoise.functions import Sum
+
+from config.settings import TORTOISE_ORM
+from models.models import Order, Order_Pydantic, OrderItem, PriceCalculation
+from utils.outbox import outbox_transaction, record_event
+from utils.rollups import ROLLUP_FIELDS, order_rollup, update_rollups
+from utils.serializers import serialize
+
+logger = logging.getLogger(__name__)
+
+
+async def fix_order_total(order: Dict[str, Any], expected: Decimal) -> bool:
+    """
+    Set an order's total_price to expected, unless the order changed since it was read.
+
+    The UPDATE is conditional on the total_price and version that were read,
+    so an item write committed in between keeps its delta; that order is
+    checked again on the next run. An order.updated event is recorded so
+    cached copies (and their ETags) are dropped.
+
+    Args:
+        order: Order values as read, with version and ROLLUP_FIELDS
+        expected: Item sum to store
+
+    Returns:
+        Whether the total was fixed
+    """
+    async with outbox_transaction():
+        updated = await Order.filter(
+            order_id=order["order_id"], total_price=order["total_price"], version=order["version"]
+        ).update(total_price=expected, version=F("version") + 1, updated_at=timezone.now())
+        if not updated:
+            return False
+        # Same version, so the status is still the one that was read
+        await update_rollups(
+            removed=[order_rollup(order)],
+            added=[order_rollup({**order, "total_price": expected})],
+        )
+        fixed = await Order.get(order_id=order["order_id"])
+        await record_event(
+            message=serialize(Order_Pydantic, fixed).dict(),
+            message_type="order.updated",
+            order_id=fixed.order_id
+        )
+    return True
+
+
+async def reconcile_order_totals(fix: bool = False, chunk_size: int = 1000) -> Dict[str, object]:
+    """
+    Verify order totals against the sum of their item prices.
+
+    Item writes maintain total_price with delta updates; this job catches any
+    drift. Orders are scanned in order_id chunks with one grouped SUM query per
+    chunk. Orders without items, or with a price calculation (whose final
+    price replaces the item sum), are skipped.
+
+    Args:
+        fix: Overwrite mismatched totals with the item sum (see fix_order_total)
+        chunk_size: Number of orders checked per round trip
+
+    Returns:
+        Summary with the number of checked orders, the mismatches found and
+        how many of them were fixed
+    """
+    checked = 0
+    fixed = 0
+    mismatches: List[Dict[str, object]] = []
+    last_id = 0
+
+    while True:
+        orders = await (
+            Order.filter(order_id__gt=last_id)
+            .order_by("order_id")
+            .limit(chunk_size)
+            .values("order_id", "version", *ROLLUP_FIELDS)
+        )
+        if not orders:
+            break
+        order_ids = [order["order_id"] for order in orders]
+        last_id = order_ids[-1]
+
+        item_totals = await (
+            OrderItem.filter(order_id__in=order_ids)
+            .annotate(items_total=Sum("item_price"))
+            .group_by("order_id")
+            .values("order_id", "items_total")
+        )
+        item_totals = {row["order_id"]: Decimal(str(row["items_total"])) for row in item_totals}
+        priced = set(
+            await PriceCalculation.filter(order_id__in=order_ids)
+            .distinct()
+            .values_list("order_id", flat=True)
+        )
+
+        for order in orders:
+            order_id = order["order_id"]
+            if order_id not in item_totals or order_id in priced:
+                continue
+            checked += 1
+            expected = item_totals[order_id].quantize(Decimal("0.01"))
+            if Decimal(str(order["total_price"])) != expected:
+                mismatches.append({
+                    "order_id": order_id,
+                    "total_price": order["total_price"],
+                    "items_total": expected,
+                })
+                if fix:
+                    if await fix_order_total(order, expected):
+                        fixed += 1
+                    else:
+                        logger.info(f"Order {order_id} changed while reconciling, left for the next run")
+
+    if mismatches:
+        logger.warning(f"Found {len(mismatches)} order totals out of sync with their items")
+    return {"checked": checked, "mismatches": mismatches, "fixed": fixed}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Verify order totals against item prices")
+    parser.add_argument("--fix", action="store_true", help="Repair mismatched totals")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    await Tortoise.init(config=TORTOISE_ORM)
+    try:
+        result = await reconcile_order_totals(fix=args.fix, chunk_size=args.chunk_size)
+    finally:
+        await Tortoise.close_connections()
+
+    for mismatch in result["mismatches"]:
+        print(f"order {mismatch['order_id']}: total {mismatch['total_price']} != items {mismatch['items_total']}")
+    print(f"Checked {result['checked']} orders, {len(result['mismatches'])} mismatched, {result['fixed']} fixed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+
+from config.settings import TORTOISE_ORM
+from models.models import Order, OrderDailyRollup, OrderStatus
+
+logger = logging.getLogger(__name__)
+
+# (day, status, customer_id) of an order: its creation day (UTC) and current status
+RollupKey = Tuple[date, str, int]
+
+# Rows per upsert statement (5 parameters each)
+UPSERT_BATCH_SIZE = 1000
+
+ROLLUP_FIELDS = ("created_at", "status", "customer_id", "total_price")
+
+_ON_CONFLICT = (
+    'ON CONFLICT ("day", "status", "customer_id") DO UPDATE SET '
+    '"order_count" = "order_daily_rollups"."order_count" + EXCLUDED."order_count", '
+    '"revenue" = ROUND("order_daily_rollups"."revenue" + EXCLUDED."revenue", 2)'
+)
+
+
+def rollup_key(created_at: datetime, status: Any, customer_id: int) -> RollupKey:
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date(), OrderStatus(status).value, customer_id
+
+
+def order_rollup(order: Any) -> Tuple[RollupKey, Decimal]:
+    """
+    Get the rollup key and revenue of an order.
+
+    Accepts an Order or a dict with ROLLUP_FIELDS (e.g. from values()).
+    """
+    if isinstance(order, dict):
+        return rollup_key(order["created_at"], order["status"], order["customer_id"]), Decimal(str(order["total_price"]))
+    return rollup_key(order.created_at, order.status, order.customer_id), Decimal(str(order.total_price))
+
+
+async def apply_rollup_deltas(deltas: Dict[RollupKey, Tuple[int, Decimal]]):
+    """
+    Add (order count, revenue) deltas to the rollup rows, creating missing rows.
+
+    Each batch is one INSERT ... ON CONFLICT DO UPDATE, so concurrent writers
+    add to the same row instead of overwriting each other. Call this in the
+    transaction of the change it accounts for.
+    """
+    rows = [
+        (day, status, customer_id, count, revenue)
+        for (day, status, customer_id), (count, revenue) in deltas.items()
+        if count or revenue
+    ]
+    if not rows:
+        return
+    connection = OrderDailyRollup._meta.db
+    postgres = connection.capabilities.dialect == "postgres"
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        batch = rows[start:start + UPSERT_BATCH_SIZE]
+        params: List[Any] = []
+        placeholders = []
+        for day, status, customer_id, count, revenue in batch:
+            # SQLite stores decimals as text and cannot bind Decimal
+            params.extend((day, status, customer_id, count, revenue if postgres else str(revenue)))
+            if postgres:
+                first = len(params) - 4
+                placeholders.append(f"(${first}, ${first + 1}, ${first + 2}, ${first + 3}, ${first + 4})")
+            else:
+                placeholders.append("(?, ?, ?, ?, ?)")
+        await connection.execute_query(
+            'INSERT INTO "order_daily_rollups" ("day", "status", "customer_id", "order_count", "revenue") '
+            f"VALUES {', '.join(placeholders)} {_ON_CONFLICT}",
+            params,
+        )
+
+
+async def add_order_revenue(order_id: int, delta: Decimal):
+    """
+    Add delta to the revenue of an order's rollup row.
+
+    The row is looked up from the order in the same statement, so callers
+    that only know the order_id (e.g. item writes) need no extra query.
+    """
+    if not delta:
+        return
+    connection = OrderDailyRollup._meta.db
+    if connection.capabilities.dialect == "postgres":
+        day, params, placeholders = "CAST(\"created_at\" AT TIME ZONE 'UTC' AS DATE)", [delta, order_id], ("$1", "$2")
+    else:
+        day, params, placeholders = 'date("created_at")', [str(delta), order_id], ("?", "?")
+    await connection.execute_query(
+        'INSERT INTO "order_daily_rollups" ("day", "status", "customer_id", "order_count", "revenue") '
+        f'SELECT {day}, "status", "customer_id", 0, {placeholders[0]} FROM "orders" WHERE "order_id" = {placeholders[1]} '
+        f"{_ON_CONFLICT}",
+        params,
+    )
+
+
+async def update_rollups(
+    removed: Iterable[Tuple[RollupKey, Decimal]] = (),
+    added: Iterable[Tuple[RollupKey, Decimal]] = (),
+):
+    """
+    Account for orders leaving and entering rollup rows.
+
+    A created order is only added and a deleted one only removed; a changed
+    order is removed with its old state and added with its new one (e.g.
+    order_rollup() before and after a status or total change).
+    """
+    deltas: Dict[RollupKey, List] = defaultdict(lambda: [0, Decimal("0")])
+    for key, revenue in removed:
+        deltas[key][0] -= 1
+        deltas[key][1] -= revenue
+    for key, revenue in added:
+        deltas[key][0] += 1
+        deltas[key][1] += revenue
+    await apply_rollup_deltas({key: tuple(delta) for key, delta in deltas.items()})
+
+
+async def rebuild_rollups(since: Optional[date] = None, chunk_size: int = 5000) -> Dict[str, int]:
+    """
+    Recompute the rollup rows from the orders table.
+
+    Rows for days from since (or all rows) are deleted and rebuilt from the
+    orders created on those days, read in order_id chunks. Everything runs
+    in one transaction, so readers never see a partly rebuilt table. Run it
+    when order writes are paused (e.g. right after the migration), as writes
+    that commit during the rebuild can be counted twice.
+
+    Args:
+        since: First day to rebuild; all days if not given
+        chunk_size: Number of orders read per round trip
+
+    Returns:
+        Number of orders scanned
+    """
+    scanned = 0
+    last_id = 0
+    async with in_transaction():
+        rollups = OrderDailyRollup.all()
+        orders = Order.all()
+        if since:
+            rollups = rollups.filter(day__gte=since)
+            orders = orders.filter(created_at__gte=datetime.combine(since, time.min, tzinfo=timezone.utc))
+        await rollups.delete()
+
+        while True:
+            chunk = await (
+                orders.filter(order_id__gt=last_id)
+                .order_by("order_id")
+                .limit(chunk_size)
+                .values("order_id", *ROLLUP_FIELDS)
+            )
+            if not chunk:
+                break
+            last_id = chunk[-1]["order_id"]
+            await update_rollups(added=[order_rollup(order) for order in chunk])
+            scanned += len(chunk)
+            logger.info(f"Rolled up orders up to {last_id}")
+
+    return {"orders": scanned}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild the daily order rollups from the orders table")
+    parser.add_argument("--since", type=date.fromisoformat, help="First day to rebuild (YYYY-MM-DD); all days if omitted")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    await Tortoise.init(config=TORTOISE_ORM)
+    try:
+        result = await rebuild_rollups(since=args.since, chunk_size=args.chunk_size)
+    finally:
+        await Tortoise.close_connections()
+
+    print(f"Rolled up {result['orders']} orders")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,26 @@
+from typing import List, Type
+
+from tortoise.models import Model
+
+
+async def allocate_ids(connection, model: Type[Model], count: int) -> List[int]:
+    """
+    Reserve count primary keys of model for rows inserted with bulk_create.
+
+    bulk_create does not return the generated keys, so callers that need
+    them (events, responses) set them up front. PostgreSQL draws them from
+    the table's sequence, so concurrent inserts never collide. Other
+    databases use max + 1, which relies on the caller's transaction holding
+    the (SQLite) database write lock.
+    """
+    table, pk = model._meta.db_table, model._meta.db_pk_column
+    if connection.capabilities.dialect == "postgres":
+        rows = await connection.execute_query_dict(
+            f"SELECT nextval(pg_get_serial_sequence('{table}', '{pk}')) AS id "
+            "FROM generate_series(1, $1)",
+            [count],
+        )
+        return [row["id"] for row in rows]
+    last_ids = await model.all().order_by(f"-{model._meta.pk_attr}").limit(1).values_list(model._meta.pk_attr, flat=True)
+    start = (last_ids[0] if last_ids else 0) + 1
+    return list(range(start, start + count))
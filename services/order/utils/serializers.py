@@ -0,0 +1,35 @@
+from typing import Any, Iterable, List, Type, TypeVar
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+PydanticModel = TypeVar("PydanticModel", bound=BaseModel)
+
+
+def serialize(pydantic_model: Type[PydanticModel], instance) -> PydanticModel:
+    """
+    Convert an already-fetched model instance into its response model.
+
+    Unlike from_tortoise_orm/from_queryset this never touches the database,
+    so it is safe to call as often as needed after a single fetch.
+    """
+    if hasattr(pydantic_model, "model_validate"):
+        return pydantic_model.model_validate(instance)
+    return pydantic_model.from_orm(instance)
+
+
+def serialize_many(pydantic_model: Type[PydanticModel], instances: Iterable) -> List[PydanticModel]:
+    """Convert a list of already-fetched model instances."""
+    return [serialize(pydantic_model, instance) for instance in instances]
+
+
+def to_data(instance: BaseModel) -> Any:
+    """Convert a response model into JSON-compatible data (e.g. for caching)."""
+    return jsonable_encoder(instance)
+
+
+def from_data(pydantic_model: Type[PydanticModel], data: Any) -> PydanticModel:
+    """Rebuild a response model from data produced by to_data."""
+    if hasattr(pydantic_model, "model_validate"):
+        return pydantic_model.model_validate(data)
+    return pydantic_model.parse_obj(data)
@@ -0,0 +1,187 @@
+import json
+import logging
+import os
+import time
+from bisect import bisect_left, bisect_right
+from decimal import Decimal
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import TARIFF_FILE, TARIFF_RELOAD_INTERVAL
+from utils.pricing import to_hundredths
+
+logger = logging.getLogger(__name__)
+
+
+class TariffTable:
+    """
+    Pricing factors compiled from a tariff document.
+
+    Distance bands and weight breaks are kept as sorted NumPy arrays, so
+    factors for a whole batch are found with one binary search per column.
+    Factors are int64 hundredths, ready for utils.pricing.quote_cents().
+
+    Document format (see data/tariffs.json):
+        version: Tariff version, reported with every quote
+        distance_bands: [{"max_km": 100, "factor": "0.10"}, ...]; the band with
+            the smallest max_km >= distance applies, max_km null means no limit
+        weight_breaks: [{"min_kg": 50, "factor": "0.05"}, ...]; the break with
+            the largest min_kg <= weight applies
+        cargo_surcharges: {"hazardous": "0.40", "default": "0.00", ...}; added
+            to the weight factor, keyed by lowercase cargo type
+        urgency: {"standard": "0.00", "express": "0.25", ...}
+    """
+
+    def __init__(self, document: Dict[str, Any]):
+        self.version = str(document["version"])
+
+        bands = sorted(
+            document["distance_bands"],
+            key=lambda band: float("inf") if band["max_km"] is None else float(band["max_km"]),
+        )
+        if not bands:
+            raise ValueError("Tariff needs at least one distance band")
+        self.distance_limits = np.array(
+            [float("inf") if band["max_km"] is None else float(band["max_km"]) for band in bands]
+        )
+        self.distance_factors = to_hundredths([band["factor"] for band in bands])
+
+        breaks = sorted(document["weight_breaks"], key=lambda weight_break: float(weight_break["min_kg"]))
+        if not breaks or float(breaks[0]["min_kg"]) > 0:
+            raise ValueError("Tariff weight breaks must start at 0 kg")
+        self.weight_minimums = np.array([float(weight_break["min_kg"]) for weight_break in breaks])
+        self.weight_factors = to_hundredths([weight_break["factor"] for weight_break in breaks])
+
+        surcharges = {key.lower(): value for key, value in document.get("cargo_surcharges", {}).items()}
+        self.default_surcharge = int(to_hundredths([surcharges.pop("default", 0)])[0])
+        self.cargo_surcharges = dict(zip(surcharges, to_hundredths(list(surcharges.values())).tolist()))
+
+        urgency = {key.lower(): value for key, value in document["urgency"].items()}
+        self.urgency_factors = dict(zip(urgency, to_hundredths(list(urgency.values())).tolist()))
+
+        # Plain lists for scalar lookups, where bisect beats NumPy's call overhead
+        self._distance_limits = self.distance_limits.tolist()
+        self._distance_factors = self.distance_factors.tolist()
+        self._weight_minimums = self.weight_minimums.tolist()
+        self._weight_factors = self.weight_factors.tolist()
+
+    def distance_factor(self, distance_km: float) -> int:
+        index = min(bisect_left(self._distance_limits, distance_km), len(self._distance_limits) - 1)
+        return self._distance_factors[index]
+
+    def weight_factor(self, weight_kg: float, cargo_type: Optional[str] = None) -> int:
+        index = max(bisect_right(self._weight_minimums, weight_kg) - 1, 0)
+        return self._weight_factors[index] + self.cargo_surcharge(cargo_type)
+
+    def cargo_surcharge(self, cargo_type: Optional[str]) -> int:
+        if not cargo_type:
+            return self.default_surcharge
+        return self.cargo_surcharges.get(cargo_type.lower(), self.default_surcharge)
+
+    def urgency_factor(self, urgency: str) -> int:
+        try:
+            return self.urgency_factors[urgency.lower()]
+        except KeyError:
+            raise ValueError(f"Unknown urgency: {urgency}. Expected one of {sorted(self.urgency_factors)}")
+
+    def factors(
+        self,
+        distances_km: Sequence[float],
+        weights_kg: Sequence[float],
+        cargo_types: Sequence[Optional[str]],
+        urgencies: Sequence[str],
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Look up distance, weight (including cargo surcharge) and urgency factors for many quotes.
+
+        Returns:
+            Three int64 arrays of factors in hundredths
+        """
+        count = len(distances_km)
+        distance_index = np.searchsorted(self.distance_limits, np.asarray(distances_km, dtype=float), side="left")
+        distance_factors = self.distance_factors[np.minimum(distance_index, len(self.distance_limits) - 1)]
+
+        weight_index = np.searchsorted(self.weight_minimums, np.asarray(weights_kg, dtype=float), side="right") - 1
+        weight_factors = self.weight_factors[np.maximum(weight_index, 0)]
+        weight_factors = weight_factors + np.fromiter(
+            (self.cargo_surcharge(cargo_type) for cargo_type in cargo_types), dtype=np.int64, count=count
+        )
+
+        urgency_factors = np.fromiter(
+            (self.urgency_factor(urgency) for urgency in urgencies), dtype=np.int64, count=count
+        )
+        return distance_factors, weight_factors, urgency_factors
+
+
+def load_tariff(path: str) -> TariffTable:
+    """Read and compile a tariff document."""
+    with open(path) as f:
+        return TariffTable(json.load(f))
+
+
+class TariffStore:
+    """
+    Holds the current tariff and reloads it when the file changes.
+
+    The file's modification time is checked at most every reload_interval
+    seconds; a document that fails to compile is logged and the previous
+    tariff stays active.
+    """
+
+    def __init__(self, path: str = TARIFF_FILE, reload_interval: float = TARIFF_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._table: Optional[TariffTable] = None
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._stats = {"reloads": 0, "failed_reloads": 0}
+
+    def current(self) -> TariffTable:
+        """Get the active tariff, loading or reloading it if needed."""
+        now = time.monotonic()
+        if self._table is None or now - self._checked_at >= self.reload_interval:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError as e:
+                if self._table is None:
+                    raise
+                logger.error(f"Tariff file {self.path} is unavailable, keeping version {self._table.version}: {e!r}")
+            else:
+                if mtime != self._mtime:
+                    self.reload(mtime)
+        return self._table
+
+    def reload(self, mtime: Optional[float] = None) -> TariffTable:
+        """Compile the tariff file now."""
+        try:
+            table = load_tariff(self.path)
+        except Exception as e:
+            self._stats["failed_reloads"] += 1
+            if self._table is None:
+                raise
+            # Don't retry the same broken file on every check
+            self._mtime = mtime if mtime is not None else self._mtime
+            logger.error(f"Invalid tariff file {self.path}, keeping version {self._table.version}: {e!r}")
+            return self._table
+        self._table = table
+        self._mtime = mtime if mtime is not None else os.stat(self.path).st_mtime
+        self._stats["reloads"] += 1
+        logger.info(f"Loaded tariff version {table.version} from {self.path}")
+        return table
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "version": self._table.version if self._table else None,
+            "path": self.path,
+        }
+
+
+def factor_to_decimal(hundredths: int) -> Decimal:
+    return Decimal(int(hundredths)).scaleb(-2)
+
+
+# Singleton instance
+tariffs = TariffStore()
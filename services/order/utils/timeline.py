@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+
+from models.models import OrderStatus
+
+# Order column holding when the order last entered each status; pending is
+# entered on creation (created_at)
+STATUS_TIMESTAMP_FIELDS = {
+    OrderStatus.PROCESSING: "entered_processing_at",
+    OrderStatus.PICKUP_READY: "entered_pickup_ready_at",
+    OrderStatus.IN_TRANSIT: "entered_in_transit_at",
+    OrderStatus.DELIVERED: "delivered_at",
+    OrderStatus.CANCELLED: "cancelled_at",
+    OrderStatus.RETURNED: "returned_at",
+}
+
+
+def status_change_fields(status: Any, changed_at: datetime) -> Dict[str, datetime]:
+    """Get the order fields to set when the order enters status at changed_at."""
+    fields = {"status_changed_at": changed_at}
+    field = STATUS_TIMESTAMP_FIELDS.get(OrderStatus(status))
+    if field:
+        fields[field] = changed_at
+    return fields
+
+
+def compact_timeline(entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Collapse consecutive entries with the same status into the first one.
+
+    Entries must be sorted by changed_at; repeated writes of an unchanged
+    status are not transitions.
+    """
+    timeline = []
+    for entry in entries:
+        if timeline and timeline[-1]["status"] == entry["status"]:
+            continue
+        timeline.append(entry)
+    return timeline
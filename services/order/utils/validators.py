@@ -1,6 +1,120 @@
+import re
 from datetime import date, datetime
-from typing import Optional
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Tuple, Type
 from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+
+from utils.serializers import from_data
+
+# LxWxH in centimetres, e.g. 10.5x20x30 (spaces around the separators are allowed)
+DIMENSIONS_PATTERN = re.compile(
+    r"^\s*(\d+(?:\.\d+)?)\s*[xX]\s*(\d+(?:\.\d+)?)\s*[xX]\s*(\d+(?:\.\d+)?)\s*$"
+)
+
+# Largest side (100 m). Keeps each side within DECIMAL(8,2), the volume
+# (at most 1e12 cm3) within DECIMAL(16,2) and the volumetric weight within
+# DECIMAL(12,2) for any VOLUMETRIC_DIVISOR of 100 or more
+MAX_DIMENSION_CM = 10000
+
+
+@lru_cache(maxsize=4096)
+def parse_dimensions(dimensions: str) -> Tuple[float, float, float]:
+    """
+    Parse an LxWxH string into (length, width, height).
+
+    Results are cached, as the same few box sizes make up most items.
+
+    Raises:
+        ValueError: The string is not in LxWxH format, or a side is over
+            MAX_DIMENSION_CM
+    """
+    match = DIMENSIONS_PATTERN.match(dimensions)
+    if not match:
+        raise ValueError(f"Invalid dimensions format: {dimensions}. Expected format: LxWxH (e.g., 10.5x20x30)")
+    length, width, height = (float(part) for part in match.groups())
+    if max(length, width, height) > MAX_DIMENSION_CM:
+        raise ValueError(f"Invalid dimensions: {dimensions}. Each side must be at most {MAX_DIMENSION_CM} cm")
+    return length, width, height
+
+
+def check_future_date(date_val: date, field_name: str) -> date:
+    """Raise ValueError unless the date is today or later."""
+    if date_val < date.today():
+        raise ValueError(f"{field_name} must be a future date")
+    return date_val
+
+
+def check_price(price, min_price: float = 0.0):
+    """Raise ValueError if the price is below min_price."""
+    if price < min_price:
+        raise ValueError(f"Price must be at least {min_price}")
+    return price
+
+
+def check_max_digits(value, max_digits: int, decimal_places: int = 2):
+    """
+    Raise ValueError unless the value fits a DECIMAL(max_digits, decimal_places) column.
+
+    Also keeps price inputs in range of the int64 cent arithmetic in utils.pricing.
+    """
+    limit = Decimal(10) ** (max_digits - decimal_places)
+    if abs(Decimal(str(value))) >= limit:
+        raise ValueError(f"Must be less than {limit} in absolute value")
+    return value
+
+
+def check_weight(weight, min_weight: float = 0.1):
+    """Raise ValueError if the weight is below min_weight."""
+    if weight < min_weight:
+        raise ValueError(f"Weight must be at least {min_weight} kg")
+    return weight
+
+
+def check_delivery_deadline(pickup_date: date, delivery_deadline: date) -> None:
+    """Raise ValueError unless the delivery deadline is after the pickup date."""
+    if delivery_deadline <= pickup_date:
+        raise ValueError("Delivery deadline must be after pickup date")
+
+
+def validation_messages(error: ValidationError) -> List[str]:
+    """Format the errors of a ValidationError as "field: message" strings."""
+    return [
+        f"{'.'.join(str(part) for part in entry['loc']) or 'record'}: {entry['msg']}"
+        for entry in error.errors()
+    ]
+
+
+def validate_records(
+    model: Type[BaseModel],
+    records: Iterable[Dict[str, Any]],
+) -> Tuple[List[BaseModel], List[Dict[str, Any]]]:
+    """
+    Validate many records against a model in one pass.
+
+    Unlike validating one record at a time and stopping at the first
+    failure, every record is checked and all of its errors are reported.
+
+    Returns:
+        The valid records as models, and one {"index", "errors"} entry per
+        invalid record, where errors lists "field: message" strings
+    """
+    valid = []
+    invalid = []
+    for index, record in enumerate(records):
+        try:
+            valid.append(from_data(model, record))
+        except ValidationError as e:
+            invalid.append({"index": index, "errors": validation_messages(e)})
+    return valid, invalid
+
+
+def _http_error(check, *args):
+    try:
+        return check(*args)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 def validate_date_format(date_str: str) -> date:
@@ -20,59 +134,32 @@ def validate_future_date(date_val: date, field_name: str) -> None:
     """
     Validate that the date is in the future.
     """
-    if date_val < date.today():
-        raise HTTPException(
-            status_code=400,
-            detail=f"{field_name} must be a future date"
-        )
+    _http_error(check_future_date, date_val, field_name)
 
 
 def validate_dimensions_format(dimensions: str) -> None:
     """
     Validate that the dimensions are in the correct format (LxWxH).
     """
-    try:
-        parts = dimensions.split("x")
-        if len(parts) != 3:
-            raise ValueError()
-        
-        for part in parts:
-            float(part)
-    except (ValueError, AttributeError):
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid dimensions format: {dimensions}. Expected format: LxWxH (e.g., 10.5x20x30)"
-        )
+    _http_error(parse_dimensions, dimensions)
 
 
 def validate_price(price: float, min_price: float = 0.0) -> None:
     """
     Validate that the price is not negative.
     """
-    if price < min_price:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Price must be at least {min_price}"
-        )
+    _http_error(check_price, price, min_price)
 
 
 def validate_weight(weight: float, min_weight: float = 0.1) -> None:
     """
     Validate that the weight is positive.
     """
-    if weight < min_weight:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Weight must be at least {min_weight} kg"
-        )
+    _http_error(check_weight, weight, min_weight)
 
 
 def validate_delivery_deadline(pickup_date: date, delivery_deadline: date) -> None:
     """
     Validate that the delivery deadline is after the pickup date.
     """
-    if delivery_deadline <= pickup_date:
-        raise HTTPException(
-            status_code=400,
-            detail="Delivery deadline must be after pickup date"
-        )
\ No newline at end of file
+    _http_error(check_delivery_deadline, pickup_date, delivery_deadline)